@@ -10,41 +10,89 @@ from dotenv import load_dotenv
 from google.adk.agents import Agent, SequentialAgent, LoopAgent
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.tools import FunctionTool, agent_tool
 from google.adk.tools.tool_context import ToolContext
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools.base_tool import BaseTool
 from google.adk.models.lite_llm import LiteLlm
-from opik.integrations.adk import OpikTracer
 from google.genai import types
 from typing import Optional, Dict, Any
 import datetime
+import asyncio
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.vector_search_clean import VectorSearch
+from utils.tracing import tracer_from_env
+from utils.query_cache import log_query
 vs = VectorSearch()
 
-os.environ["OPIK_WORKSPACE"] = "akshatshaw"
-opik_tracer = OpikTracer(project_name="GoKwik")
+# Session state key naming the tenant/workspace whose documents are searched
+WORKSPACE_STATE_KEY = "workspace"
 
-search_tool = FunctionTool(func=vs.search_similar_ads)
+
+def search_similar_ads(
+    query: str,
+    top_k: Optional[int] = None,
+    source: Optional[str] = None,
+    page_from: Optional[int] = None,
+    page_to: Optional[int] = None,
+    uploaded_after: Optional[str] = None,
+    uploaded_before: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    tool_context: ToolContext = None,
+) -> str:
+    """
+    Search the uploaded documents for sections relevant to the query
+    Returns formatted string of results
+    Args:
+        query (str): The search query string.
+        top_k (int): The maximum number of results to return (default: the configured search_top_k); fewer are returned when the rest are not relevant enough.
+        source (str): Optional file name or path to restrict the search to one document.
+        page_from (int): Optional first page to search (inclusive).
+        page_to (int): Optional last page to search (inclusive).
+        uploaded_after (str): Optional ISO date; only search documents uploaded after it.
+        uploaded_before (str): Optional ISO date; only search documents uploaded before it.
+        tags (list[str]): Optional tags every returned chunk must carry.
+    """
+    workspace = tool_context.state.get(WORKSPACE_STATE_KEY) if tool_context else None
+    return vs.for_namespace(workspace).search_similar_ads(
+        query, top_k=top_k, source=source, page_from=page_from,
+        page_to=page_to, uploaded_after=uploaded_after, uploaded_before=uploaded_before, tags=tags
+    )
+
+
+search_tool = FunctionTool(func=search_similar_ads)
 
 load_dotenv()
+
+# Sampled, non-blocking tracing; local SQLite by default, add "opik" to
+# TRACE_EXPORTERS (with OPIK_WORKSPACE set) to also send traces to Opik
+tracer = tracer_from_env()
 AGENT_MODEL = LiteLlm(model="openai/gpt-4.1") 
 
-# RAG agent (modified to work with rewritten queries)
-root_agent = Agent(
-    name="DocumentRAGAgent",
-    model=AGENT_MODEL,
-    description="Document-focused RAG agent that retrieves relevant document sections and generates accurate answers based on the retrieved context.",
-    instruction="""
-        You are a Document RAG Agent specialized in answering questions based on retrieved document content. Follow this workflow:
+# Always-retrieve mode: run retrieval before the first model call and send the
+# context with the question, saving the tool-planning LLM round trip
+PREFETCH_CONTEXT = os.getenv("AGENT_PREFETCH_CONTEXT", "false").lower() in ("1", "true", "yes")
+PREFETCH_HEADER = "Retrieved context (from search_similar_ads):"
 
+RETRIEVAL_STEP = """
         1. Document Retrieval  
         Use the `search_similar_ads` tool to retrieve relevant document sections using the provided optimized query.
-    
+    """
+
+PREFETCH_RETRIEVAL_STEP = f"""
+        1. Document Retrieval  
+        The user message already contains the relevant document sections under "{PREFETCH_HEADER}".
+        Answer from them directly. Only call the `search_similar_ads` tool when they do not contain
+        the answer or a follow-up search with a different query is needed.
+    """
+
+INSTRUCTION_TEMPLATE = """
+        You are a Document RAG Agent specialized in answering questions based on retrieved document content. Follow this workflow:
+{retrieval_step}
 
         2. Context Analysis  
         Carefully analyze the retrieved document sections to understand the context and relevant information.
@@ -71,16 +119,51 @@ root_agent = Agent(
         6. No Results Handling  
         If no relevant information found:  
         "I couldn't find relevant information in the documents to answer your question. Please try rephrasing or ask about a different topic covered in the documents."
-    """,
-    tools=[search_tool],
-    output_key="final_response",
-    before_agent_callback= opik_tracer.before_agent_callback,
-    after_agent_callback=opik_tracer.after_agent_callback, 
-    before_model_callback=opik_tracer.before_model_callback,
-    after_model_callback=opik_tracer.after_model_callback,
-    before_tool_callback=opik_tracer.before_tool_callback,
-    after_tool_callback=opik_tracer.after_tool_callback,
-)
+    """
+
+
+def build_agent(model=AGENT_MODEL, prefetch_context: bool = PREFETCH_CONTEXT, tracer=tracer, tools=None) -> Agent:
+    """Build the document RAG agent; `prefetch_context` switches to the always-retrieve instruction"""
+    callbacks = {}
+    if tracer is not None:
+        callbacks = dict(
+            before_agent_callback=tracer.before_agent_callback,
+            after_agent_callback=tracer.after_agent_callback,
+            before_model_callback=tracer.before_model_callback,
+            after_model_callback=tracer.after_model_callback,
+            before_tool_callback=tracer.before_tool_callback,
+            after_tool_callback=tracer.after_tool_callback,
+        )
+    return Agent(
+        name="DocumentRAGAgent",
+        model=model,
+        description="Document-focused RAG agent that retrieves relevant document sections and generates accurate answers based on the retrieved context.",
+        instruction=INSTRUCTION_TEMPLATE.format(
+            retrieval_step=PREFETCH_RETRIEVAL_STEP if prefetch_context else RETRIEVAL_STEP
+        ),
+        tools=tools if tools is not None else [search_tool],
+        output_key="final_response",
+        **callbacks,
+    )
+
+
+async def build_user_message(query: str, prefetch_context: bool = PREFETCH_CONTEXT, search=None, workspace: Optional[str] = None) -> types.Content:
+    """
+    Build the user message for a query. In always-retrieve mode the retrieved
+    context is packed into the message, so the first model call can answer.
+    The query is recorded in the (anonymized) query log for cache prewarming.
+    """
+    log_query(query, "agent", vs.settings, namespace=VectorSearch.namespace_key(workspace))
+    text = query
+    if prefetch_context:
+        search = search or vs.for_namespace(workspace).search_similar_ads
+        context = await asyncio.to_thread(search, query)
+        text = f"Question: {query}\n\n{PREFETCH_HEADER}\n{context}"
+    return types.Content(role='user', parts=[types.Part(text=text)])
+
+
+# RAG agent (modified to work with rewritten queries)
+root_agent = build_agent()
 
 
 # Create session service and session
@@ -112,7 +195,7 @@ async def generate_response(query: str):
     print(f"\n>>> User Query: {query}")
 
     # Prepare the user's message in ADK format
-    content = types.Content(role='user', parts=[types.Part(text=query)])
+    content = await build_user_message(query)
 
     final_response_text = "Agent did not produce a final response."  # default
 
@@ -129,9 +212,64 @@ async def generate_response(query: str):
     return final_response_text
 
 
-async def call_agent_async(query: str, session_id: str= SESSION_ID, user_id: str=USER_ID):
+async def get_or_create_session(session_id: str, user_id: str):
+    """Return the ADK session, creating it on first use"""
+    session = None
+    try:
+        session = await session_service.get_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id
+        )
+    except Exception as e:
+        print(f"Session {session_id} not found, creating new one: {e}")
+    
+    if session is None:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id
+        )
+        print(f"Created new ADK session: {session_id} for user: {user_id}")
+    return session
+
+
+async def stream_agent_events(query: str, session_id: str = SESSION_ID, user_id: str = USER_ID, workspace: Optional[str] = None):
+    """
+    Run the agent with server-sent-event streaming and yield (kind, text) as
+    events arrive: ("partial", text delta), ("tool", tool name) when the agent
+    calls a tool, and finally ("final", full response text).
+    """
+    safe_user_id = user_id or USER_ID
+    await get_or_create_session(session_id, safe_user_id)
+    content = await build_user_message(query, workspace=workspace)
+    
+    response_text = "I apologize, but I couldn't process your request."
+    async for event in runner.run_async(
+        user_id=safe_user_id,
+        session_id=session_id,
+        new_message=content,
+        state_delta={WORKSPACE_STATE_KEY: workspace},
+        run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+    ):
+        parts = event.content.parts if event.content and event.content.parts else []
+        if event.partial:
+            text = "".join(part.text or "" for part in parts)
+            if text:
+                yield "partial", text
+            continue
+        for call in event.get_function_calls():
+            yield "tool", call.name
+        if event.is_final_response() and parts and parts[0].text:
+            response_text = parts[0].text
+    
+    yield "final", response_text
+
+
+async def call_agent_async(query: str, session_id: str= SESSION_ID, user_id: str=USER_ID, workspace: Optional[str] = None):
     """
     Call the agent using Google ADK API
+    `workspace` scopes document search to that tenant's collection.
     
     Returns:
         str: The agent's response text
@@ -142,32 +280,14 @@ async def call_agent_async(query: str, session_id: str= SESSION_ID, user_id: str
         # Ensure user_id is not None
         safe_user_id = user_id or USER_ID
         
-        # First, try to get existing session from ADK
-        session = None
         try:
-            session = await session_service.get_session(
-                app_name=APP_NAME,
-                user_id=safe_user_id,
-                session_id=session_id
-            )
+            session = await get_or_create_session(session_id, safe_user_id)
         except Exception as e:
-            print(f"Session {session_id} not found, creating new one: {e}")
-            
-        # Create session if it doesn't exist in ADK
-        if session is None:
-            try:
-                session = await session_service.create_session(
-                    app_name=APP_NAME,
-                    user_id=safe_user_id,
-                    session_id=session_id
-                )
-                print(f"Created new ADK session: {session_id} for user: {safe_user_id}")
-            except Exception as e:
-                print(f"Failed to create session {session_id}: {e}")
-                return f"Error creating session: {str(e)}"
+            print(f"Failed to create session {session_id}: {e}")
+            return f"Error creating session: {str(e)}"
         
         # Prepare the user's message in ADK format
-        content = types.Content(role='user', parts=[types.Part(text=query)])
+        content = await build_user_message(query, workspace=workspace)
         
         response_text = "I apologize, but I couldn't process your request."
         
@@ -175,7 +295,8 @@ async def call_agent_async(query: str, session_id: str= SESSION_ID, user_id: str
         async for event in runner.run_async(
             user_id=safe_user_id or USER_ID, 
             session_id=session_id, 
-            new_message=content
+            new_message=content,
+            state_delta={WORKSPACE_STATE_KEY: workspace}
         ):
             print(f"Event received: type={type(event)}, is_final={event.is_final_response()}")
             
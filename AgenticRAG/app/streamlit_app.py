@@ -1,16 +1,38 @@
 import streamlit as st
-import asyncio
 import sys
 import os
 import tempfile
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from QA_Bot.agent import generate_response, call_agent_async
+from QA_Bot.agent import generate_response, stream_agent_events
+from utils.background_loop import BackgroundLoop
 from utils.document_loader import DocumentLoader
+from utils.retrieval import parse_tags
 from utils.vector_search_clean import VectorSearch
 
-vectordb = VectorSearch()
+
+@st.cache_resource
+def get_background_loop():
+    # One event loop for the whole server: the agent's async clients stay bound
+    # to it across reruns instead of being rebuilt on a fresh loop every message
+    return BackgroundLoop("agent-loop")
+
+
+@st.cache_resource
+def get_vector_search():
+    return VectorSearch()
+
+
+@st.cache_resource
+def prewarm_caches():
+    # Once per server, before the first chat is rendered: replays the most
+    # frequent logged queries into the embedding and retrieval caches
+    return get_vector_search().prewarm()
+
+
+vectordb = get_vector_search()
+prewarm_caches()
 
 st.set_page_config(
     page_title="Document Chat Agent",
@@ -21,6 +43,15 @@ st.set_page_config(
 st.title("📚 Document Chat Agent")
 st.caption("Ask questions about your documents")
 
+# Each workspace searches and stores into its own collection
+with st.sidebar:
+    workspace = st.text_input(
+        "Workspace",
+        value="default",
+        help="Documents are uploaded to and searched within this workspace only"
+    )
+workspace_db = vectordb.for_namespace(workspace)
+
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -41,16 +72,26 @@ if prompt := st.chat_input("Ask me anything about your documents..."):
     
     # Display assistant response
     with st.chat_message("assistant"):
+        placeholder = st.empty()
+        status = st.empty()
+        response = ""
+        streamed = ""
         with st.spinner("Thinking..."):
-            # Get response from agent
             try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            response = loop.run_until_complete(call_agent_async(prompt))
-            st.markdown(response)
+                for kind, text in get_background_loop().stream(stream_agent_events(prompt, workspace=workspace)):
+                    if kind == "partial":
+                        streamed += text
+                        placeholder.markdown(streamed + "▌")
+                    elif kind == "tool":
+                        # Text before a tool call is the model thinking aloud; start over
+                        streamed = ""
+                        status.caption(f"🔎 Using {text}...")
+                    else:
+                        response = text
+            except Exception as e:
+                response = f"Sorry, I encountered an error: {str(e)}"
+        status.empty()
+        placeholder.markdown(response)
     
     # Add assistant response to chat history
     st.session_state.messages.append({"role": "assistant", "content": response})
@@ -65,13 +106,18 @@ with st.sidebar:
         accept_multiple_files=True,
         help="Upload documents to chat with the AI agent"
     )
+    upload_tags = st.text_input(
+        "Tags",
+        placeholder="hr, policy",
+        help="Comma-separated tags stored with these documents; searches can be limited to them"
+    )
     
     if uploaded_files:
         if st.button("Process Documents", type="primary"):
             with st.spinner("Processing documents..."):
                 try:
                     # Initialize document loader
-                    doc_loader = DocumentLoader(vector_db=vectordb)
+                    doc_loader = DocumentLoader(vector_db=workspace_db)
                     total_chunks = 0
                     
                     for uploaded_file in uploaded_files:
@@ -82,9 +128,11 @@ with st.sidebar:
                         
                         try:
                             # Process the file
-                            chunks = doc_loader.process_and_store(tmp_file_path)
+                            chunks = doc_loader.process_and_store(tmp_file_path, source=uploaded_file.name, tags=parse_tags(upload_tags))
                             total_chunks += chunks
                             st.success(f"✅ {uploaded_file.name}: {chunks} chunks")
+                            if doc_loader.last_dedup_stats and doc_loader.last_dedup_stats["saved"]:
+                                st.caption(f"♻️ {doc_loader.last_dedup_stats['saved']} duplicate chunks collapsed")
                         except Exception as e:
                             st.error(f"❌ {uploaded_file.name}: {str(e)}")
                         finally:
@@ -111,5 +159,10 @@ with st.sidebar:
     
     if st.button("Clear Chat History"):
         st.session_state.messages = []
-        vectordb.delete_collection()
         st.rerun()
+    
+    # Deleting the workspace's documents is a separate, confirmed action
+    confirm_clear = st.checkbox(f"I want to delete every document in workspace '{workspace_db.namespace}'")
+    if st.button("Clear Documents", disabled=not confirm_clear):
+        workspace_db.delete_collection()
+        st.success("🗑️ Workspace documents deleted")
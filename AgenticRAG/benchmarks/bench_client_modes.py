@@ -0,0 +1,162 @@
+"""
+Benchmark: query throughput of the Chroma client modes across processes.
+
+Builds a store of synthetic vectors, then measures aggregate queries/s for
+    embedded  one process with the store open in-process (today's setup)
+    http      N reader processes against one `chroma run` server, optionally
+              with a writer process adding vectors through the same server
+    snapshot  N reader processes, each on its own read-only snapshot copy
+Everything runs on this machine; no embeddings API is needed.
+
+    cd AgenticRAG
+    python benchmarks/bench_client_modes.py --vectors 20000 --readers 4 --queries 500 --writer
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chroma_client import create_client
+from utils.retrieval import hnsw_metadata
+
+COLLECTION = "bench_collection"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_store(path: str, vectors: int, dim: int):
+    client, _ = create_client(path, "embedded")
+    collection = client.get_or_create_collection(COLLECTION, metadata=hnsw_metadata(), embedding_function=None)
+    rng = np.random.default_rng(0)
+    batch = client.get_max_batch_size()
+    for offset in range(0, vectors, batch):
+        size = min(batch, vectors - offset)
+        collection.add(ids=[str(i) for i in range(offset, offset + size)], embeddings=rng.normal(size=(size, dim)))
+
+
+def reader(mode: str, path: str, queries: int, dim: int, seed: int, ready, start, results):
+    client, _ = create_client(path, mode)
+    collection = client.get_collection(COLLECTION, embedding_function=None)
+    rng = np.random.default_rng(seed)
+    batch = rng.normal(size=(queries, dim))
+    collection.query(query_embeddings=[batch[0]], n_results=5, include=[])  # load the index
+    ready.release()
+    start.wait()
+    began = time.perf_counter()
+    for query in batch:
+        collection.query(query_embeddings=[query], n_results=5, include=["distances"])
+    results.put(time.perf_counter() - began)
+
+
+def writer(path: str, dim: int, stop, results):
+    client, _ = create_client(path, "http")
+    collection = client.get_collection(COLLECTION, embedding_function=None)
+    rng = np.random.default_rng(1)
+    written = 0
+    while not stop.is_set():
+        collection.add(ids=[f"w{written + i}" for i in range(50)], embeddings=rng.normal(size=(50, dim)))
+        written += 50
+    results.put(written)
+
+
+def run_readers(mode: str, path: str, readers: int, queries: int, dim: int, with_writer: bool = False):
+    ctx = multiprocessing.get_context("spawn")
+    ready, start, stop = ctx.Semaphore(0), ctx.Event(), ctx.Event()
+    results, written = ctx.Queue(), ctx.Queue()
+    processes = [
+        ctx.Process(target=reader, args=(mode, path, queries, dim, seed, ready, start, results))
+        for seed in range(readers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    writer_process = None
+    if with_writer:
+        writer_process = ctx.Process(target=writer, args=(path, dim, stop, written))
+        writer_process.start()
+
+    began = time.perf_counter()
+    start.set()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - began
+    stop.set()
+
+    row = {"qps": readers * queries / elapsed, "written": None}
+    if writer_process:
+        row["written"] = written.get()
+        writer_process.join()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--readers", type=int, default=4, help="reader processes for http/snapshot")
+    parser.add_argument("--queries", type=int, default=500, help="queries per reader")
+    parser.add_argument("--writer", action="store_true", help="add vectors through the server while http readers query")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="chroma-modes-")
+    path = os.path.join(scratch, "chroma_db")
+    os.environ["CHROMA_SNAPSHOT_DIR"] = os.path.join(scratch, "snapshots")
+    server = None
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        builder = ctx.Process(target=build_store, args=(path, args.vectors, args.dim))
+        builder.start()
+        builder.join()
+
+        results = {}
+        results["embedded, 1 process"] = run_readers("embedded", path, 1, args.queries, args.dim)
+        results[f"snapshot, {args.readers} processes"] = run_readers("snapshot", path, args.readers, args.queries, args.dim)
+
+        port = free_port()
+        os.environ.update(CHROMA_HOST="127.0.0.1", CHROMA_PORT=str(port))
+        server = subprocess.Popen(
+            ["chroma", "run", "--path", path, "--host", "127.0.0.1", "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("chroma server did not start")
+                time.sleep(0.2)
+        label = f"http, {args.readers} processes" + (" + writer" if args.writer else "")
+        results[label] = run_readers("http", path, args.readers, args.queries, args.dim, args.writer)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{args.vectors} vectors (dim {args.dim}), {args.queries} queries per reader\n")
+    print(f"{'mode':<34}{'queries/s':>12}{'vectors written':>18}")
+    for mode, row in results.items():
+        written = "-" if row["written"] is None else str(row["written"])
+        print(f"{mode:<34}{row['qps']:>12.1f}{written:>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: PDF extraction backends, sequential vs page-parallel.
+
+For every installed backend (pypdf, pymupdf, pypdfium2) and worker count,
+extracts the given PDFs and reports pages/s and text fidelity. Fidelity is
+the word-level F1 against a reference text: `<name>.txt` next to the PDF
+when present (ground truth), otherwise the --reference backend's output.
+--repeat concatenates each PDF's pages N times, to time large documents
+from small fixtures.
+
+    cd AgenticRAG
+    python benchmarks/bench_pdf_extract.py "../GKAIIntern_Project (1) (2).pdf" uploads/*.pdf --repeat 50 --workers 1,4
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_extract import available_backends, extract_pages
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def default_fixtures():
+    return sorted(glob.glob(os.path.join(ROOT, "*.pdf")) + glob.glob(os.path.join(ROOT, "AgenticRAG", "uploads", "*.pdf")))
+
+
+def repeat_pdf(path: str, times: int, directory: str) -> str:
+    from pypdf import PdfReader, PdfWriter
+    reader = PdfReader(path)
+    writer = PdfWriter()
+    for _ in range(times):
+        for page in reader.pages:
+            writer.add_page(page)
+    target = os.path.join(directory, f"{os.path.splitext(os.path.basename(path))[0]}.x{times}.pdf")
+    with open(target, "wb") as f:
+        writer.write(f)
+    return target
+
+
+def word_f1(text: str, reference: str) -> float:
+    words, expected = Counter(re.findall(r"\w+", text.lower())), Counter(re.findall(r"\w+", reference.lower()))
+    if not words and not expected:
+        return 1.0
+    overlap = sum((words & expected).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(words.values()), overlap / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files (default: the PDFs shipped in the repository)")
+    parser.add_argument("--backends", default=",".join(available_backends()))
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="worker counts to compare")
+    parser.add_argument("--repeat", type=int, default=1, help="concatenate each PDF's pages this many times")
+    parser.add_argument("--reference", default="pypdf", help="backend whose text is the reference without a .txt")
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or default_fixtures()
+    if not pdfs:
+        raise SystemExit("No PDFs given and none found in the repository")
+    backends = [b for b in args.backends.split(",") if b]
+    workers_list = sorted({int(w) for w in args.workers.split(",") if w})
+
+    scratch = tempfile.mkdtemp(prefix="bench-pdf-")
+    try:
+        inputs = []
+        for pdf in pdfs:
+            truth = os.path.splitext(pdf)[0] + ".txt"
+            reference = open(truth, encoding="utf-8").read() if os.path.exists(truth) else None
+            path = repeat_pdf(pdf, args.repeat, scratch) if args.repeat > 1 else pdf
+            if reference is None:
+                reference = "\n".join(extract_pages(path, backend=args.reference, workers=1))
+            elif args.repeat > 1:
+                reference = "\n".join([reference] * args.repeat)
+            inputs.append((path, reference))
+
+        print(f"{len(inputs)} PDFs, backends: {', '.join(backends)}\n")
+        print(f"{'backend':<12}{'workers':>8}{'pages':>8}{'seconds':>10}{'pages/s':>10}{'word F1':>10}")
+        for backend in backends:
+            for workers in workers_list:
+                pages, elapsed, scores = 0, 0.0, []
+                for path, reference in inputs:
+                    start = time.perf_counter()
+                    texts = extract_pages(path, backend=backend, workers=workers)
+                    elapsed += time.perf_counter() - start
+                    pages += len(texts)
+                    scores.append(word_f1("\n".join(texts), reference))
+                f1 = sum(scores) / len(scores)
+                print(f"{backend:<12}{workers:>8}{pages:>8}{elapsed:>10.2f}{pages / elapsed:>10.1f}{f1:>10.3f}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
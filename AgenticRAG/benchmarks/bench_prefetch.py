@@ -0,0 +1,120 @@
+"""
+Benchmark: tool-planning flow vs. always-retrieve (prefetch) flow for DocumentRAGAgent.
+
+Both flows run through the real ADK Runner and agent definition, with a stub
+model and a stub `search_similar_ads` so no API calls are made. The stub
+model asks for the search tool unless the user message already carries
+prefetched context or a tool result is present, mirroring what gpt-4.1 does
+with the agent instruction.
+
+    cd AgenticRAG
+    python benchmarks/bench_prefetch.py --questions 10 --model-latency 0.8 --search-latency 0.15
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import AsyncGenerator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+from QA_Bot.agent import PREFETCH_HEADER, build_agent, build_user_message
+
+APP_NAME = "prefetch-benchmark"
+USER_ID = "bench"
+
+
+class StubLlm(BaseLlm):
+    """Stub model with fixed latency that plans a search call when it has no context."""
+
+    model: str = "stub-gpt-4.1"
+    latency: float = 0.8
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = last.parts if last and last.parts else []
+        has_tool_result = any(part.function_response for part in parts)
+        text = "".join(part.text or "" for part in parts)
+
+        if has_tool_result or PREFETCH_HEADER in text:
+            reply = types.Part(text="Stub answer grounded in the retrieved document sections.")
+        else:
+            reply = types.Part(function_call=types.FunctionCall(name="search_similar_ads", args={"query": text}))
+        yield LlmResponse(content=types.Content(role="model", parts=[reply]))
+
+
+def make_search(latency: float):
+    def search_similar_ads(query: str, top_k: int = 5) -> str:
+        """Search the documents for sections relevant to the query."""
+        time.sleep(latency)
+        return f"1. [distance 0.210] Stub document section about {query}"
+    return search_similar_ads
+
+
+async def run_flow(prefetch: bool, questions: int, model_latency: float, search_latency: float):
+    model = StubLlm(latency=model_latency)
+    search = make_search(search_latency)
+    agent = build_agent(model=model, prefetch_context=prefetch, tracer=None, tools=[FunctionTool(func=search)])
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+
+    latencies = []
+    for i in range(questions):
+        session_id = f"{'prefetch' if prefetch else 'tools'}-{i}"
+        await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        start = time.perf_counter()
+        content = await build_user_message(f"What does policy {i} say about leave?", prefetch_context=prefetch, search=search)
+        async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+            if event.is_final_response():
+                break
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "model_calls_per_question": model.calls / questions,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--model-latency", type=float, default=0.8, help="seconds per stub model call")
+    parser.add_argument("--search-latency", type=float, default=0.15, help="seconds per stub search call")
+    args = parser.parse_args()
+
+    results = {
+        "tool planning (current)": await run_flow(False, args.questions, args.model_latency, args.search_latency),
+        "always retrieve (prefetch)": await run_flow(True, args.questions, args.model_latency, args.search_latency),
+    }
+
+    print(f"{args.questions} questions, model latency {args.model_latency * 1000:.0f} ms, "
+          f"search latency {args.search_latency * 1000:.0f} ms\n")
+    print(f"{'flow':<30}{'mean ms':>10}{'max ms':>10}{'model calls':>14}")
+    for flow, row in results.items():
+        print(f"{flow:<30}{row['mean_ms']:>10.1f}{row['max_ms']:>10.1f}{row['model_calls_per_question']:>14.1f}")
+
+    saved = results["tool planning (current)"]["mean_ms"] - results["always retrieve (prefetch)"]["mean_ms"]
+    print(f"\nMean latency saved per question: {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
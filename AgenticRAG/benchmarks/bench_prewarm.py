@@ -0,0 +1,110 @@
+"""
+Benchmark: first-wave search latency after a deploy, cold vs prewarmed caches.
+
+Builds a scratch store with hashing embeddings that sleep --embed-latency
+seconds per call, standing in for the embedding API. It writes a
+Zipf-distributed query log, then replays a "first wave" of --wave queries
+drawn from the same distribution twice: once on cold caches and once after
+`VectorSearch.prewarm`. It reports p50/p95 latency, embedding calls and the
+prewarm's own time and token spend.
+
+    cd AgenticRAG
+    python benchmarks/bench_prewarm.py --queries 200 --wave 300 --embed-latency 0.05
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tune_retrieval import HashingEmbeddingFunction
+from utils import query_cache
+from utils.settings import Settings
+from utils.vector_search_clean import VectorSearch
+
+
+class SlowEmbeddingFunction(HashingEmbeddingFunction):
+    """Hashing embeddings with a fixed per-call delay, counting calls"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().__call__(input)
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def run_wave(vector_db: VectorSearch, wave):
+    latencies = []
+    for query in wave:
+        start = time.perf_counter()
+        vector_db._cached_retrieve(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="distinct queries in the log")
+    parser.add_argument("--log-size", type=int, default=5000, help="logged queries before the deploy")
+    parser.add_argument("--wave", type=int, default=300, help="queries in the first wave after the deploy")
+    parser.add_argument("--top", type=int, default=50, help="queries to prewarm")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew of the queries")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    distinct = [f"question {i} about topic {i % 17} and product {i % 29}" for i in range(args.queries)]
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.queries)]
+    scratch = tempfile.mkdtemp(prefix="bench-prewarm-")
+    try:
+        settings = Settings.from_env(
+            query_log_path=os.path.join(scratch, "query_log.jsonl"),
+            prewarm_queries=args.top, prewarm_seconds=600, prewarm_max_tokens=10 ** 9,
+        )
+        embedding_function = SlowEmbeddingFunction(0.0)
+        vector_db = VectorSearch(persist_directory=os.path.join(scratch, "store"), settings=settings, embedding_function=embedding_function)
+        vector_db.upsert_source(
+            "corpus",
+            [f"Chunk {i} about topic {i % 17} and product {i % 29}." for i in range(500)],
+            [{"source": "corpus", "chunk": i} for i in range(500)],
+        )
+        for query in rng.choices(distinct, weights, k=args.log_size):
+            query_cache.log_query(query, "search", settings, namespace=vector_db.namespace)
+        wave = rng.choices(distinct, weights, k=args.wave)
+        embedding_function.latency = args.embed_latency
+
+        results = {}
+        for mode in ("cold", "prewarmed"):
+            query_cache.clear_caches()
+            embedding_function.calls = 0
+            prewarm = vector_db.prewarm() if mode == "prewarmed" else None
+            warm_calls = embedding_function.calls
+            latencies = run_wave(vector_db, wave)
+            results[mode] = (latencies, embedding_function.calls - warm_calls, prewarm)
+
+        print(f"{args.wave} first-wave queries over {args.queries} distinct, {args.embed_latency * 1000:.0f} ms per embedding call\n")
+        print(f"{'caches':<12}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'embed calls':>13}")
+        for mode, (latencies, calls, _) in results.items():
+            print(f"{mode:<12}{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{statistics.mean(latencies):>10.1f}{calls:>13}")
+        prewarm = results["prewarmed"][2]
+        print(f"\nprewarm: {prewarm['warmed']} queries in {prewarm['seconds']:.2f} s, ~{prewarm['tokens']} embedding tokens")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: snapshot export, restore and memory-mapped open on synthetic vectors.
+
+Builds a Chroma collection of random vectors with short texts, then measures
+export time and size on disk against the Chroma directory, bulk restore into
+a fresh store (no embedding calls), and opening the snapshot memory-mapped
+plus one exact search, which is what a read-only replica pays at startup.
+
+    cd AgenticRAG
+    python benchmarks/bench_snapshot.py --vectors 20000 --dim 1536
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chroma_client import create_client
+from utils.retrieval import hnsw_metadata
+from utils.vector_snapshot import Snapshot, export_collection, import_snapshot
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def build_store(path: str, vectors: int, dim: int):
+    client, _ = create_client(path, "embedded")
+    collection = client.create_collection("bench_collection", metadata=hnsw_metadata(), embedding_function=None)
+    rng = np.random.default_rng(0)
+    batch = client.get_max_batch_size()
+    for offset in range(0, vectors, batch):
+        size = min(batch, vectors - offset)
+        collection.add(
+            ids=[str(i) for i in range(offset, offset + size)],
+            embeddings=rng.normal(size=(size, dim)).astype(np.float32),
+            documents=[f"Synthetic chunk {i} " * 40 for i in range(offset, offset + size)],
+            metadatas=[{"source": f"doc_{i % 100}.pdf", "page": i % 30, "chunk_id": i} for i in range(offset, offset + size)],
+        )
+    return client, collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-snapshot-")
+    try:
+        store, snapshot_dir, restored = (os.path.join(scratch, name) for name in ("store", "snapshot", "restored"))
+        _, collection = build_store(store, args.vectors, args.dim)
+
+        start = time.perf_counter()
+        export_collection(collection, snapshot_dir, embedding_model="synthetic")
+        export_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot = Snapshot(snapshot_dir)
+        client, _ = create_client(restored, "embedded")
+        target = client.create_collection("bench_collection", metadata=hnsw_metadata(), embedding_function=None)
+        import_snapshot(target, snapshot, client.get_max_batch_size())
+        restore_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        replica = Snapshot(snapshot_dir, verify=False)
+        replica.search(np.ones(args.dim, dtype=np.float32), k=5)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{args.vectors} vectors (dim {args.dim})\n")
+        print(f"chroma directory     {directory_size(store) / 1e6:>10.1f} MB")
+        print(f"snapshot             {directory_size(snapshot_dir) / 1e6:>10.1f} MB")
+        print(f"export               {export_s:>10.2f} s")
+        print(f"verify + restore     {restore_s:>10.2f} s   ({target.count()} records, no embedding calls)")
+        print(f"mmap open + search   {open_ms:>10.1f} ms")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Sweep HNSW parameters: recall@k against exact search, query latency and build time.
+
+Embeddings come from an existing Chroma store (no re-embedding) or are
+generated synthetically. Every parameter set is built into a scratch
+persistent collection, so batch_size/sync_threshold behave as in production.
+Queries are corpus vectors with gaussian noise, or real questions embedded
+with text-embedding-3-small when --questions is given.
+
+    cd AgenticRAG
+    python benchmarks/hnsw_sweep.py --persist-dir ./chroma_db --k 5 --M 16,32,64 --search-ef 10,50,100
+    python benchmarks/hnsw_sweep.py --synthetic 20000 --dim 1536 --json hnsw_sweep.json
+
+Apply the chosen values with HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF,
+HNSW_BATCH_SIZE and HNSW_SYNC_THRESHOLD (both stacks read them). M and
+construction_ef only apply to newly built collections.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from utils.retrieval import apply_hnsw_search_params, exact_search, hnsw_metadata
+
+
+def int_list(text: str):
+    return [int(v) for v in text.split(",") if v]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_corpus(args) -> np.ndarray:
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        # Clustered vectors resemble real document embeddings better than uniform noise
+        centers = rng.normal(size=(max(1, args.synthetic // 50), args.dim))
+        vectors = centers[rng.integers(0, len(centers), args.synthetic)] + 0.5 * rng.normal(size=(args.synthetic, args.dim))
+        return vectors.astype(np.float32)
+
+    client = chromadb.PersistentClient(path=args.persist_dir, settings=Settings(anonymized_telemetry=False))
+    fetched = client.get_collection(args.collection).get(include=["embeddings"])
+    if len(fetched["embeddings"]) == 0:
+        raise SystemExit(f"Collection {args.collection!r} in {args.persist_dir} is empty; use --synthetic N")
+    return np.asarray(fetched["embeddings"], dtype=np.float32)
+
+
+def load_queries(args, corpus: np.ndarray) -> np.ndarray:
+    if args.questions:
+        from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        embed = OpenAIEmbeddingFunction(model_name="text-embedding-3-small")
+        return np.asarray(embed(questions), dtype=np.float32)
+
+    rng = np.random.default_rng(args.seed + 1)
+    picks = corpus[rng.integers(0, len(corpus), args.queries)]
+    scale = args.query_noise * np.linalg.norm(picks, axis=1, keepdims=True) / np.sqrt(corpus.shape[1])
+    return (picks + scale * rng.normal(size=picks.shape)).astype(np.float32)
+
+
+def open_client(path: str):
+    return chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False, allow_reset=True))
+
+
+def build_collection(client, corpus: np.ndarray, params: dict):
+    collection = client.create_collection(
+        name=f"sweep-{params['M']}-{params['construction_ef']}",
+        metadata=hnsw_metadata(**params),
+        embedding_function=None,
+    )
+    ids = [str(i) for i in range(len(corpus))]
+    batch = client.get_max_batch_size()
+    start = time.perf_counter()
+    for offset in range(0, len(corpus), batch):
+        collection.add(ids=ids[offset:offset + batch], embeddings=corpus[offset:offset + batch])
+    return collection, time.perf_counter() - start
+
+
+def measure(collection, queries: np.ndarray, truth, k: int):
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found = {int(i) for i in result["ids"][0]}
+        recalls.append(len(found & expected) / len(expected))
+    return {
+        "recall": statistics.mean(recalls),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    parser.add_argument("--collection", default="document_collection")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of a stored collection")
+    parser.add_argument("--dim", type=int, default=1536, help="dimension of synthetic vectors")
+    parser.add_argument("--questions", help="file with one question per line, embedded as queries")
+    parser.add_argument("--queries", type=int, default=200, help="number of noisy corpus queries")
+    parser.add_argument("--query-noise", type=float, default=0.3)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--M", default="16,32,64")
+    parser.add_argument("--construction-ef", default="100,200")
+    parser.add_argument("--search-ef", default="10,50,100,200")
+    parser.add_argument("--batch-size", type=int, default=None, help="hnsw:batch_size for every run")
+    parser.add_argument("--sync-threshold", type=int, default=None, help="hnsw:sync_threshold for every run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    queries = load_queries(args, corpus)
+    k = min(args.k, len(corpus))
+    truth = [set(exact_search(query, corpus, k)[0]) for query in queries]
+    print(f"{len(corpus)} vectors (dim {corpus.shape[1]}), {len(queries)} queries, recall@{k} vs exact search\n")
+
+    scratch = tempfile.mkdtemp(prefix="hnsw-sweep-")
+    rows = []
+    try:
+        client = open_client(scratch)
+        for M, construction_ef in itertools.product(int_list(args.M), int_list(args.construction_ef)):
+            search_efs = int_list(args.search_ef)
+            params = {
+                "M": M,
+                "construction_ef": construction_ef,
+                "search_ef": search_efs[0],
+                "batch_size": args.batch_size,
+                "sync_threshold": args.sync_threshold,
+            }
+            collection, build_s = build_collection(client, corpus, params)
+            for search_ef in search_efs:
+                if search_ef != params["search_ef"]:
+                    params["search_ef"] = search_ef
+                    if apply_hnsw_search_params(collection, search_ef=search_ef):
+                        # A loaded index keeps its ef; drop the cached system so it reloads
+                        SharedSystemClient.clear_system_cache()
+                        client = open_client(scratch)
+                        collection = client.get_collection(collection.name, embedding_function=None)
+                    else:
+                        # Older Chroma cannot change ef on a built index; rebuild with it
+                        client.delete_collection(collection.name)
+                        collection, build_s = build_collection(client, corpus, params)
+                row = {"M": M, "construction_ef": construction_ef, "search_ef": search_ef, "build_s": build_s}
+                row.update(measure(collection, queries, truth, k))
+                rows.append(row)
+                print(f"M={M:<4} construction_ef={construction_ef:<5} search_ef={search_ef:<5} "
+                      f"recall={row['recall']:.3f}  p50={row['p50_ms']:.2f} ms  p95={row['p95_ms']:.2f} ms  build={build_s:.1f} s")
+            client.delete_collection(collection.name)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\n{'M':>4}{'c_ef':>7}{'s_ef':>7}{'recall@' + str(k):>11}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}")
+    for row in rows:
+        print(f"{row['M']:>4}{row['construction_ef']:>7}{row['search_ef']:>7}{row['recall']:>11.3f}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['build_s']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"vectors": len(corpus), "dim": int(corpus.shape[1]), "k": k, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
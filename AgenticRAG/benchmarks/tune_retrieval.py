@@ -0,0 +1,209 @@
+"""
+Tune chunk size, chunk overlap and k on a labeled query set.
+
+For every chunk size/overlap pair the documents are split and embedded into a
+scratch store through the same DocumentLoader/VectorSearch path the apps use.
+Every k is then scored on
+    hit rate       share of queries whose retrieved chunks contain an expected answer
+    prompt tokens  mean tokens of retrieved context sent to the model per question
+    latency        p50/p95 of VectorSearch.retrieve (query embedding, search, rerank)
+The recommended configuration is the cheapest one in prompt tokens whose hit
+rate is within --tolerance of the best.
+
+The query set is JSONL, one labeled query per line:
+    {"question": "How many vacation days do employees get?", "answers": ["20 days"], "source": "company_policies.txt"}
+A query is a hit when a retrieved chunk contains one of `answers`
+(case-insensitive) and, when `source` is given, comes from that file.
+
+    cd AgenticRAG
+    python benchmarks/tune_retrieval.py --documents ../RAG/documents --queries queries.jsonl \\
+        --chunk-size 500,1000,1500 --chunk-overlap 0,100,200 --k 3,5,8
+
+Each chunking configuration embeds the whole corpus once with
+text-embedding-3-small. `--embeddings hashing` uses a local bag-of-words
+embedding instead, which makes no API calls but only smoke-tests the sweep
+(leave RETRIEVAL_MAX_DISTANCE unset, its distances are not calibrated).
+The rerank stage uses the RETRIEVAL_* settings from the environment.
+Apply the result with CHUNK_SIZE, CHUNK_OVERLAP and SEARCH_TOP_K (K_DOCUMENTS
+for the RAG app); chunking changes need the documents re-ingested.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from utils.document_loader import DocumentLoader
+from utils import query_cache
+from utils.settings import Settings
+from utils.vector_search_clean import VectorSearch
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Offline stand-in for the OpenAI embeddings: hashed bag of words"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dim] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+
+def token_counter():
+    """tiktoken's count when its encoding is available, else ~4 characters per token"""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        print("tiktoken encoding unavailable; estimating tokens as characters / 4\n")
+        return lambda text: max(1, len(text) // 4)
+
+
+def int_list(text: str):
+    return [int(v) for v in text.split(",") if v]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_queries(path: str):
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            query = json.loads(line)
+            if not query.get("question") or not query.get("answers"):
+                raise SystemExit(f"{path}:{number}: every query needs a question and a non-empty answers list")
+            queries.append(query)
+    return queries
+
+
+def is_hit(query, results) -> bool:
+    answers = [answer.lower() for answer in query["answers"]]
+    for result in results:
+        if query.get("source") and os.path.basename(result["metadata"].get("source", "")) != query["source"]:
+            continue
+        text = result["document"].lower()
+        if any(answer in text for answer in answers):
+            return True
+    return False
+
+
+def build_store(args, settings: Settings, embedding_function):
+    """Ingest the documents with `settings`' chunking into a fresh store"""
+    vector_db = VectorSearch(settings=settings, client_mode="embedded", hnsw={}, embedding_function=embedding_function)
+    loader = DocumentLoader(vector_db=vector_db, settings=settings)
+    start = time.perf_counter()
+    chunks = loader.process_directory(args.documents)
+    return vector_db, chunks, time.perf_counter() - start
+
+
+def evaluate(vector_db: VectorSearch, queries, k: int, count_tokens):
+    # Earlier configurations asked the same questions; time this one on cold caches
+    query_cache.clear_caches()
+    hits, tokens, latencies = 0, [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = vector_db.retrieve(query["question"], top_k=k)
+        latencies.append(time.perf_counter() - start)
+        hits += is_hit(query, results)
+        tokens.append(sum(count_tokens(result["document"]) for result in results))
+    return {
+        "hit_rate": hits / len(queries),
+        "prompt_tokens": statistics.mean(tokens),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def recommend(rows, tolerance: float):
+    best = max(row["hit_rate"] for row in rows)
+    eligible = [row for row in rows if row["hit_rate"] >= best - tolerance]
+    return min(eligible, key=lambda row: (row["prompt_tokens"], row["p50_ms"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", required=True, help="directory of .pdf/.txt/.docx files to ingest")
+    parser.add_argument("--queries", required=True, help="labeled query set (JSONL)")
+    parser.add_argument("--chunk-size", default="500,1000,1500")
+    parser.add_argument("--chunk-overlap", default="0,100,200")
+    parser.add_argument("--k", default="3,5,8")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="hit rate a recommendation may give up against the best configuration")
+    parser.add_argument("--embeddings", choices=("openai", "hashing"), default="openai")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    count_tokens = token_counter()
+    embedding_function = HashingEmbeddingFunction() if args.embeddings == "hashing" else None
+    print(f"{len(queries)} labeled queries over {args.documents}\n")
+
+    rows = []
+    for chunk_size, chunk_overlap in itertools.product(int_list(args.chunk_size), int_list(args.chunk_overlap)):
+        if chunk_overlap >= chunk_size:
+            continue
+        scratch = tempfile.mkdtemp(prefix="tune-retrieval-")
+        try:
+            settings = Settings.from_env(chunk_size=chunk_size, chunk_overlap=chunk_overlap, vector_db_path=scratch, query_log_path=None)
+            # The loader and store narrate every step; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                vector_db, chunks, build_s = build_store(args, settings, embedding_function)
+            for k in int_list(args.k):
+                row = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "k": k, "chunks": chunks, "build_s": build_s}
+                row.update(evaluate(vector_db, queries, k, count_tokens))
+                rows.append(row)
+                print(f"chunk_size={chunk_size:<5} overlap={chunk_overlap:<4} k={k:<3} hit_rate={row['hit_rate']:.2f}  "
+                      f"tokens={row['prompt_tokens']:.0f}  p50={row['p50_ms']:.1f} ms  p95={row['p95_ms']:.1f} ms")
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    if not rows:
+        raise SystemExit("No valid configuration: every chunk overlap is at least the chunk size")
+
+    print(f"\n{'size':>6}{'overlap':>9}{'k':>4}{'chunks':>8}{'hit rate':>10}{'tokens':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in sorted(rows, key=lambda row: (-row["hit_rate"], row["prompt_tokens"])):
+        print(f"{row['chunk_size']:>6}{row['chunk_overlap']:>9}{row['k']:>4}{row['chunks']:>8}{row['hit_rate']:>10.2f}"
+              f"{row['prompt_tokens']:>9.0f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}")
+
+    choice = recommend(rows, args.tolerance)
+    print(f"\nCheapest configuration within {args.tolerance:.2f} of the best hit rate "
+          f"({choice['hit_rate']:.2f}, {choice['prompt_tokens']:.0f} prompt tokens):")
+    print(f"    CHUNK_SIZE={choice['chunk_size']} CHUNK_OVERLAP={choice['chunk_overlap']} "
+          f"SEARCH_TOP_K={choice['k']} K_DOCUMENTS={choice['k']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"queries": len(queries), "recommended": choice, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Tests for near-duplicate detection in `utils.dedup`, within one batch and
+against chunks stored by earlier `DocumentLoader` calls.
+"""
+
+import os
+import sys
+
+import pytest
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tune_retrieval import HashingEmbeddingFunction
+from utils.dedup import ChunkDeduplicator, SignatureIndex
+from utils.document_loader import DocumentLoader
+from utils.settings import Settings
+from utils.vector_search_clean import VectorSearch
+
+POLICY = (
+    "Refunds are issued to the original payment method within seven working days of the "
+    "returned item reaching our warehouse, provided the item is unused and in its original "
+    "packaging with all tags attached and the return was requested within thirty days."
+)
+# One word changed: near but not exactly identical
+POLICY_EDITED = POLICY.replace("seven", "ten")
+
+
+def chunk(text: str, source: str, page: int = None) -> Document:
+    metadata = {"source": source}
+    if page is not None:
+        metadata["page"] = page
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_near_duplicates_collapse_at_the_threshold():
+    similarity = ChunkDeduplicator.similarity(
+        ChunkDeduplicator().signature(POLICY), ChunkDeduplicator().signature(POLICY_EDITED)
+    )
+    assert 0.5 < similarity < 1.0
+
+    loose = ChunkDeduplicator(threshold=similarity)
+    strict = ChunkDeduplicator(threshold=min(1.0, similarity + 0.02))
+
+    kept, stats = loose.deduplicate([chunk(POLICY, "a.txt"), chunk(POLICY_EDITED, "b.txt")])
+    assert len(kept) == 1 and stats["near"] == 1
+    kept, stats = strict.deduplicate([chunk(POLICY, "a.txt"), chunk(POLICY_EDITED, "b.txt")])
+    assert len(kept) == 2 and stats["near"] == 0
+
+
+def test_collapsed_chunk_lists_every_source_once():
+    kept, stats = ChunkDeduplicator().deduplicate([
+        chunk(POLICY, "/docs/a.pdf", page=1),
+        chunk("  " + POLICY.upper() + "\n", "/docs/b.pdf", page=2),
+        chunk(POLICY, "/docs/a.pdf", page=1),
+        chunk("Unrelated text about shipping times.", "/docs/b.pdf", page=3),
+    ])
+
+    assert stats == {"input": 4, "kept": 2, "exact": 2, "near": 0, "stored": 0, "saved": 2}
+    assert kept[0].metadata["duplicate_sources"] == "/docs/a.pdf#page=1;/docs/b.pdf#page=2"
+    assert kept[0].metadata["duplicate_count"] == 2
+    assert ChunkDeduplicator.sources_of(kept[0].metadata) == ["/docs/a.pdf", "/docs/b.pdf"]
+    assert kept[1].metadata["duplicate_count"] == 1
+
+
+def test_signature_index_persists_and_merges_saves(tmp_path):
+    deduplicator = ChunkDeduplicator()
+    path = str(tmp_path / "minhash_index.json")
+    first = SignatureIndex(path, deduplicator, key=VectorSearch.chunk_id)
+    second = SignatureIndex(path, deduplicator, key=VectorSearch.chunk_id)
+
+    first.add("a", deduplicator.signature(POLICY))
+    second.add("b", deduplicator.signature("Unrelated text about shipping times."))
+    first.save()
+    second.save()
+
+    reloaded = SignatureIndex(path, deduplicator, key=VectorSearch.chunk_id)
+    assert len(reloaded) == 2
+    assert reloaded.candidates(deduplicator.signature(POLICY_EDITED)) == ["a"]
+    # Different MinHash parameters make stored signatures incomparable
+    assert len(SignatureIndex(path, ChunkDeduplicator(num_perm=32, bands=8), key=VectorSearch.chunk_id)) == 0
+
+
+@pytest.fixture
+def loader(tmp_path):
+    settings = Settings(query_log_path=None)
+    vector_db = VectorSearch(
+        persist_directory=str(tmp_path / "store"), settings=settings,
+        client_mode="embedded", hnsw={}, embedding_function=HashingEmbeddingFunction(),
+    )
+    return DocumentLoader(vector_db=vector_db, dedup_threshold=0.5)
+
+
+def write(path, text: str) -> str:
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_later_upload_reuses_a_stored_near_duplicate(loader, tmp_path):
+    a = write(tmp_path / "a.txt", POLICY)
+    b = write(tmp_path / "b.txt", POLICY_EDITED)
+
+    loader.process_and_store(a)
+    loader.process_and_store(b)
+
+    assert loader.last_dedup_stats["stored"] == 1
+    assert loader.last_dedup_stats["saved"] == 1
+    vector_db = loader.vector_db
+    shared_id = vector_db.chunk_id(POLICY)
+    assert vector_db.collection.count() == 1
+    assert vector_db.list_sources() == {os.path.abspath(a): 1, os.path.abspath(b): 1}
+    metadata = vector_db.collection.get(ids=[shared_id], include=["metadatas"])["metadatas"][0]
+    assert metadata["duplicate_sources"] == f"{os.path.abspath(a)};{os.path.abspath(b)}"
+    assert metadata["duplicate_count"] == 2
+
+    vector_db.delete_source(os.path.abspath(a))
+    assert vector_db.collection.count() == 1
+    assert vector_db.collection.get(ids=[shared_id], include=["metadatas"])["metadatas"][0]["source"] == os.path.abspath(b)
+
+
+def test_reuploaded_file_keeps_its_edits(loader, tmp_path):
+    path = tmp_path / "a.txt"
+    loader.process_and_store(write(path, POLICY))
+    loader.process_and_store(write(path, POLICY_EDITED))
+
+    assert loader.last_dedup_stats["stored"] == 0
+    assert loader.vector_db.collection.get(include=["documents"])["documents"] == [POLICY_EDITED]
@@ -0,0 +1,98 @@
+"""
+Tests that `utils.pdf_extract.load_pdf` splits pages and fills metadata like
+PyPDFLoader, whether pages are extracted inline or by the process pool.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import pdf_extract
+from utils.pdf_extract import PARALLEL_MIN_PAGES, load_pdf
+from utils.settings import Settings
+
+
+def write_pdf(path, texts, title="Refund policy"):
+    """Minimal PDF with one line of Helvetica text per page and a document info dictionary"""
+    count = len(texts)
+    font, info = 3 + 2 * count, 4 + 2 * count
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count),
+        font: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        info: f"<< /Title ({title}) /Author (Support team) /CreationDate (D:20240102030405+00'00') >>",
+    }
+    for i, text in enumerate(texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects[3 + 2 * i] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects[4 + 2 * i] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+
+    data = b"%PDF-1.4\n"
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(data)
+        data += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offsets[number]:010d} 00000 n \n" for number in sorted(objects)).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info {info} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def large_pdf(tmp_path):
+    texts = [f"Page {i + 1} of the refund policy" for i in range(PARALLEL_MIN_PAGES + 4)]
+    return write_pdf(tmp_path / "policy.pdf", texts)
+
+
+def as_records(documents):
+    return [(document.page_content, document.metadata) for document in documents]
+
+
+def test_inline_and_pooled_extraction_agree(large_pdf, monkeypatch):
+    inline = load_pdf(large_pdf, workers=1)
+    # Small tasks so several workers each extract a slice
+    monkeypatch.setattr(pdf_extract, "PAGES_PER_TASK", 3)
+    try:
+        pooled = load_pdf(large_pdf, workers=2)
+        assert pdf_extract._pool is not None
+    finally:
+        pdf_extract._discard_pool()
+
+    assert as_records(pooled) == as_records(inline)
+    assert [document.metadata["page"] for document in pooled] == list(range(PARALLEL_MIN_PAGES + 4))
+    assert inline[4].page_content == "Page 5 of the refund policy"
+
+
+def test_metadata_matches_pypdfloader(large_pdf):
+    from langchain_community.document_loaders import PyPDFLoader
+
+    expected = PyPDFLoader(large_pdf).load()
+    loaded = load_pdf(large_pdf, workers=1)
+
+    assert as_records(loaded) == as_records(expected)
+    assert loaded[0].metadata["title"] == "Refund policy"
+    assert loaded[0].metadata["creationdate"] == "2024-01-02T03:04:05+00:00"
+    assert loaded[0].metadata["page_label"] == "1"
+
+
+def test_pypdf_is_the_default_backend(large_pdf, monkeypatch):
+    used = []
+    extractor = pdf_extract.get_extractor
+
+    def recording_extractor(backend=pdf_extract.DEFAULT_BACKEND):
+        used.append(backend)
+        return extractor(backend)
+
+    monkeypatch.setattr(pdf_extract, "get_extractor", recording_extractor)
+    load_pdf(large_pdf, workers=1)
+
+    assert used == ["pypdf"]
+    assert Settings.from_env({}).pdf_backend == "pypdf"
@@ -0,0 +1,137 @@
+"""
+Tests for the query caches, query anonymization, generation markers and
+prewarming in `utils.query_cache`.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tune_retrieval import HashingEmbeddingFunction
+from utils import query_cache
+from utils.query_cache import (
+    QueryCache, QueryLog, anonymize_query, bump_generation, clear_caches, generation, prewarm, store_scope
+)
+from utils.settings import Settings
+from utils.vector_search_clean import VectorSearch
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = QueryCache(max_entries=10, ttl_seconds=60)
+    cache.put("refund", 1)
+
+    clock.now += 59
+    assert cache.get("refund") == 1
+    clock.now += 2
+    assert "refund" not in cache
+    assert cache.get("refund") is None
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+def test_zero_entries_disables_the_cache_and_failures_are_not_cached(clock):
+    assert QueryCache(max_entries=0).get_or_compute("a", lambda: 1) == 1
+    assert len(QueryCache(max_entries=0)) == 0
+
+    cache = QueryCache(max_entries=10)
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("a", lambda: (_ for _ in ()).throw(RuntimeError("upstream down")))
+    assert cache.get_or_compute("a", lambda: 2) == 2
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("  Where is   MY Order? ", "where is my order?"),
+    ("mail jane.doe+shop@example.co.uk now", "mail <email> now"),
+    ("see https://shop.example.com/orders?id=1 and www.example.com", "see <url> and <url>"),
+    ("call +91 98765-43210 about card 4111 1111 1111 1111", "call <number> about card <number>"),
+    # Years, pages and versions are not personal data
+    ("refund policy 2024 page 12 v1.2.3", "refund policy 2024 page 12 v1.2.3"),
+])
+def test_anonymize_query(query, expected):
+    assert anonymize_query(query) == expected
+
+
+def test_prewarm_skips_anonymized_queries():
+    entries = [{"query": "refund policy"}, {"query": "status of order <number>"}, {"query": "mail <email>"}]
+    warmed = []
+
+    stats = prewarm(entries, lambda entry: warmed.append(entry["query"]) or 5, seconds=10, max_tokens=100)
+
+    assert warmed == ["refund policy"]
+    assert stats["anonymized"] == 2
+    assert stats["warmed"] == 1 and stats["tokens"] == 5
+
+
+def test_replayable_top_queries_leave_out_anonymized_ones(tmp_path):
+    log = QueryLog(str(tmp_path / "queries.jsonl"))
+    for query in ["order 1234567 status", "order 7654321 status", "refund policy"]:
+        log.append(query, "search")
+
+    assert [entry["query"] for entry in log.top_queries(2)] == ["order <number> status", "refund policy"]
+    assert [entry["query"] for entry in log.top_queries(2, replayable=True)] == ["refund policy"]
+
+
+def test_bump_generation_changes_the_marker(tmp_path):
+    scope = store_scope(str(tmp_path / "store"), "docs")
+    assert generation(scope) == (0, 0)
+
+    bump_generation(scope)
+    first = generation(scope)
+    bump_generation(scope)
+
+    assert first != (0, 0)
+    assert generation(scope) != first
+
+
+def test_writes_retire_cached_retrieval_results(tmp_path):
+    clear_caches()
+    settings = Settings(query_log_path=None)
+    vector_db = VectorSearch(
+        persist_directory=str(tmp_path / "store"), settings=settings,
+        client_mode="embedded", hnsw={}, embedding_function=HashingEmbeddingFunction(),
+    )
+    # A second handle on the same store, as another worker would hold
+    other = VectorSearch(
+        persist_directory=str(tmp_path / "store"), settings=settings,
+        client_mode="embedded", hnsw={}, embedding_function=HashingEmbeddingFunction(),
+    )
+    vector_db.upsert_source("/docs/a.txt", ["Refund policy for damaged items."], [{"source": "/docs/a.txt"}])
+
+    assert len(other.retrieve("refund policy")) == 1
+    assert len(other.retrieve("refund policy")) == 1
+    hits = query_cache.get_cache("retrieval").stats["hits"]
+
+    vector_db.upsert_source("/docs/b.txt", ["Refund policy for late deliveries."], [{"source": "/docs/b.txt"}])
+
+    assert len(other.retrieve("refund policy")) == 2
+    assert query_cache.get_cache("retrieval").stats["hits"] == hits
+    clear_caches()
@@ -0,0 +1,88 @@
+"""
+Tests for the metadata prefilter and exact-search helpers in `utils.retrieval`.
+"""
+
+import datetime
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.retrieval import build_where, exact_search, file_flag, owner_flags, parse_tags, source_flag, tag_key
+
+
+def test_no_filters_build_no_clause():
+    assert build_where() is None
+    assert build_where(source=[], tags=[]) is None
+
+
+def test_single_filter_is_not_wrapped():
+    assert build_where(page_from=2) == {"page": {"$gte": 2}}
+
+
+def test_paths_match_source_and_bare_names_match_file_name():
+    where = build_where(source=["/docs/a.pdf", "b.pdf"])
+
+    assert where == {"$or": [
+        {"source": {"$in": ["/docs/a.pdf"]}},
+        {source_flag("/docs/a.pdf"): True},
+        {"file_name": {"$in": ["b.pdf"]}},
+        {file_flag("b.pdf"): True},
+    ]}
+    assert build_where(source="b.pdf") == {"$or": [{"file_name": {"$in": ["b.pdf"]}}, {file_flag("b.pdf"): True}]}
+
+
+def test_owner_flags_match_path_and_file_name_filters():
+    flags = owner_flags("/docs/a.pdf")
+
+    assert flags == {source_flag("/docs/a.pdf"): True, file_flag("a.pdf"): True}
+    assert source_flag("/docs/a.pdf") != source_flag("/other/a.pdf")
+    assert all(key.startswith("owner_") for key in flags)
+
+
+def test_filters_are_combined_with_and():
+    where = build_where(source="a.pdf", page_from="1", page_to=3, tags=["HR Policy"])
+
+    assert where == {"$and": [
+        {"$or": [{"file_name": {"$in": ["a.pdf"]}}, {file_flag("a.pdf"): True}]},
+        {"page": {"$gte": 1}},
+        {"page": {"$lte": 3}},
+        {"tag_hr_policy": True},
+    ]}
+
+
+def test_upload_dates_become_timestamps():
+    after = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+    where = build_where(uploaded_after="2024-01-01T00:00:00+00:00", uploaded_before=after + 60)
+
+    assert where == {"$and": [{"uploaded_at": {"$gte": after}}, {"uploaded_at": {"$lte": after + 60}}]}
+
+
+def test_tags():
+    assert tag_key(" Q3 Report ") == "tag_q3_report"
+    assert parse_tags(" hr, policy ,, ") == ["hr", "policy"]
+    assert parse_tags(None) == []
+
+
+def test_exact_search_orders_by_cosine_distance():
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [-1.0, 0.0]]
+
+    indices, distances = exact_search([1.0, 0.1], embeddings, 3)
+
+    assert indices == [0, 2, 1]
+    assert distances == pytest.approx(sorted(distances))
+    assert distances[0] == pytest.approx(1 - 1 / np.sqrt(1.01), abs=1e-6)
+
+
+def test_exact_search_handles_small_and_degenerate_candidate_sets():
+    assert exact_search([1.0, 0.0], [], 5) == ([], [])
+
+    indices, distances = exact_search([1.0, 0.0], [[0.0, 0.0], [2.0, 0.0]], 5)
+
+    # A zero vector is at distance 1 instead of producing NaN
+    assert indices == [1, 0]
+    assert distances == pytest.approx([0.0, 1.0])
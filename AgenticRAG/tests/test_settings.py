@@ -0,0 +1,67 @@
+"""
+Tests for reading `utils.settings.Settings` from environment variables.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.settings import Settings
+
+
+def test_unset_variables_keep_the_defaults():
+    assert Settings.from_env({}) == Settings()
+
+
+def test_values_are_parsed_by_field_type():
+    settings = Settings.from_env({
+        "CHUNK_SIZE": "500", "RETRIEVAL_MMR_LAMBDA": "0.5", "RAG_MODEL": "gpt-4o-mini", "QUERY_CACHE_TTL_SECONDS": "30",
+    })
+
+    assert settings.chunk_size == 500
+    assert settings.mmr_lambda == 0.5
+    assert settings.model == "gpt-4o-mini"
+    assert settings.cache_ttl_seconds == 30.0
+
+
+@pytest.mark.parametrize("raw", ["ten", "1.5", ""])
+def test_bad_integers_name_the_variable(raw):
+    with pytest.raises(ValueError, match=f"CHUNK_SIZE must be an integer, got {raw!r}"):
+        Settings.from_env({"CHUNK_SIZE": raw})
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1", True), ("true", True), ("Yes", True), (" ON ", True),
+    ("0", False), ("false", False), ("NO", False), ("off", False),
+])
+def test_boolean_spellings(raw, expected):
+    assert Settings.from_env({"CACHE_ANSWERS": raw}).cache_answers is expected
+
+
+def test_unknown_boolean_spelling_is_rejected():
+    with pytest.raises(ValueError, match="CACHE_ANSWERS must be true or false"):
+        Settings.from_env({"CACHE_ANSWERS": "enabled"})
+
+
+@pytest.mark.parametrize("raw", ["", "none", "OFF", "null"])
+def test_empty_optional_values_are_none(raw):
+    settings = Settings.from_env({"QUERY_LOG_PATH": raw, "RETRIEVAL_DISTANCE_MARGIN": raw})
+
+    assert settings.query_log_path is None
+    assert settings.distance_margin is None
+
+
+def test_optional_values_keep_their_text():
+    settings = Settings.from_env({"QUERY_LOG_PATH": "logs/queries.sqlite3", "RETRIEVAL_MAX_DISTANCE": "0.4"})
+
+    assert settings.query_log_path == "logs/queries.sqlite3"
+    assert settings.max_distance == 0.4
+
+
+def test_overrides_win_and_are_validated():
+    assert Settings.from_env({"CHUNK_SIZE": "500"}, chunk_size=800).chunk_size == 800
+    with pytest.raises(ValueError, match="chunk_overlap must be between 0 and chunk_size"):
+        Settings.from_env({"CHUNK_SIZE": "100", "CHUNK_OVERLAP": "100"})
@@ -0,0 +1,70 @@
+"""
+Tests for the span queue, counters and shutdown of `utils.tracing.Tracer`.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tracing
+from utils.tracing import Tracer, shutdown_tracers
+
+
+class ListExporter:
+    def __init__(self, fail: bool = False):
+        self.spans = []
+        self.fail = fail
+        self.closed = False
+
+    def export(self, spans):
+        if self.fail:
+            raise RuntimeError("sink down")
+        self.spans.extend(spans)
+
+    def shutdown(self):
+        self.closed = True
+
+
+def record_spans(tracer: Tracer, threads: int = 8, per_thread: int = 50) -> int:
+    def work(worker: int):
+        for i in range(per_thread):
+            invocation_id = f"inv-{worker}-{i}"
+            key = ("tool", invocation_id, "search")
+            tracer._start(key, invocation_id, "tool", "search")
+            tracer._end(key)
+
+    pool = [threading.Thread(target=work, args=(worker,)) for worker in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return threads * per_thread
+
+
+def test_shutdown_flushes_every_queued_span():
+    sink, broken = ListExporter(), ListExporter(fail=True)
+    tracer = Tracer([sink, broken], max_queue=10000, batch_size=16, flush_interval=0.05)
+
+    count = record_spans(tracer)
+    shutdown_tracers()
+
+    assert len(sink.spans) == count
+    assert sink.closed and broken.closed
+    assert tracer.stats["sampled"] == tracer.stats["exported"] == count
+    assert tracer.stats["export_errors"] > 0
+    assert tracer not in tracing._tracers
+
+
+def test_full_queue_drops_and_counts_spans():
+    # No exporters, so no export thread drains the queue
+    tracer = Tracer([], max_queue=1)
+    for i in range(3):
+        tracer._open[("tool", i)] = {"start_time": 0.0, "attributes": {}}
+
+    for i in range(3):
+        tracer._end(("tool", i))
+
+    assert tracer.stats["dropped"] == 2
+    assert tracer._queue.qsize() == 1
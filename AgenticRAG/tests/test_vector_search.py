@@ -0,0 +1,135 @@
+"""
+Tests for source bookkeeping in `VectorSearch`, on a scratch store with
+offline hashing embeddings.
+
+    cd AgenticRAG
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tune_retrieval import HashingEmbeddingFunction
+from utils.retrieval import build_where, source_flag
+from utils.settings import Settings
+from utils.vector_search_clean import VectorSearch
+
+SHARED = "Shared boilerplate paragraph that both files contain."
+
+
+def chunk_metadata(source: str, page: int, references: str):
+    return {
+        "source": source, "file_name": os.path.basename(source), "page": page,
+        "duplicate_count": len(references.split(";")), "duplicate_sources": references,
+    }
+
+
+@pytest.fixture
+def vector_db(tmp_path):
+    settings = Settings(query_log_path=None)
+    return VectorSearch(
+        persist_directory=str(tmp_path / "store"), settings=settings,
+        client_mode="embedded", hnsw={}, embedding_function=HashingEmbeddingFunction(),
+    )
+
+
+def test_delete_one_of_two_sources_sharing_a_chunk(vector_db):
+    # As DocumentLoader.store_chunks files a deduplicated chunk under every source it stands in for
+    references = "/docs/a.pdf#page=1;/docs/b.pdf#page=3"
+    for source in ("/docs/a.pdf", "/docs/b.pdf"):
+        vector_db.upsert_source(source, [SHARED], [chunk_metadata("/docs/a.pdf", 1, references)])
+    shared_id = vector_db.chunk_id(SHARED)
+
+    assert vector_db.delete_source("/docs/a.pdf") == 0
+
+    metadata = vector_db.collection.get(ids=[shared_id], include=["metadatas"])["metadatas"][0]
+    assert metadata["source"] == "/docs/b.pdf"
+    assert metadata["file_name"] == "b.pdf"
+    assert metadata["page"] == 3
+    assert metadata["duplicate_sources"] == "/docs/b.pdf#page=3"
+    assert metadata["duplicate_count"] == 1
+    assert vector_db.list_sources() == {"/docs/b.pdf": 1}
+
+    assert vector_db.delete_source("/docs/b.pdf") == 1
+    assert vector_db.collection.count() == 0
+
+
+def test_upsert_drops_the_source_from_a_chunk_it_no_longer_shares(vector_db):
+    references = "/docs/a.pdf#page=1;/docs/b.pdf#page=3"
+    for source in ("/docs/a.pdf", "/docs/b.pdf"):
+        vector_db.upsert_source(source, [SHARED], [chunk_metadata("/docs/a.pdf", 1, references)])
+
+    stats = vector_db.upsert_source("/docs/a.pdf", ["New text of a."], [chunk_metadata("/docs/a.pdf", 1, "/docs/a.pdf#page=1")])
+
+    assert stats == {"added": 1, "unchanged": 0, "removed": 0}
+    metadata = vector_db.collection.get(ids=[vector_db.chunk_id(SHARED)], include=["metadatas"])["metadatas"][0]
+    assert metadata["source"] == "/docs/b.pdf"
+    assert metadata["duplicate_sources"] == "/docs/b.pdf#page=3"
+    assert metadata["duplicate_count"] == 1
+
+
+def stored_ids(vector_db, source):
+    return vector_db.collection.get(where=build_where(source=source), include=[])["ids"]
+
+
+def test_shared_chunk_is_found_under_every_owner(vector_db):
+    vector_db.upsert_source("/docs/a.pdf", [SHARED], [chunk_metadata("/docs/a.pdf", 1, "/docs/a.pdf#page=1")])
+    vector_db.upsert_source("/docs/b.pdf", [SHARED], [chunk_metadata("/docs/b.pdf", 3, "/docs/b.pdf#page=3")])
+    shared_id = vector_db.chunk_id(SHARED)
+
+    # The chunk stays filed under a.pdf but the prefilter finds it for b.pdf by path and by name
+    assert vector_db.collection.get(ids=[shared_id], include=["metadatas"])["metadatas"][0]["source"] == "/docs/a.pdf"
+    assert stored_ids(vector_db, "/docs/b.pdf") == [shared_id]
+    assert stored_ids(vector_db, "b.pdf") == [shared_id]
+
+    vector_db.delete_source("/docs/b.pdf")
+
+    metadata = vector_db.collection.get(ids=[shared_id], include=["metadatas"])["metadatas"][0]
+    assert source_flag("/docs/b.pdf") not in metadata
+    assert stored_ids(vector_db, "b.pdf") == []
+    assert stored_ids(vector_db, "/docs/a.pdf") == [shared_id]
+
+
+def test_upsert_replaces_legacy_chunk_ids_of_the_same_file(vector_db):
+    # IDs and metadata as written before chunk IDs were content-addressed
+    vector_db.add_documents(
+        texts=["Old first chunk of a.", "Old second chunk of a.", "Chunk of another file."],
+        metadatas=[{"source": "C:\\Temp\\tmp1.pdf", "chunk_id": 0}, {"source": "C:\\Temp\\tmp1.pdf", "chunk_id": 1}, {"source": "b.pdf", "chunk_id": 0}],
+        ids=["a.pdf_chunk_0", "a.pdf_chunk_1", "b.pdf_chunk_0"],
+    )
+
+    stats = vector_db.upsert_source("/uploads/a.pdf", ["New chunk of a."], [{"source": "/uploads/a.pdf"}])
+
+    assert stats == {"added": 1, "unchanged": 0, "removed": 2}
+    assert sorted(vector_db.collection.get(include=[])["ids"]) == sorted(["b.pdf_chunk_0", vector_db.chunk_id("New chunk of a.")])
+    assert vector_db.list_sources() == {"/uploads/a.pdf": 1, "b.pdf": 1}
+
+    assert vector_db.delete_source("b.pdf") == 1
+    assert vector_db.collection.count() == 1
+
+
+def test_retrieve_filters_on_upload_time(vector_db):
+    vector_db.upsert_source("/docs/old.txt", ["Refund policy from last year."], [{"source": "/docs/old.txt", "uploaded_at": 1000.0}])
+    vector_db.upsert_source("/docs/new.txt", ["Refund policy from this year."], [{"source": "/docs/new.txt", "uploaded_at": 2000.0}])
+
+    before = vector_db.retrieve("refund policy", uploaded_before=1500.0)
+    after = vector_db.retrieve("refund policy", uploaded_after=1500.0)
+
+    assert [result["metadata"]["source"] for result in before] == ["/docs/old.txt"]
+    assert [result["metadata"]["source"] for result in after] == ["/docs/new.txt"]
+
+
+def test_snapshot_import_restores_the_exported_namespace(vector_db, tmp_path):
+    vector_db.upsert_source("/docs/a.pdf", [SHARED], [chunk_metadata("/docs/a.pdf", 1, "/docs/a.pdf#page=1")])
+    vector_db.export_snapshot(str(tmp_path / "snapshot"))
+    vector_db.upsert_source("/docs/b.pdf", ["Text only in b."], [{"source": "/docs/b.pdf"}])
+
+    assert vector_db.import_snapshot(str(tmp_path / "snapshot")) == 1
+
+    assert vector_db.collection.get(include=[])["ids"] == [vector_db.chunk_id(SHARED)]
+    assert vector_db.list_sources() == {"/docs/a.pdf": 1}
+    assert vector_db.list_namespaces() == ["default"]
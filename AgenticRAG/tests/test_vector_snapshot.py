@@ -0,0 +1,107 @@
+"""
+Round-trip tests for `utils.vector_snapshot` on an in-memory Chroma client.
+"""
+
+import os
+import sys
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import vector_snapshot
+from utils.vector_snapshot import Snapshot, SnapshotError, export_collection, restore_collection
+
+RECORDS = {
+    "ids": ["a", "b", "c"],
+    "documents": ["Grüße aus Köln", "東京の天気は晴れ", "Plain ASCII text"],
+    # Sparse columns: no two records carry the same keys
+    "metadatas": [{"page": 1, "source": "/docs/ä.pdf"}, {"tag_hr": True}, {"uploaded_at": 1700000000.5}],
+    "embeddings": [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.6, 0.8]],
+}
+
+
+@pytest.fixture
+def client():
+    # The in-memory client is shared within the process, so tests use their own collection names
+    return chromadb.EphemeralClient()
+
+
+def collection_name(label: str) -> str:
+    return f"{label}-{uuid.uuid4().hex[:8]}"
+
+
+def contents(collection):
+    records = collection.get(include=["documents", "metadatas", "embeddings"])
+    order = np.argsort(records["ids"])
+    return {
+        "ids": [records["ids"][i] for i in order],
+        "documents": [records["documents"][i] for i in order],
+        "metadatas": [records["metadatas"][i] for i in order],
+        "embeddings": np.asarray(records["embeddings"])[order] if len(order) else [],
+    }
+
+
+def test_round_trip_keeps_text_sparse_metadata_and_vectors(client, tmp_path):
+    source = client.create_collection(collection_name("source"), metadata={"hnsw:space": "cosine"})
+    source.add(**RECORDS)
+
+    export_collection(source, str(tmp_path), embedding_model="test:model", extra_files={"index.json": {"ä": ["a"]}})
+    snapshot = Snapshot(str(tmp_path))
+    name = collection_name("target")
+
+    assert restore_collection(client, name, snapshot, metadata={"hnsw:space": "cosine"}) == 3
+    restored = contents(client.get_collection(name))
+    assert restored["ids"] == RECORDS["ids"]
+    assert restored["documents"] == RECORDS["documents"]
+    assert restored["metadatas"] == RECORDS["metadatas"]
+    np.testing.assert_allclose(restored["embeddings"], RECORDS["embeddings"], rtol=1e-6)
+    assert snapshot.extra_file("index.json") == {"ä": ["a"]}
+    assert snapshot.search([0.0, 0.0, 1.0], k=1)[0]["id"] == "c"
+
+
+def test_empty_collection_round_trip_replaces_the_live_data(client, tmp_path):
+    export_collection(client.create_collection(collection_name("empty")), str(tmp_path), embedding_model="test:model")
+    snapshot = Snapshot(str(tmp_path))
+    live = client.create_collection(collection_name("live"))
+    live.add(**RECORDS)
+
+    assert len(snapshot) == 0
+    assert restore_collection(client, live.name, snapshot) == 0
+    assert client.get_collection(live.name).count() == 0
+
+
+def test_checksum_mismatch_is_rejected(client, tmp_path):
+    source = client.create_collection(collection_name("source"))
+    source.add(**RECORDS)
+    export_collection(source, str(tmp_path), embedding_model="test:model")
+
+    with open(tmp_path / "documents.bin", "r+b") as f:
+        f.write(b"X")
+
+    with pytest.raises(SnapshotError, match="Checksum mismatch"):
+        Snapshot(str(tmp_path))
+
+
+def test_failed_load_leaves_the_live_collection_in_place(client, tmp_path, monkeypatch):
+    source = client.create_collection(collection_name("source"))
+    source.add(**RECORDS)
+    export_collection(source, str(tmp_path), embedding_model="test:model")
+    live = client.create_collection(collection_name("live"))
+    live.add(ids=["old"], documents=["Old text"], embeddings=[[1.0, 1.0, 0.0]])
+    names_before = {c.name for c in client.list_collections()}
+
+    def partial_load(collection, snapshot, batch_size):
+        collection.add(**next(snapshot.batches(1)))
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(vector_snapshot, "import_snapshot", partial_load)
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        restore_collection(client, live.name, Snapshot(str(tmp_path)))
+
+    assert client.get_collection(live.name).get()["ids"] == ["old"]
+    assert {c.name for c in client.list_collections()} == names_before
@@ -0,0 +1,84 @@
+"""
+Tests for `DocumentWatcher` on a scratch directory, with upsert/delete
+callbacks that only count calls.
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("watchdog")
+
+from utils.watcher import DocumentWatcher
+
+DEBOUNCE = 0.1
+# Long enough for the observer to deliver events and the debounce to fire
+SETTLE = 1.0
+
+
+@pytest.fixture
+def watched(tmp_path):
+    calls = Counter()
+    directory = tmp_path / "uploads"
+    watcher = DocumentWatcher(
+        [str(directory)],
+        upsert=lambda path: calls.update([("upsert", os.path.basename(path))]),
+        delete=lambda path: calls.update([("delete", os.path.basename(path))]),
+        state_path=str(tmp_path / "watch_state.json"),
+        debounce=DEBOUNCE,
+    ).start()
+    yield watcher, directory, calls
+    watcher.stop()
+
+
+def test_new_and_edited_files_are_indexed_once_per_burst(watched):
+    watcher, directory, calls = watched
+    path = directory / "notes.txt"
+
+    for i in range(5):
+        path.write_text(f"draft {i}")
+    time.sleep(SETTLE)
+    assert calls == Counter({("upsert", "notes.txt"): 1})
+
+    path.unlink()
+    time.sleep(SETTLE)
+    assert calls[("delete", "notes.txt")] == 1
+
+
+def test_claimed_file_is_left_to_its_writer(watched):
+    watcher, directory, calls = watched
+    path = directory / "report.txt"
+
+    with watcher.claim(str(path)):
+        # A slow, non-atomic write that outlasts the debounce, then the writer's own indexing
+        with open(path, "w") as f:
+            for i in range(3):
+                f.write(f"part {i}\n")
+                f.flush()
+                time.sleep(DEBOUNCE * 3)
+    time.sleep(SETTLE)
+
+    assert calls == Counter()
+    assert str(path) in watcher.state
+
+    path.write_text("edited later")
+    time.sleep(SETTLE)
+    assert calls == Counter({("upsert", "report.txt"): 1})
+
+
+def test_failed_claim_hands_the_file_to_the_watcher(watched):
+    watcher, directory, calls = watched
+    path = directory / "broken.txt"
+
+    with pytest.raises(RuntimeError):
+        with watcher.claim(str(path)):
+            path.write_text("written, then indexing failed")
+            raise RuntimeError("indexing failed")
+    time.sleep(SETTLE)
+
+    assert calls == Counter({("upsert", "broken.txt"): 1})
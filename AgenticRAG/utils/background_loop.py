@@ -0,0 +1,74 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from typing import AsyncIterator, Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class BackgroundLoop:
+    """
+    Long-lived asyncio event loop on a daemon thread.
+
+    Synchronous callers (e.g. Streamlit's script thread) submit coroutines
+    to it instead of spinning up a loop per call, so async clients and their
+    keep-alive connections, which are bound to one loop, survive between calls.
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedule a coroutine on the loop; returns a thread-safe future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: float = None) -> T:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        return self.submit(coro).result(timeout)
+
+    def stream(self, items: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Iterate an async generator from a synchronous thread, item by item as
+        they are produced. Closing the iterator early cancels the generator.
+        """
+        buffer: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in items:
+                    buffer.put(item)
+            except Exception as e:
+                buffer.put(_Failure(e))
+            finally:
+                buffer.put(_DONE)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = buffer.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,134 @@
+import atexit
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import chromadb
+from chromadb.config import Settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: index updates are not locked across processes
+    fcntl = None
+
+# How processes reach the vector store (CHROMA_MODE):
+#   embedded  open the persist directory in-process (single process only)
+#   http      talk to one `chroma run --path <persist dir>` server that owns the index
+#   snapshot  read-only private copy of the persist directory, taken at startup
+CLIENT_MODES = ("embedded", "http", "snapshot")
+CHROMA_SQLITE_FILE = "chroma.sqlite3"
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """Raised on writes through a read-only (snapshot) vector store"""
+
+
+def client_mode_from_env() -> str:
+    mode = os.getenv("CHROMA_MODE", "embedded").strip().lower()
+    if mode not in CLIENT_MODES:
+        raise ValueError(f"CHROMA_MODE must be one of {', '.join(CLIENT_MODES)}, got {mode!r}")
+    return mode
+
+
+# Snapshot copies taken by this process, by persist directory; removed at exit
+_snapshots: Dict[str, str] = {}
+_snapshots_lock = threading.Lock()
+
+
+def take_snapshot(persist_directory: str, snapshot_root: Optional[str] = None) -> str:
+    """
+    Copy a Chroma persist directory for read-only use and return the copy's path.
+    The SQLite file goes through the online backup API, so the copy is
+    consistent even while a writer is committing. Each process copies a
+    directory once; later calls return the same copy, which is deleted
+    when the process exits.
+    """
+    key = os.path.abspath(persist_directory)
+    with _snapshots_lock:
+        if key in _snapshots and os.path.isdir(_snapshots[key]):
+            return _snapshots[key]
+        snapshot_root = snapshot_root or os.getenv("CHROMA_SNAPSHOT_DIR") or tempfile.gettempdir()
+        os.makedirs(snapshot_root, exist_ok=True)
+        destination = tempfile.mkdtemp(prefix=f"chroma-snapshot-{os.getpid()}-", dir=snapshot_root)
+        if not _snapshots:
+            atexit.register(remove_snapshots)
+        _snapshots[key] = destination
+
+        shutil.copytree(
+            persist_directory,
+            destination,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(CHROMA_SQLITE_FILE + "*", "*.lock"),
+        )
+        source_db = os.path.join(persist_directory, CHROMA_SQLITE_FILE)
+        if os.path.exists(source_db):
+            with sqlite3.connect(f"file:{source_db}?mode=ro", uri=True) as source, \
+                    sqlite3.connect(os.path.join(destination, CHROMA_SQLITE_FILE)) as target:
+                source.backup(target)
+        return destination
+
+
+def remove_snapshots():
+    """Delete the snapshot copies this process took"""
+    with _snapshots_lock:
+        for path in _snapshots.values():
+            shutil.rmtree(path, ignore_errors=True)
+        _snapshots.clear()
+
+
+def create_client(persist_directory: str, mode: Optional[str] = None):
+    """
+    Chroma client for the configured mode. Returns (client, path) where path
+    is the directory actually opened: the persist directory, or the
+    snapshot copy in snapshot mode (None in http mode).
+    """
+    mode = mode or client_mode_from_env()
+    settings = Settings(anonymized_telemetry=False, allow_reset=True)
+
+    if mode == "http":
+        client = chromadb.HttpClient(
+            host=os.getenv("CHROMA_HOST", "localhost"),
+            port=int(os.getenv("CHROMA_PORT", "8000")),
+            settings=settings,
+        )
+        return client, None
+    if mode == "snapshot":
+        if not os.path.isdir(persist_directory):
+            raise FileNotFoundError(f"No vector store to snapshot at {persist_directory}")
+        path = take_snapshot(persist_directory)
+        print(f"Opened read-only snapshot of {persist_directory} at {path}")
+        return chromadb.PersistentClient(path=path, settings=settings), path
+    if mode == "embedded":
+        return chromadb.PersistentClient(path=persist_directory, settings=settings), persist_directory
+    raise ValueError(f"Unknown Chroma client mode: {mode}")
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 30.0):
+    """
+    Exclusive advisory lock on `path`, so processes sharing a directory
+    serialize read-modify-write updates of files in it.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a+") as handle:
+        if fcntl is None:
+            yield
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {path}")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
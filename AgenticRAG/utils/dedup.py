@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import re
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.chroma_client import file_lock
+
+# Mersenne prime used for the universal hash family behind the MinHash permutations
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class ChunkDeduplicator:
+    """Collapse exact and near-duplicate chunks before they are embedded.
+
+    Exact duplicates are detected with a hash of the normalized text. Near
+    duplicates are detected with MinHash signatures over word shingles and
+    LSH banding, so each chunk is only compared against a handful of
+    candidates instead of every chunk seen so far. With a `SignatureIndex`
+    chunks are also matched against those stored by earlier calls.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Deterministic permutation coefficients so signatures are stable across runs
+        self._perms = []
+        for i in range(num_perm):
+            seed = hashlib.sha1(f"minhash-{i}".encode()).digest()
+            a = int.from_bytes(seed[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(seed[8:16], "big") % _MERSENNE_PRIME
+            self._perms.append((a, b))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase and collapse whitespace so formatting noise does not defeat matching"""
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def _shingles(self, normalized: str) -> set:
+        words = normalized.split(" ")
+        if len(words) <= self.shingle_size:
+            return {zlib.crc32(normalized.encode())}
+        return {
+            zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode())
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a chunk"""
+        shingles = self._shingles(self.normalize(text))
+        return tuple(
+            min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingles)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimate the Jaccard similarity of two chunks from their signatures"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+    def _band_keys(self, sig: Tuple[int, ...]) -> List[Tuple]:
+        return [(band, sig[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def deduplicate(
+        self,
+        chunks: List,
+        index: Optional["SignatureIndex"] = None,
+        lookup: Optional[Callable[[str, object], Optional[str]]] = None,
+    ) -> Tuple[List, Dict[str, int]]:
+        """Collapse duplicate LangChain chunks into the first occurrence.
+
+        The kept chunk records every source it stands in for in its metadata
+        (``duplicate_sources`` as a ``;``-separated string, since Chroma only
+        accepts scalar metadata values, and ``duplicate_count``).
+
+        With an ``index`` of stored chunks, a chunk without a match in the
+        batch is compared against the stored ones too. ``lookup(chunk_id,
+        chunk)`` returns the text of a stored near duplicate the chunk may
+        stand in for (None to skip it); the chunk then takes that text, so it
+        maps onto the stored chunk instead of being embedded again. New kept
+        chunks are added to the index, which the caller saves once they are
+        stored.
+
+        Returns the kept chunks and a stats dict with ``input``, ``kept``,
+        ``exact``, ``near``, ``stored`` (kept chunks that reuse a stored one)
+        and ``saved`` (embeddings avoided).
+        """
+        kept = []
+        signatures = []
+        references: List[List[str]] = []
+        exact_index: Dict[str, int] = {}
+        buckets: Dict[Tuple, List[int]] = {}
+        stats = {"input": len(chunks), "kept": 0, "exact": 0, "near": 0, "stored": 0, "saved": 0}
+
+        for chunk in chunks:
+            normalized = self.normalize(chunk.page_content)
+            reference = self._reference(chunk.metadata)
+            digest = hashlib.sha1(normalized.encode()).hexdigest()
+            stored = False
+
+            match = exact_index.get(digest)
+            if match is not None:
+                stats["exact"] += 1
+            else:
+                sig = self.signature(chunk.page_content)
+                band_keys = self._band_keys(sig)
+                candidates = {idx for key in band_keys for idx in buckets.get(key, [])}
+                for idx in sorted(candidates):
+                    if self.similarity(sig, signatures[idx]) >= self.threshold:
+                        match = idx
+                        stats["near"] += 1
+                        break
+                if match is None and index is not None and lookup is not None:
+                    for chunk_id in index.candidates(sig):
+                        if self.similarity(sig, index.signature(chunk_id)) < self.threshold:
+                            continue
+                        text = lookup(chunk_id, chunk)
+                        if text is not None:
+                            chunk.page_content = text
+                            stats["stored"] += 1
+                            stored = True
+                            break
+
+            if match is not None:
+                if reference not in references[match]:
+                    references[match].append(reference)
+                continue
+
+            idx = len(kept)
+            kept.append(chunk)
+            signatures.append(sig)
+            references.append([reference])
+            exact_index[digest] = idx
+            for key in band_keys:
+                buckets.setdefault(key, []).append(idx)
+            if index is not None and not stored:
+                index.add(index.key(chunk.page_content), sig)
+
+        for chunk, refs in zip(kept, references):
+            chunk.metadata["duplicate_count"] = len(refs)
+            chunk.metadata["duplicate_sources"] = ";".join(refs)
+
+        stats["kept"] = len(kept)
+        stats["saved"] = stats["input"] - stats["kept"] + stats["stored"]
+        return kept, stats
+
+    @staticmethod
+    def sources_of(metadata: Dict) -> List[str]:
+        """Distinct sources a kept chunk stands in for, in first-seen order"""
+        references = metadata.get("duplicate_sources")
+        if not references:
+            return [str(metadata.get("source", "unknown"))]
+        sources = []
+        for reference in references.split(";"):
+            source = reference.rsplit("#page=", 1)[0]
+            if source not in sources:
+                sources.append(source)
+        return sources
+
+    @staticmethod
+    def _reference(metadata: Dict) -> str:
+        source = metadata.get("source", "unknown")
+        page = metadata.get("page")
+        return f"{source}#page={page}" if page is not None else str(source)
+
+
+class SignatureIndex:
+    """
+    MinHash signatures of the chunks in a store, keyed by chunk ID and kept
+    in a JSON file, so near duplicates are found across ingest calls and
+    processes and not only within one batch. Entries of chunks deleted
+    since are dropped when a lookup finds them missing (`discard`).
+    """
+
+    def __init__(self, path: str, deduplicator: ChunkDeduplicator, key: Callable[[str], str]):
+        self.path = path
+        self.key = key
+        self._deduplicator = deduplicator
+        self._params = {"num_perm": deduplicator.num_perm, "bands": deduplicator.bands, "shingle_size": deduplicator.shingle_size}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple, List[str]] = {}
+        self._added: Dict[str, Tuple[int, ...]] = {}
+        self._discarded = set()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _load(self):
+        """Read the file, then re-apply changes not saved yet"""
+        stored = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Signatures made with other MinHash parameters cannot be compared
+            if data.get("params") == self._params:
+                stored = data["signatures"]
+        self._signatures = {chunk_id: tuple(sig) for chunk_id, sig in stored.items() if chunk_id not in self._discarded}
+        self._signatures.update(self._added)
+        self._buckets = {}
+        for chunk_id, sig in self._signatures.items():
+            for key in self._deduplicator._band_keys(sig):
+                self._buckets.setdefault(key, []).append(chunk_id)
+
+    def signature(self, chunk_id: str) -> Tuple[int, ...]:
+        return self._signatures[chunk_id]
+
+    def candidates(self, sig: Tuple[int, ...]) -> List[str]:
+        """Chunk IDs sharing at least one LSH band with `sig`"""
+        found = []
+        for key in self._deduplicator._band_keys(sig):
+            for chunk_id in self._buckets.get(key, []):
+                if chunk_id not in found and chunk_id in self._signatures:
+                    found.append(chunk_id)
+        return found
+
+    def add(self, chunk_id: str, sig: Tuple[int, ...]):
+        self._signatures[chunk_id] = self._added[chunk_id] = tuple(sig)
+        self._discarded.discard(chunk_id)
+        for key in self._deduplicator._band_keys(sig):
+            self._buckets.setdefault(key, []).append(chunk_id)
+
+    def discard(self, chunk_id: str):
+        self._signatures.pop(chunk_id, None)
+        self._added.pop(chunk_id, None)
+        self._discarded.add(chunk_id)
+
+    def save(self):
+        """Merge this index's changes into the file, atomically and under a lock"""
+        if not self._added and not self._discarded:
+            return
+        with file_lock(self.path + ".lock"):
+            self._load()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"params": self._params, "signatures": self._signatures}, f)
+            os.replace(tmp_path, self.path)
+        self._added, self._discarded = {}, set()
@@ -1,17 +1,30 @@
 import os
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
+import time
+from typing import List, Optional
+from langchain_community.document_loaders import TextLoader, Docx2txtLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from utils.vector_search_clean import VectorSearch
+from utils.dedup import ChunkDeduplicator, SignatureIndex
+from utils.pdf_extract import load_pdf
+from utils.retrieval import tag_key
+from utils.settings import Settings, get_settings
+
+# File types load_file can read
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.docx', '.doc')
 
 
 class DocumentLoader:
-    def __init__(self, vector_db: VectorSearch = None):
-        """Initialize document loader with vector database"""
-        self.vector_db = vector_db if vector_db else VectorSearch()
+    def __init__(self, vector_db: VectorSearch = None, deduplicate: bool = True, dedup_threshold: float = 0.85, settings: Settings = None):
+        """Initialize document loader with vector database; chunking comes from `settings`"""
+        self.settings = settings or (vector_db.settings if vector_db else get_settings())
+        self.vector_db = vector_db if vector_db else VectorSearch(settings=self.settings)
+        self.deduplicator = ChunkDeduplicator(threshold=dedup_threshold) if deduplicate else None
+        self.last_dedup_stats = None
+        # Signatures of stored chunks, read per split and saved once the chunks are stored
+        self._signature_index = None
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=self.settings.chunk_size,
+            chunk_overlap=self.settings.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
@@ -21,7 +34,7 @@ class DocumentLoader:
         file_extension = os.path.splitext(file_path)[1].lower()
         
         if file_extension == '.pdf':
-            loader = PyPDFLoader(file_path)
+            return load_pdf(file_path, backend=self.settings.pdf_backend, workers=self.settings.pdf_workers)
         elif file_extension == '.txt':
             loader = TextLoader(file_path, encoding='utf-8')
         elif file_extension in ['.docx', '.doc']:
@@ -33,44 +46,115 @@ class DocumentLoader:
         return documents
     
     def split_documents(self, documents: List) -> List:
-        """Split documents into chunks"""
+        """Split documents into chunks, collapsing duplicate chunks"""
         chunks = self.text_splitter.split_documents(documents)
+
+        # Number chunks per source before deduplication so IDs stay stable
+        counters = {}
+        for chunk in chunks:
+            source = chunk.metadata.get("source", "unknown")
+            chunk.metadata["chunk_id"] = counters.get(source, 0)
+            counters[source] = chunk.metadata["chunk_id"] + 1
+
+        if self.deduplicator:
+            self._signature_index = SignatureIndex(
+                self.vector_db.signature_index_path, self.deduplicator, key=VectorSearch.chunk_id
+            )
+            chunks, self.last_dedup_stats = self.deduplicator.deduplicate(
+                chunks, index=self._signature_index, lookup=self._stored_text
+            )
+            print(
+                f"Deduplication: {self.last_dedup_stats['exact']} exact and "
+                f"{self.last_dedup_stats['near']} near duplicates collapsed, "
+                f"{self.last_dedup_stats['stored']} matched stored chunks, "
+                f"{self.last_dedup_stats['saved']} embeddings saved"
+            )
         return chunks
     
-    def process_and_store(self, file_path: str):
-        """Load, split, and store a document in the vector database"""
+    def _stored_text(self, chunk_id: str, chunk) -> Optional[str]:
+        """
+        Text of a stored near duplicate `chunk` can stand in for. None when
+        the chunk is gone, or already belongs to the chunk's own source: a
+        re-ingested file keeps its edits instead of folding them into its
+        previous version.
+        """
+        if chunk_id in self.vector_db.source_chunk_ids(chunk.metadata.get("source", "unknown")):
+            return None
+        found = self.vector_db.collection.get(ids=[chunk_id], include=["documents"])
+        if not found["ids"]:
+            self._signature_index.discard(chunk_id)
+            return None
+        return found["documents"][0]
+    
+    def store_chunks(self, chunks: List, tags: List[str] = None) -> int:
+        """Upsert already split chunks into the vector database, grouped by source"""
+        uploaded_at = time.time()
+        by_source = {}
+        for chunk in chunks:
+            source = chunk.metadata.get("source", "unknown")
+            metadata = {
+                "source": source,
+                "file_name": os.path.basename(source),
+                "page": chunk.metadata.get("page", 0),
+                "chunk_id": chunk.metadata["chunk_id"],
+                "uploaded_at": uploaded_at,
+                "duplicate_count": chunk.metadata.get("duplicate_count", 1),
+                "duplicate_sources": chunk.metadata.get("duplicate_sources", ""),
+            }
+            for tag in tags or []:
+                metadata[tag_key(tag)] = True
+            # A collapsed chunk belongs to every source it stands in for
+            for source in ChunkDeduplicator.sources_of(chunk.metadata):
+                texts, metadatas = by_source.setdefault(source, ([], []))
+                texts.append(chunk.page_content)
+                metadatas.append(metadata)
+        
+        for source, (texts, metadatas) in by_source.items():
+            self.vector_db.upsert_source(source, texts=texts, metadatas=metadatas)
+        if self._signature_index is not None:
+            self._signature_index.save()
+            self._signature_index = None
+        return len(chunks)
+    
+    def process_and_store(self, file_path: str, source: str = None, tags: List[str] = None):
+        """
+        Load, split, and store a document in the vector database.
+        Re-processing the same source replaces its previous chunks; pass
+        `source` when the file lives at a temporary path. `tags` are stored
+        as filterable metadata.
+        """
+        source = source or os.path.abspath(file_path)
         print(f"Processing file: {file_path}")
         
         # Load document
         documents = self.load_file(file_path)
+        for document in documents:
+            document.metadata["source"] = source
         print(f"Loaded {len(documents)} documents")
         
         # Split into chunks
         chunks = self.split_documents(documents)
         print(f"Split into {len(chunks)} chunks")
         
-        # Prepare data for vector DB
-        texts = [chunk.page_content for chunk in chunks]
-        metadatas = [
-            {
-                "source": file_path,
-                "page": chunk.metadata.get("page", 0),
-                "chunk_id": i
-            }
-            for i, chunk in enumerate(chunks)
-        ]
-        ids = [f"{os.path.basename(file_path)}_chunk_{i}" for i in range(len(chunks))]
-        
-        # Store in vector database
-        self.vector_db.add_documents(texts=texts, metadatas=metadatas, ids=ids)
-        
-        print(f"Successfully stored {len(chunks)} chunks in vector database")
-        return len(chunks)
+        stored = self.store_chunks(chunks, tags=tags)
+        print(f"Successfully stored {stored} chunks in vector database")
+        return stored
+    
+    def upsert_source(self, file_path: str, source: str = None, tags: List[str] = None):
+        """Re-ingest one document, touching only its own chunks"""
+        return self.process_and_store(file_path, source=source, tags=tags)
+    
+    def delete_source(self, source: str):
+        """Remove one document's chunks from the vector database"""
+        return self.vector_db.delete_source(os.path.abspath(source) if os.path.exists(source) else source)
     
     def process_directory(self, directory_path: str):
-        """Process all supported files in a directory"""
-        supported_extensions = ['.pdf', '.txt', '.docx', '.doc']
-        total_chunks = 0
+        """Process all supported files in a directory.
+
+        Files are split as one batch so boilerplate repeated across files is
+        deduplicated before anything is embedded.
+        """
+        documents = []
         
         for filename in os.listdir(directory_path):
             file_path = os.path.join(directory_path, filename)
@@ -78,13 +162,22 @@ class DocumentLoader:
             if os.path.isfile(file_path):
                 file_extension = os.path.splitext(filename)[1].lower()
                 
-                if file_extension in supported_extensions:
+                if file_extension in SUPPORTED_EXTENSIONS:
                     try:
-                        chunks = self.process_and_store(file_path)
-                        total_chunks += chunks
+                        loaded = self.load_file(file_path)
+                        for document in loaded:
+                            document.metadata["source"] = os.path.abspath(file_path)
+                        documents.extend(loaded)
                     except Exception as e:
                         print(f"Error processing {filename}: {str(e)}")
         
+        if not documents:
+            print("\nTotal chunks stored: 0")
+            return 0
+        
+        chunks = self.split_documents(documents)
+        total_chunks = self.store_chunks(chunks)
+        
         print(f"\nTotal chunks stored: {total_chunks}")
         return total_chunks
 
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+
+class ChatModelPool:
+    """
+    Process-level pool of ChatOpenAI clients keyed by model and settings.
+
+    All pooled clients share one sync and one async httpx client, so
+    keep-alive connections to the API are reused across requests and models.
+    The pool keeps at most `max_size` clients and evicts the least recently
+    used one; evicting is cheap because connections live in the shared
+    httpx clients, not in the ChatOpenAI objects.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 16,
+        max_connections: int = 64,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+    ):
+        self.max_size = max_size
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self._clients: "OrderedDict[tuple, ChatOpenAI]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, api_key: Optional[str] = None, **settings: Any) -> ChatOpenAI:
+        """Return the pooled client for (model, settings), creating it on first use"""
+        key = (model, api_key, tuple(sorted(settings.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            kwargs = dict(settings)
+            if api_key:
+                kwargs["openai_api_key"] = api_key
+            client = ChatOpenAI(
+                model=model,
+                http_client=self.http_client,
+                http_async_client=self.http_async_client,
+                **kwargs
+            )
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+            return client
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_chat_model(model: str, api_key: Optional[str] = None, **settings: Any) -> ChatOpenAI:
+    """Return a pooled ChatOpenAI client from the process-wide pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ChatModelPool()
+    return _default_pool.get(model, api_key=api_key, **settings)
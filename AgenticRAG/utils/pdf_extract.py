@@ -0,0 +1,241 @@
+"""
+PDF text extraction with selectable backends and page-parallel parsing.
+
+Backends (PDF_BACKEND):
+    pypdf      pure Python, always installed; what PyPDFLoader used (default)
+    pymupdf    MuPDF bindings (`pip install pymupdf`), usually the fastest
+    pypdfium2  PDFium bindings (`pip install pypdfium2`)
+    auto       the first installed of pymupdf, pypdfium2, pypdf
+Optional backends are only imported when selected; their page text differs
+from pypdf's, so switching backends changes the stored chunks. Large PDFs
+are split into page ranges extracted by a shared process pool, so a single
+big file uses every core; small ones are extracted inline. Document
+metadata is read with pypdf whatever the backend, as PyPDFLoader did.
+"""
+
+import datetime
+import multiprocessing
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+PDF_BACKENDS = ("pypdf", "pymupdf", "pypdfium2")
+DEFAULT_BACKEND = "pypdf"
+# Preference order of `auto`, fastest first
+AUTO_ORDER = ("pymupdf", "pypdfium2", "pypdf")
+# PDFs with fewer pages are extracted inline; process start-up would dominate
+PARALLEL_MIN_PAGES = 16
+# Pages per task handed to a worker
+PAGES_PER_TASK = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class PdfExtractor(ABC):
+    """Extracts the text of a page range of a PDF file"""
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            cls._module()
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    @abstractmethod
+    def _module():
+        """Import and return the backend's module; raises ImportError when it is not installed"""
+
+    @abstractmethod
+    def page_count(self, path: str) -> int:
+        """Number of pages of the PDF"""
+
+    @abstractmethod
+    def extract(self, path: str, start: int, stop: int) -> List[str]:
+        """Text of pages `start` to `stop` (exclusive), one string per page"""
+
+
+class PypdfExtractor(PdfExtractor):
+    name = "pypdf"
+
+    @staticmethod
+    def _module():
+        import pypdf
+        return pypdf
+
+    def page_count(self, path: str) -> int:
+        return len(self._module().PdfReader(path).pages)
+
+    def extract(self, path: str, start: int, stop: int) -> List[str]:
+        reader = self._module().PdfReader(path)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+class PymupdfExtractor(PdfExtractor):
+    name = "pymupdf"
+
+    @staticmethod
+    def _module():
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf  # releases before 1.24 only ship the `fitz` name
+        return pymupdf
+
+    def page_count(self, path: str) -> int:
+        with self._module().open(path) as document:
+            return document.page_count
+
+    def extract(self, path: str, start: int, stop: int) -> List[str]:
+        with self._module().open(path) as document:
+            return [document[i].get_text() for i in range(start, stop)]
+
+
+class Pypdfium2Extractor(PdfExtractor):
+    name = "pypdfium2"
+
+    @staticmethod
+    def _module():
+        import pypdfium2
+        return pypdfium2
+
+    def page_count(self, path: str) -> int:
+        document = self._module().PdfDocument(path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def extract(self, path: str, start: int, stop: int) -> List[str]:
+        document = self._module().PdfDocument(path)
+        try:
+            texts = []
+            for i in range(start, stop):
+                page = document[i]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return texts
+        finally:
+            document.close()
+
+
+_EXTRACTORS: Dict[str, type] = {cls.name: cls for cls in (PypdfExtractor, PymupdfExtractor, Pypdfium2Extractor)}
+
+
+def available_backends() -> List[str]:
+    return [name for name in PDF_BACKENDS if _EXTRACTORS[name].available()]
+
+
+def get_extractor(backend: str = DEFAULT_BACKEND) -> PdfExtractor:
+    """Extractor for a backend name; `auto` picks the fastest installed one"""
+    backend = (backend or DEFAULT_BACKEND).strip().lower()
+    if backend == "auto":
+        backend = next((name for name in AUTO_ORDER if _EXTRACTORS[name].available()), None)
+        if backend is None:
+            raise RuntimeError(f"No PDF backend is installed; install one of {', '.join(AUTO_ORDER)} (pip install pypdf)")
+    if backend not in _EXTRACTORS:
+        raise ValueError(f"PDF_BACKEND must be auto or one of {', '.join(PDF_BACKENDS)}, got {backend!r}")
+    if not _EXTRACTORS[backend].available():
+        raise ImportError(f"PDF backend {backend!r} is not installed (pip install {backend})")
+    return _EXTRACTORS[backend]()
+
+
+def _extract_range(backend: str, path: str, start: int, stop: int) -> Tuple[int, List[str]]:
+    # Runs in a worker process
+    return start, get_extractor(backend).extract(path, start, stop)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: forking a process that runs server/UI threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def extract_pages(path: str, backend: str = DEFAULT_BACKEND, workers: int = 0) -> List[str]:
+    """
+    Text of every page of a PDF. `workers` caps the extraction processes
+    (0: one per CPU, 1: inline).
+    """
+    extractor = get_extractor(backend)
+    total = extractor.page_count(path)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        return extractor.extract(path, 0, total)
+
+    ranges = [(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    pages: List[Optional[str]] = [None] * total
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(_extract_range, extractor.name, path, start, stop) for start, stop in ranges]
+        for future in futures:
+            start, texts = future.result()
+            pages[start:start + len(texts)] = texts
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); extract this file inline and start a new pool next time
+        _discard_pool()
+        return extractor.extract(path, 0, total)
+    return pages
+
+
+def _metadata_value(key: str, value: Any) -> Any:
+    """A document info value as PyPDFLoader stores it: str or int, PDF dates in ISO format"""
+    if not isinstance(value, (str, int)):
+        value = str(value)
+    if key in ("creationdate", "moddate"):
+        try:
+            return datetime.datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+        except ValueError:
+            return value
+    return value.strip() if isinstance(value, str) else value
+
+
+def pdf_metadata(path: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Document info (producer, creator, dates, ...) and page labels, keyed as PyPDFLoader keys them"""
+    reader = PypdfExtractor._module().PdfReader(path)
+    info = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        info[key.lstrip("/").lower()] = value
+    return {key: _metadata_value(key, value) for key, value in info.items()}, list(reader.page_labels)
+
+
+def load_pdf(path: str, backend: str = DEFAULT_BACKEND, workers: int = 0, source: Optional[str] = None) -> List[Document]:
+    """One Document per page, with the metadata PyPDFLoader produced (document info, page, page_label)"""
+    pages = extract_pages(path, backend=backend, workers=workers)
+    info, labels = pdf_metadata(path)
+    source = source or path
+    return [
+        Document(
+            page_content=text.strip(),
+            metadata={
+                **info, "source": source, "total_pages": len(pages), "page": i,
+                "page_label": labels[i] if i < len(labels) else str(i + 1),
+            },
+        )
+        for i, text in enumerate(pages)
+    ]
@@ -0,0 +1,335 @@
+"""
+Query log, query caches and startup prewarming.
+
+`QASystem`, `VectorSearch` and the agent can append every user query to a
+local JSONL query log (off unless `QUERY_LOG_PATH` is set). Queries are anonymized first: they are
+lower-cased, e-mail addresses, URLs and long digit runs (phone, card,
+account numbers) become placeholders, and no user or session identifier
+is stored. Query embeddings, retrieval results and (optionally)
+first-turn answers are kept in process-wide TTL/LRU caches. At startup,
+`prewarm` replays the most frequent logged queries through those caches
+within a time and token budget, so the first users after a deploy do not
+pay for cold caches. Queries with placeholders are not replayed: no user
+asks for "order <number>", so warming them only spends tokens. Writers bump the store's generation
+(`bump_generation`), a marker file next to the store that every process
+on the host checks, which retires its cached retrieval results.
+
+    cd AgenticRAG
+    python -m utils.query_cache top -n 20
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from utils.settings import Settings, get_settings
+
+# The log is rotated to `<path>.1` past this size; both files are read for the top queries
+QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+CACHE_NAMES = ("embeddings", "retrieval", "answers")
+# Writers replace `<store>/.generation.<collection>`; readers key cached results on its identity
+GENERATION_MARKER_PREFIX = ".generation."
+
+_ANONYMIZERS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b(?:https?://|www\.)\S+"), "<url>"),
+)
+_DIGIT_RUN = re.compile(r"\+?\d[\d ()./-]{4,}\d")
+# Digit runs this long are phone, card or account numbers rather than years, pages or versions
+MIN_NUMBER_DIGITS = 7
+PLACEHOLDERS = ("<email>", "<url>", "<number>")
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Case and whitespace insensitive form of a query, used as cache key"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def anonymize_query(query: str) -> str:
+    """Normalized query with personal data replaced by placeholders"""
+    query = normalize_query(query)
+    for pattern, placeholder in _ANONYMIZERS:
+        query = pattern.sub(placeholder, query)
+    return _DIGIT_RUN.sub(
+        lambda match: "<number>" if sum(c.isdigit() for c in match.group()) >= MIN_NUMBER_DIGITS else match.group(),
+        query,
+    )
+
+
+def is_anonymized(query: str) -> bool:
+    """True for a logged query in which `anonymize_query` replaced personal data"""
+    return any(placeholder in query for placeholder in PLACEHOLDERS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token) for spend budgets"""
+    return max(1, len(text) // 4)
+
+
+def params_key(params: Optional[Dict[str, Any]]) -> str:
+    """Stable string form of search parameters, for cache keys and log grouping"""
+    return json.dumps({key: value for key, value in (params or {}).items() if value is not None}, sort_keys=True, default=str)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl_seconds`.
+    `max_entries` 0 disables it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return default
+
+    def put(self, key: Hashable, value):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]):
+        """Cached value for `key`, computing and storing it on a miss (failures are not cached)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_caches: Dict[str, QueryCache] = {}
+_state_lock = threading.Lock()
+
+
+def get_cache(name: str, settings: Optional[Settings] = None) -> QueryCache:
+    """Process-wide cache by name (embeddings, retrieval, answers), sized from the settings on first use"""
+    if name not in CACHE_NAMES:
+        raise ValueError(f"Unknown cache {name!r}, expected one of {', '.join(CACHE_NAMES)}")
+    with _state_lock:
+        if name not in _caches:
+            settings = settings or get_settings()
+            _caches[name] = QueryCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+        return _caches[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    with _state_lock:
+        return {name: {**cache.stats, "entries": len(cache)} for name, cache in _caches.items()}
+
+
+def clear_caches():
+    """Empty every process-wide cache, e.g. between benchmark runs"""
+    with _state_lock:
+        for cache in _caches.values():
+            cache.clear()
+
+
+def store_scope(path: str, collection: str) -> str:
+    """
+    Identity of one collection of one store, for retrieval cache keys: the
+    path of its generation marker, `<store>/.generation.<collection>`
+    """
+    return os.path.join(os.path.abspath(path), f"{GENERATION_MARKER_PREFIX}{collection}")
+
+
+def generation(scope: str) -> tuple:
+    """
+    Current generation of a collection, read from its marker file so that
+    writes from any process on this host are seen
+    """
+    try:
+        stat = os.stat(scope)
+    except OSError:
+        return (0, 0)
+    # The marker is replaced on each bump, so the inode changes even where mtimes are coarse
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def bump_generation(scope: str):
+    """Mark a collection as changed, so retrieval results cached for it are no longer used"""
+    try:
+        os.makedirs(os.path.dirname(scope), exist_ok=True)
+        temp_path = f"{scope}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(f"{time.time_ns()}\n")
+        os.replace(temp_path, scope)
+    except OSError as e:
+        print(f"Could not bump cache generation {scope}: {e}")
+
+
+class QueryLog:
+    """Append-only JSONL log of anonymized queries, shared by processes on one host"""
+
+    def __init__(self, path: str, max_bytes: int = QUERY_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def append(self, query: str, kind: str, namespace: Optional[str] = None, params: Optional[Dict[str, Any]] = None):
+        """Record one query; `kind` is the caller (qa, search, agent), `params` its search parameters"""
+        entry = {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "kind": kind,
+            "query": anonymize_query(query),
+        }
+        if namespace:
+            entry["namespace"] = namespace
+        params = json.loads(params_key(params))
+        if params:
+            entry["params"] = params
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            # One short O_APPEND write per line, so concurrent writers do not interleave
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        for path in (self.path + ".1", self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+
+    def top_queries(self, n: int, kinds: Optional[Iterable[str]] = None, replayable: bool = False) -> List[Dict[str, Any]]:
+        """
+        The `n` most frequent (kind, query, namespace, params), most frequent
+        first, with their count. `replayable` leaves out anonymized queries.
+        """
+        kinds = set(kinds) if kinds else None
+        counts: Counter = Counter()
+        first: Dict[tuple, Dict[str, Any]] = {}
+        for entry in self.entries():
+            if kinds and entry.get("kind") not in kinds:
+                continue
+            if replayable and is_anonymized(entry.get("query") or ""):
+                continue
+            key = (entry.get("kind"), entry.get("query"), entry.get("namespace"), params_key(entry.get("params")))
+            counts[key] += 1
+            first.setdefault(key, entry)
+        return [
+            {key: value for key, value in first[key].items() if key != "ts"} | {"count": count}
+            for key, count in counts.most_common(n)
+        ]
+
+
+_query_logs: Dict[str, QueryLog] = {}
+
+
+def get_query_log(settings: Optional[Settings] = None) -> Optional[QueryLog]:
+    """Process-wide query log at `settings.query_log_path`; None when logging is off"""
+    path = (settings or get_settings()).query_log_path
+    if not path:
+        return None
+    with _state_lock:
+        if path not in _query_logs:
+            _query_logs[path] = QueryLog(path)
+        return _query_logs[path]
+
+
+def log_query(query: str, kind: str, settings: Optional[Settings] = None, **fields):
+    """Append a query to the query log; never fails the request that issued it"""
+    query_log = get_query_log(settings)
+    if query_log is None or not query.strip():
+        return
+    try:
+        query_log.append(query, kind, **fields)
+    except OSError as e:
+        print(f"Could not write query log {query_log.path}: {e}")
+
+
+def prewarm(
+    entries: Iterable[Dict[str, Any]],
+    warm: Callable[[Dict[str, Any]], int],
+    seconds: float,
+    max_tokens: int,
+) -> Dict[str, Any]:
+    """
+    Call `warm(entry)` for logged queries, most frequent first, until
+    `seconds` have passed or the tokens `warm` reports having spent on paid
+    API calls reach `max_tokens`. Anonymized queries are left out. Failures
+    are counted, not raised.
+    """
+    entries = list(entries)
+    replayable = [entry for entry in entries if not is_anonymized(entry.get("query") or "")]
+    stats = {"queries": len(replayable), "anonymized": len(entries) - len(replayable), "warmed": 0, "failed": 0, "tokens": 0}
+    entries = replayable
+    start = time.monotonic()
+    for entry in entries:
+        if time.monotonic() - start >= seconds or stats["tokens"] >= max_tokens:
+            break
+        try:
+            stats["tokens"] += warm(entry) or 0
+            stats["warmed"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"Prewarm failed for {entry.get('query')!r}: {e}")
+    stats["seconds"] = round(time.monotonic() - start, 3)
+    stats["skipped"] = stats["queries"] - stats["warmed"] - stats["failed"]
+    print(f"Prewarmed caches: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("top",))
+    parser.add_argument("-n", type=int, default=20, help="number of queries to show")
+    parser.add_argument("--kind", action="append", help="only these callers (qa, search, agent)")
+    args = parser.parse_args()
+
+    query_log = get_query_log()
+    if query_log is None:
+        raise SystemExit("Query logging is off (QUERY_LOG_PATH)")
+    for entry in query_log.top_queries(args.n, kinds=args.kind):
+        scope = f" [{entry['namespace']}]" if entry.get("namespace") else ""
+        params = f" {json.dumps(entry['params'], sort_keys=True)}" if entry.get("params") else ""
+        print(f"{entry['count']:>6}  {entry['kind']:<7}{scope} {entry['query']}{params}")
+
+
+if __name__ == "__main__":
+    main()
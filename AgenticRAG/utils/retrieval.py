@@ -0,0 +1,221 @@
+import datetime
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+
+# HNSW index parameters and the environment variables that set them.
+# M and construction_ef are fixed when a collection is created; search_ef,
+# batch_size and sync_threshold can be changed on an existing collection.
+HNSW_ENV_VARS = {
+    "M": "HNSW_M",
+    "construction_ef": "HNSW_CONSTRUCTION_EF",
+    "search_ef": "HNSW_SEARCH_EF",
+    "batch_size": "HNSW_BATCH_SIZE",
+    "sync_threshold": "HNSW_SYNC_THRESHOLD",
+}
+HNSW_MUTABLE = {"search_ef": "ef_search", "batch_size": "batch_size", "sync_threshold": "sync_threshold"}
+# Prefix of the metadata flags naming every source that references a chunk
+OWNER_FLAG_PREFIX = "owner_"
+
+
+def _as_timestamp(value: Union[str, float, int, None]) -> Optional[float]:
+    """Accept epoch seconds or an ISO date/datetime string"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def build_where(
+    source: Union[str, List[str], None] = None,
+    page_from: Optional[int] = None,
+    page_to: Optional[int] = None,
+    uploaded_after: Union[str, float, None] = None,
+    uploaded_before: Union[str, float, None] = None,
+    tags: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a Chroma `where` clause from metadata filters.
+    Sources containing a path separator match the full `source` path, bare
+    names match the `file_name` metadata; either also matches the owner
+    flags of chunks shared with other sources. Tags match `tag_<name>` flags.
+    Returns None when no filter is set.
+    """
+    clauses = []
+
+    if source:
+        sources = [source] if isinstance(source, str) else list(source)
+        full = [s for s in sources if "/" in s or os.sep in s]
+        names = [s for s in sources if s not in full]
+        source_clauses = []
+        if full:
+            source_clauses.append({"source": {"$in": full}})
+            source_clauses.extend({source_flag(path): True} for path in full)
+        if names:
+            source_clauses.append({"file_name": {"$in": names}})
+            source_clauses.extend({file_flag(name): True} for name in names)
+        clauses.append(source_clauses[0] if len(source_clauses) == 1 else {"$or": source_clauses})
+
+    if page_from is not None:
+        clauses.append({"page": {"$gte": int(page_from)}})
+    if page_to is not None:
+        clauses.append({"page": {"$lte": int(page_to)}})
+
+    after = _as_timestamp(uploaded_after)
+    if after is not None:
+        clauses.append({"uploaded_at": {"$gte": after}})
+    before = _as_timestamp(uploaded_before)
+    if before is not None:
+        clauses.append({"uploaded_at": {"$lte": before}})
+
+    for tag in tags or []:
+        clauses.append({tag_key(tag): True})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def tag_key(tag: str) -> str:
+    """Metadata key for a tag; Chroma metadata cannot hold lists so tags are boolean flags"""
+    return "tag_" + "".join(c if c.isalnum() else "_" for c in tag.strip().lower())
+
+
+def source_flag(source: str) -> str:
+    """Owner flag of the source stored under this path"""
+    return f"{OWNER_FLAG_PREFIX}source_" + hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def file_flag(name: str) -> str:
+    """Owner flag of the sources with this file name"""
+    return f"{OWNER_FLAG_PREFIX}file_" + hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+
+
+def owner_flags(source: str) -> Dict[str, bool]:
+    """
+    Metadata flags recording `source` as an owner of a chunk. Identical
+    content is stored once, so a chunk filed under one source carries the
+    flags of every source that produced it and source filters find it
+    under each of them.
+    """
+    return {source_flag(source): True, file_flag(os.path.basename(source)): True}
+
+
+def parse_tags(text: Optional[str]) -> List[str]:
+    """Tags from a comma-separated form field, e.g. "hr, policy" -> ["hr", "policy"]"""
+    return [tag.strip() for tag in (text or "").split(",") if tag.strip()]
+
+
+def hnsw_params_from_env() -> Dict[str, int]:
+    """HNSW parameters set through HNSW_* environment variables; unset ones keep Chroma's defaults"""
+    return {name: int(os.environ[var]) for name, var in HNSW_ENV_VARS.items() if os.getenv(var)}
+
+
+def hnsw_metadata(space: Optional[str] = "cosine", **params: int) -> Dict[str, Any]:
+    """Collection metadata carrying the distance space and HNSW parameters"""
+    unknown = set(params) - set(HNSW_ENV_VARS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameters: {', '.join(sorted(unknown))}")
+    metadata = {"hnsw:space": space} if space else {}
+    metadata.update({f"hnsw:{name}": int(value) for name, value in params.items() if value is not None})
+    return metadata
+
+
+def apply_hnsw_search_params(collection, **params: int) -> bool:
+    """
+    Update the mutable HNSW parameters (search_ef, batch_size, sync_threshold)
+    of an existing collection when they differ from `params`. Returns False
+    when this Chroma version cannot modify them (they then only apply to
+    newly created collections).
+    """
+    hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    changes = {
+        HNSW_MUTABLE[name]: int(value)
+        for name, value in params.items()
+        if name in HNSW_MUTABLE and value is not None and hnsw.get(HNSW_MUTABLE[name]) != int(value)
+    }
+    if not changes:
+        return True
+    try:
+        collection.modify(configuration={"hnsw": changes})
+    except Exception:
+        return False
+    return True
+
+
+def exact_search(query_embedding: List[float], embeddings: List[List[float]], k: int):
+    """
+    Brute-force cosine search over a small candidate set.
+    Returns (indices, distances) of the k closest candidates, closest first,
+    with distances on the same 1 - cosine scale Chroma uses.
+    """
+    if len(embeddings) == 0:
+        return [], []
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    distances = 1.0 - (matrix @ query) / np.where(norms == 0, 1.0, norms)
+
+    k = min(k, len(distances))
+    top = np.argpartition(distances, k - 1)[:k]
+    top = top[np.argsort(distances[top])]
+    return top.tolist(), distances[top].tolist()
+
+
+def mmr_select(query_embedding: List[float], embeddings: List[List[float]], k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Maximal marginal relevance over candidate embeddings, vectorized with NumPy.
+    `lambda_mult` trades relevance (1.0) against diversity (0.0). Returns the
+    selected candidate indices in selection order.
+    """
+    if len(embeddings) == 0 or k <= 0:
+        return []
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    pairwise = matrix @ matrix.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_similarity = pairwise[first].copy()
+    while len(selected) < min(k, len(matrix)):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        max_similarity = np.maximum(max_similarity, pairwise[chosen])
+    return selected
+
+
+def rerank(
+    query_embedding: List[float],
+    embeddings: List[List[float]],
+    distances: List[float],
+    k: int,
+    max_distance: Optional[float] = None,
+    distance_margin: Optional[float] = None,
+    mmr_lambda: Optional[float] = 0.7,
+) -> List[int]:
+    """
+    Post-retrieval selection over over-fetched candidates (closest first).
+    Drops hits farther than `max_distance`, then adapts k by dropping hits more
+    than `distance_margin` behind the best one, then picks up to `k` diverse
+    hits with MMR (skipped when `mmr_lambda` is None). Returns candidate indices.
+    """
+    keep = list(range(len(distances)))
+    if max_distance is not None:
+        keep = [i for i in keep if distances[i] <= max_distance]
+    if keep and distance_margin is not None:
+        best = min(distances[i] for i in keep)
+        keep = [i for i in keep if distances[i] <= best + distance_margin]
+    if len(keep) <= 1 or mmr_lambda is None:
+        return keep[:k]
+    chosen = mmr_select(query_embedding, [embeddings[i] for i in keep], k, mmr_lambda)
+    return [keep[i] for i in chosen]
@@ -0,0 +1,137 @@
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Mapping, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Settings field -> environment variable it is read from
+SETTINGS_ENV_VARS = {
+    "chunk_size": "CHUNK_SIZE",
+    "chunk_overlap": "CHUNK_OVERLAP",
+    "k_documents": "K_DOCUMENTS",
+    "search_top_k": "SEARCH_TOP_K",
+    "max_distance": "RETRIEVAL_MAX_DISTANCE",
+    "distance_margin": "RETRIEVAL_DISTANCE_MARGIN",
+    "mmr_lambda": "RETRIEVAL_MMR_LAMBDA",
+    "model": "RAG_MODEL",
+    "vector_db_path": "VECTOR_DB_PATH",
+    "documents_path": "DOCUMENTS_PATH",
+    "pdf_backend": "PDF_BACKEND",
+    "pdf_workers": "PDF_WORKERS",
+    "query_log_path": "QUERY_LOG_PATH",
+    "cache_max_entries": "QUERY_CACHE_MAX_ENTRIES",
+    "cache_ttl_seconds": "QUERY_CACHE_TTL_SECONDS",
+    "cache_answers": "CACHE_ANSWERS",
+    "prewarm_queries": "PREWARM_QUERIES",
+    "prewarm_seconds": "PREWARM_SECONDS",
+    "prewarm_max_tokens": "PREWARM_MAX_TOKENS",
+}
+# Values that turn an optional retrieval step off
+_DISABLED = {"", "none", "off", "null"}
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Settings shared by the RAG and AgenticRAG stacks and the drag-drop server.
+    `k_documents` is the number of chunks the RAG QA chain puts in the prompt,
+    `search_top_k` the default number of results of `VectorSearch` searches.
+    `max_distance`, `distance_margin` and `mmr_lambda` configure
+    `utils.retrieval.rerank`; None disables a step. `max_distance` is off
+    by default: distances depend on the embedding model and the collection's
+    distance space, so a cutoff has to be calibrated for each store.
+    `pdf_backend` (pypdf, as PyPDFLoader; `auto` opts into the fastest
+    installed backend) and `pdf_workers` (0: one per CPU) configure
+    `utils.pdf_extract`.
+    `query_log_path` (None: no log), the `cache_*` and `prewarm_*` fields
+    configure `utils.query_cache`; `cache_answers` also caches first-turn
+    QA answers, and `prewarm_queries` 0 turns startup prewarming off.
+    """
+
+    chunk_size: int = 1000
+    chunk_overlap: int = 200
+    k_documents: int = 3
+    search_top_k: int = 5
+    max_distance: Optional[float] = None
+    distance_margin: Optional[float] = 0.15
+    mmr_lambda: Optional[float] = 0.7
+    model: str = "gpt-3.5-turbo"
+    vector_db_path: str = "./chroma_db"
+    documents_path: str = "./documents"
+    pdf_backend: str = "pypdf"
+    pdf_workers: int = 0
+    query_log_path: Optional[str] = None
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: float = 600.0
+    cache_answers: bool = False
+    prewarm_queries: int = 50
+    prewarm_seconds: float = 20.0
+    prewarm_max_tokens: int = 50000
+
+    def __post_init__(self):
+        for name in ("chunk_size", "k_documents", "search_top_k"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1, got {getattr(self, name)}")
+        for name in ("pdf_workers", "cache_max_entries", "cache_ttl_seconds", "prewarm_queries", "prewarm_seconds", "prewarm_max_tokens"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must be 0 or more, got {getattr(self, name)}")
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError(
+                f"chunk_overlap must be between 0 and chunk_size ({self.chunk_size}), got {self.chunk_overlap}"
+            )
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None, **overrides) -> "Settings":
+        """Defaults, overridden by the environment, overridden by `overrides`"""
+        environ = os.environ if environ is None else environ
+        types = {field.name: field.type for field in fields(cls)}
+        values = {}
+        for name, var in SETTINGS_ENV_VARS.items():
+            raw = environ.get(var)
+            if raw is None:
+                continue
+            try:
+                values[name] = _parse(raw, types[name])
+            except ValueError:
+                raise ValueError(f"{var} must be {_describe(types[name])}, got {raw!r}") from None
+        values.update(overrides)
+        return cls(**values)
+
+
+def _parse(raw: str, kind):
+    if kind is int:
+        return int(raw)
+    if kind is float:
+        return float(raw)
+    if kind is bool:
+        value = raw.strip().lower()
+        if value not in _TRUE | _FALSE:
+            raise ValueError(raw)
+        return value in _TRUE
+    if kind == Optional[float]:
+        return None if raw.strip().lower() in _DISABLED else float(raw)
+    if kind == Optional[str]:
+        return None if raw.strip().lower() in _DISABLED else raw
+    return raw
+
+
+def _describe(kind) -> str:
+    if kind is int:
+        return "an integer"
+    if kind is float:
+        return "a number"
+    if kind is bool:
+        return "true or false"
+    if kind == Optional[float]:
+        return "a number or 'none'"
+    return "a string"
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide settings, read from the environment on first use"""
+    return Settings.from_env()
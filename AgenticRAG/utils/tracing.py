@@ -0,0 +1,393 @@
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "traces")
+MAX_ATTRIBUTE_CHARS = 2000
+# Tracers with an export thread, flushed by `shutdown_tracers` at exit
+_tracers: "weakref.WeakSet[Tracer]" = weakref.WeakSet()
+
+
+def _truncate(value: Any, limit: int = MAX_ATTRIBUTE_CHARS) -> Any:
+    """Keep span payloads small: long strings are cut, other objects stringified"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else text[:limit] + f"... [{len(text) - limit} chars truncated]"
+
+
+def _content_text(content) -> str:
+    """Text of a google.genai Content (or None), ignoring non-text parts"""
+    if content is None or not getattr(content, "parts", None):
+        return ""
+    return "".join(part.text or "" for part in content.parts if getattr(part, "text", None))
+
+
+class JsonlExporter:
+    """Append finished spans to a JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+    def shutdown(self):
+        pass
+
+
+class SqliteExporter:
+    """Store finished spans in a local SQLite table, queryable offline"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Only the export thread touches the connection after construction
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spans (
+                span_id TEXT PRIMARY KEY,
+                trace_id TEXT NOT NULL,
+                parent_id TEXT,
+                kind TEXT NOT NULL,
+                name TEXT,
+                start_time REAL,
+                end_time REAL,
+                duration_ms REAL,
+                status TEXT,
+                attributes TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id)")
+        self._conn.commit()
+
+    def export(self, spans: List[Dict[str, Any]]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    s["span_id"], s["trace_id"], s["parent_id"], s["kind"], s["name"],
+                    s["start_time"], s["end_time"], s["duration_ms"], s["status"],
+                    json.dumps(s["attributes"], default=str),
+                )
+                for s in spans
+            ],
+        )
+        self._conn.commit()
+
+    def shutdown(self):
+        self._conn.close()
+
+
+class OpikExporter:
+    """
+    Forward spans to an Opik workspace. `opik` is imported lazily, so it
+    is only needed when this exporter is configured.
+    """
+
+    SPAN_TYPES = {"model": "llm", "tool": "tool"}
+
+    def __init__(self, project_name: str = "GoKwik", workspace: Optional[str] = None, max_tracked_ids: int = 10000):
+        import opik
+        from opik import id_helpers
+
+        self._client = opik.Opik(project_name=project_name, workspace=workspace)
+        self._generate_id = id_helpers.generate_id
+        # Local ids -> Opik ids (Opik expects its own UUIDv7 ids)
+        self._ids: "OrderedDict[str, str]" = OrderedDict()
+        self._max_tracked_ids = max_tracked_ids
+
+    def _opik_id(self, local_id: Optional[str]) -> Optional[str]:
+        if local_id is None:
+            return None
+        opik_id = self._ids.get(local_id)
+        if opik_id is None:
+            opik_id = self._ids[local_id] = self._generate_id()
+            while len(self._ids) > self._max_tracked_ids:
+                self._ids.popitem(last=False)
+        return opik_id
+
+    def export(self, spans: List[Dict[str, Any]]):
+        for span in spans:
+            attributes = dict(span["attributes"])
+            start = datetime.datetime.fromtimestamp(span["start_time"], tz=datetime.timezone.utc)
+            end = datetime.datetime.fromtimestamp(span["end_time"], tz=datetime.timezone.utc)
+            io = {
+                "input": {"value": attributes.pop("input")} if "input" in attributes else None,
+                "output": {"value": attributes.pop("output")} if "output" in attributes else None,
+            }
+            trace_id = self._opik_id(span["trace_id"])
+            if span["parent_id"] is None:
+                self._client.trace(
+                    id=trace_id, name=span["name"], start_time=start, end_time=end,
+                    metadata=attributes, **io,
+                )
+            self._client.span(
+                trace_id=trace_id,
+                id=self._opik_id(span["span_id"]),
+                parent_span_id=self._opik_id(span["parent_id"]),
+                name=span["name"],
+                type=self.SPAN_TYPES.get(span["kind"], "general"),
+                start_time=start,
+                end_time=end,
+                metadata=attributes,
+                **io,
+            )
+
+    def shutdown(self):
+        self._client.flush()
+
+
+class Tracer:
+    """
+    Sampled tracer exposing the Google ADK agent/model/tool callbacks.
+
+    Sampling is decided once per invocation, so a trace is either recorded
+    whole or not at all. Finished spans go onto a bounded queue drained by a
+    background thread that batches them to the exporters; when the queue is
+    full spans are dropped and counted, so tracing never blocks a request.
+    """
+
+    MAX_OPEN_TRACES = 10000
+    # Spans whose after-callback never ran (errors, cancelled streams) are evicted past this
+    MAX_OPEN_SPANS = 10000
+
+    def __init__(
+        self,
+        exporters: List[Any],
+        sample_rate: float = 1.0,
+        max_queue: int = 2048,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+    ):
+        self.exporters = exporters
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"sampled": 0, "unsampled": 0, "exported": 0, "dropped": 0, "abandoned": 0, "export_errors": 0}
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._traces: Dict[str, Optional[str]] = {}
+        self._open: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = None
+        if exporters:
+            self._worker = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+            self._worker.start()
+            _tracers.add(self)
+
+    # Span bookkeeping
+
+    def _trace_id(self, invocation_id: str) -> Optional[str]:
+        """Trace id for an invocation, or None when it is not sampled"""
+        with self._lock:
+            if invocation_id not in self._traces:
+                sampled = bool(self.exporters) and random.random() < self.sample_rate
+                self.stats["sampled" if sampled else "unsampled"] += 1
+                self._traces[invocation_id] = uuid.uuid4().hex if sampled else None
+                # Invocations that failed before after_agent_callback never finish
+                while len(self._traces) > self.MAX_OPEN_TRACES:
+                    self._traces.pop(next(iter(self._traces)))
+            return self._traces[invocation_id]
+
+    def _start(self, key: tuple, invocation_id: str, kind: str, name: str, parent_key: Optional[tuple] = None, **attributes):
+        trace_id = self._trace_id(invocation_id)
+        if trace_id is None:
+            return
+        with self._lock:
+            parent = self._open.get(parent_key) if parent_key else None
+            self._open[key] = {
+                "trace_id": trace_id,
+                "span_id": uuid.uuid4().hex,
+                "parent_id": parent["span_id"] if parent else None,
+                "kind": kind,
+                "name": name,
+                "start_time": time.time(),
+                "attributes": {k: _truncate(v) for k, v in attributes.items() if v is not None},
+            }
+            while len(self._open) > self.MAX_OPEN_SPANS:
+                self._open.popitem(last=False)
+                self.stats["abandoned"] += 1
+
+    def _end(self, key: tuple, status: str = "ok", **attributes):
+        with self._lock:
+            span = self._open.pop(key, None)
+        if span is None:
+            return
+        span["end_time"] = time.time()
+        span["duration_ms"] = round((span["end_time"] - span["start_time"]) * 1000, 3)
+        span["status"] = status
+        span["attributes"].update({k: _truncate(v) for k, v in attributes.items() if v is not None})
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+
+    def _finish_invocation(self, invocation_id: str):
+        with self._lock:
+            self._traces.pop(invocation_id, None)
+
+    # ADK callbacks; all return None so they never alter agent behaviour
+
+    def before_agent_callback(self, callback_context, *args, **kwargs):
+        self._start(
+            ("agent", callback_context.invocation_id, callback_context.agent_name),
+            callback_context.invocation_id, "agent", callback_context.agent_name,
+            input=_content_text(callback_context.user_content),
+        )
+
+    def after_agent_callback(self, callback_context, *args, **kwargs):
+        self._end(
+            ("agent", callback_context.invocation_id, callback_context.agent_name),
+            output=callback_context.state.get("final_response"),
+        )
+        self._finish_invocation(callback_context.invocation_id)
+
+    def before_model_callback(self, callback_context, llm_request, *args, **kwargs):
+        contents = llm_request.contents or []
+        self._start(
+            ("model", callback_context.invocation_id, callback_context.agent_name),
+            callback_context.invocation_id, "model", llm_request.model or "llm",
+            parent_key=("agent", callback_context.invocation_id, callback_context.agent_name),
+            input=_content_text(contents[-1]) if contents else None,
+            messages=len(contents),
+        )
+
+    def after_model_callback(self, callback_context, llm_response, *args, **kwargs):
+        # Streaming calls this for every chunk; the span ends with the final, non-partial response
+        if getattr(llm_response, "partial", False):
+            return
+        usage = getattr(llm_response, "usage_metadata", None)
+        calls = [part.function_call.name for part in (llm_response.content.parts if llm_response.content else [])
+                 if getattr(part, "function_call", None)]
+        self._end(
+            ("model", callback_context.invocation_id, callback_context.agent_name),
+            status="error" if llm_response.error_code else "ok",
+            output=_content_text(llm_response.content),
+            function_calls=",".join(calls) or None,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            completion_tokens=getattr(usage, "candidates_token_count", None),
+            error=llm_response.error_message,
+        )
+
+    def before_tool_callback(self, tool, args, tool_context, *other_args, **kwargs):
+        self._start(
+            ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name),
+            tool_context.invocation_id, "tool", tool.name,
+            parent_key=("agent", tool_context.invocation_id, tool_context.agent_name),
+            input=json.dumps(args, default=str),
+        )
+
+    def after_tool_callback(self, tool, args, tool_context, tool_response, *other_args, **kwargs):
+        self._end(
+            ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name),
+            output=tool_response,
+        )
+
+    # Export
+
+    def _export_loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Dict[str, Any]]):
+        errors = 0
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                errors += 1
+                logger.warning("Trace exporter %s failed: %s", type(exporter).__name__, e)
+        with self._lock:
+            self.stats["export_errors"] += errors
+            self.stats["exported"] += len(batch)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Flush queued spans and stop the export thread"""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join(timeout)
+        self._worker = None
+        _tracers.discard(self)
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                logger.warning("Trace exporter %s failed to shut down: %s", type(exporter).__name__, e)
+
+
+def shutdown_tracers(timeout: float = 5.0):
+    """Flush and stop every running tracer; registered with atexit, servers also call it on shutdown"""
+    for tracer in list(_tracers):
+        tracer.shutdown(timeout)
+
+
+atexit.register(shutdown_tracers)
+
+
+def tracer_from_env() -> Tracer:
+    """
+    Build a tracer from environment variables:
+        TRACE_EXPORTERS    comma-separated: sqlite, jsonl, opik, none (default: sqlite)
+        TRACE_SAMPLE_RATE  fraction of invocations recorded (default: 1.0)
+        TRACE_DIR          directory for local sinks (default: AgenticRAG/traces)
+        TRACE_QUEUE_SIZE   spans buffered before new ones are dropped (default: 2048)
+        OPIK_PROJECT_NAME  / OPIK_WORKSPACE for the opik exporter
+    """
+    names = [n.strip().lower() for n in os.getenv("TRACE_EXPORTERS", "sqlite").split(",") if n.strip()]
+    trace_dir = os.getenv("TRACE_DIR", DEFAULT_TRACE_DIR)
+
+    exporters = []
+    for name in names:
+        if name == "sqlite":
+            exporters.append(SqliteExporter(os.path.join(trace_dir, "traces.sqlite3")))
+        elif name == "jsonl":
+            exporters.append(JsonlExporter(os.path.join(trace_dir, "traces.jsonl")))
+        elif name == "opik":
+            try:
+                exporters.append(OpikExporter(
+                    project_name=os.getenv("OPIK_PROJECT_NAME", "GoKwik"),
+                    workspace=os.getenv("OPIK_WORKSPACE"),
+                ))
+            except ImportError:
+                logger.warning("TRACE_EXPORTERS includes opik but the opik package is not installed")
+        elif name != "none":
+            logger.warning("Unknown trace exporter %r ignored", name)
+
+    return Tracer(
+        exporters,
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+        max_queue=int(os.getenv("TRACE_QUEUE_SIZE", "2048")),
+    )
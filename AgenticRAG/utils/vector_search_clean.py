@@ -1,39 +1,184 @@
 import os
-import chromadb
-from chromadb.config import Settings
+import re
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from utils.chroma_client import ReadOnlyStoreError, client_mode_from_env, create_client, file_lock
+from utils.retrieval import OWNER_FLAG_PREFIX, apply_hnsw_search_params, build_where, exact_search, file_flag, hnsw_metadata, hnsw_params_from_env, owner_flags, rerank, source_flag
+from utils.query_cache import bump_generation, estimate_tokens, generation, get_cache, get_query_log, log_query, normalize_query, params_key, prewarm, store_scope
+from utils.settings import Settings, get_settings
+from utils.vector_snapshot import Snapshot, SnapshotError, embedding_model_id, export_collection, restore_collection
 load_dotenv()
 
+COLLECTION_NAME = "document_collection"
+SOURCE_INDEX_FILE = "source_index.json"
+SIGNATURE_INDEX_FILE = "minhash_index.json"
+# Namespace whose data lives in the original, un-suffixed collection
+DEFAULT_NAMESPACE = "default"
+# Open collection handles kept per VectorSearch; older ones are dropped first
+MAX_OPEN_NAMESPACES = 32
+# Source-scoped searches over at most this many chunks skip the ANN index
+FAST_PATH_MAX_CANDIDATES = 2000
+# Candidates fetched per requested result, for the cutoff and MMR stage to choose from
+FETCH_K_MULTIPLIER = 4
+# Chunk IDs written before IDs were content-addressed: "<file name>_chunk_<i>"
+LEGACY_CHUNK_ID = re.compile(r"^(.+)_chunk_\d+$")
+# Source indexes already checked for legacy chunks by this process
+_legacy_checked = set()
+_legacy_checked_lock = threading.Lock()
+
+
 class VectorSearch:
-    def __init__(self, persist_directory: str = "./chroma_db"):
-        """Initialize ChromaDB with persistent storage"""
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        hnsw: Optional[Dict[str, int]] = None,
+        namespace: Optional[str] = None,
+        max_open_namespaces: int = MAX_OPEN_NAMESPACES,
+        client_mode: Optional[str] = None,
+        settings: Optional[Settings] = None,
+        embedding_function=None,
+    ):
+        """
+        Initialize ChromaDB with persistent storage.
+        `settings` (default: `utils.settings.get_settings()`) supplies the
+        persist directory when none is given, the default `top_k` and the
+        post-retrieval stage (see `utils.retrieval.rerank`).
+        `hnsw` sets index parameters (M, construction_ef, search_ef, batch_size,
+        sync_threshold) and defaults to the HNSW_* environment variables.
+        `namespace` selects a tenant/workspace collection, see `for_namespace`.
+        `client_mode` is embedded, http or snapshot (default: CHROMA_MODE), see
+        `utils.chroma_client`; snapshot mode is read-only.
+        `embedding_function` defaults to OpenAI text-embedding-3-small.
+        Searches are logged and their embeddings and results cached, see
+        `utils.query_cache` and `prewarm`.
+        """
+        self.settings = settings or get_settings()
+        persist_directory = persist_directory or self.settings.vector_db_path
         self.persist_directory = persist_directory
-        
-        # Initialize ChromaDB client with persistent storage
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
+        self.client_mode = client_mode or client_mode_from_env()
+        self.hnsw = hnsw if hnsw is not None else hnsw_params_from_env()
+        self.namespace = self.namespace_key(namespace)
+        self.max_open_namespaces = max_open_namespaces
+        # LRU of open collection handles, shared by all namespace views
+        self._handles: "OrderedDict[str, Any]" = OrderedDict()
+        self._handles_lock = threading.Lock()
+        self.max_distance = self.settings.max_distance
+        self.distance_margin = self.settings.distance_margin
+        self.mmr_lambda = self.settings.mmr_lambda
+        self.embedding_function = embedding_function or OpenAIEmbeddingFunction(
+            model_name="text-embedding-3-small"
         )
+        self.embedding_model = embedding_model_id(self.embedding_function)
         
-        
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="document_collection",
-            metadata={"hnsw:space": "cosine"},
-            embedding_function=OpenAIEmbeddingFunction(
-                model_name="text-embedding-3-small"
-            )
-        )   
+        # Initialize the ChromaDB client for the configured mode
+        self.client, opened_path = create_client(persist_directory, self.client_mode)
+        # Source indexes live next to the data that was opened (the snapshot copy in snapshot mode)
+        self.index_directory = opened_path or persist_directory
+        self.source_index_path = self._source_index_path(self.namespace)
         
         print(f"ChromaDB initialized with {self.collection.count()} documents")
     
+    @staticmethod
+    def namespace_key(namespace: Optional[str]) -> str:
+        """Normalize a tenant/workspace name into a collection-safe key"""
+        if not namespace or not namespace.strip():
+            return DEFAULT_NAMESPACE
+        key = re.sub(r"[^a-z0-9._-]+", "-", namespace.strip().lower()).strip("._-")[:48]
+        if key != namespace.strip().lower():
+            # Keep distinct names that normalize alike apart
+            key = f"{key or 'ns'}-{hashlib.sha256(namespace.encode('utf-8')).hexdigest()[:8]}"
+        return key
+    
+    @staticmethod
+    def collection_name(namespace: str) -> str:
+        return COLLECTION_NAME if namespace == DEFAULT_NAMESPACE else f"{COLLECTION_NAME}__{namespace}"
+    
+    def _source_index_path(self, namespace: str) -> str:
+        if namespace == DEFAULT_NAMESPACE:
+            return os.path.join(self.index_directory, SOURCE_INDEX_FILE)
+        return os.path.join(self.index_directory, f"source_index.{namespace}.json")
+    
+    @property
+    def signature_index_path(self) -> str:
+        """MinHash signatures of this namespace's chunks, see `utils.dedup.SignatureIndex`"""
+        if self.namespace == DEFAULT_NAMESPACE:
+            return os.path.join(self.index_directory, SIGNATURE_INDEX_FILE)
+        return os.path.join(self.index_directory, f"minhash_index.{self.namespace}.json")
+    
+    @property
+    def read_only(self) -> bool:
+        return self.client_mode == "snapshot"
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyStoreError("This vector store is a read-only snapshot; write through the embedded or http writer")
+    
+    def for_namespace(self, namespace: Optional[str]) -> "VectorSearch":
+        """
+        View of this store scoped to one tenant/workspace. Views share the
+        client and the handle LRU; the collection is created on first use.
+        """
+        key = self.namespace_key(namespace)
+        if key == self.namespace:
+            return self
+        view = copy.copy(self)
+        view.namespace = key
+        view.source_index_path = self._source_index_path(key)
+        return view
+    
+    @property
+    def collection(self):
+        """Collection of the current namespace, opened (or created) lazily"""
+        with self._handles_lock:
+            handle = self._handles.get(self.namespace)
+            if handle is not None:
+                self._handles.move_to_end(self.namespace)
+                return handle
+            handle = self._get_or_create_collection()
+            self._handles[self.namespace] = handle
+            while len(self._handles) > self.max_open_namespaces:
+                self._handles.popitem(last=False)
+            return handle
+    
+    def list_namespaces(self) -> List[str]:
+        """Namespaces that have a collection in this store"""
+        namespaces = []
+        for name in self._collection_names():
+            if name == COLLECTION_NAME:
+                namespaces.append(DEFAULT_NAMESPACE)
+            elif name.startswith(COLLECTION_NAME + "__"):
+                namespaces.append(name[len(COLLECTION_NAME) + 2:])
+        return sorted(namespaces)
+    
+    def _collection_names(self) -> List[str]:
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+    
+    def _get_or_create_collection(self):
+        """Get or create the document collection of the current namespace"""
+        collection = self.client.get_or_create_collection(
+            name=self.collection_name(self.namespace),
+            metadata=hnsw_metadata(**self.hnsw),
+            embedding_function=self.embedding_function
+        )
+        # Build parameters are fixed at creation, search-time ones follow the config
+        if not apply_hnsw_search_params(collection, **self.hnsw):
+            print("HNSW search parameters only apply to new collections with this Chroma version")
+        return collection
+    
+    @staticmethod
+    def chunk_id(text: str) -> str:
+        """Content-addressed ID for a chunk, identical text always maps to the same ID"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+    
     def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
         """Add documents to the vector database"""
+        self._check_writable()
         if ids is None:
             ids = [f"doc_{i}" for i in range(len(texts))]
         
@@ -43,40 +188,498 @@ class VectorSearch:
             metadatas=metadatas if metadatas else [{}] * len(texts),
             ids=ids
         )
+        self._invalidate()
         
         print(f"Added {len(texts)} documents to the database")
     
-    def search_similar_ads(self, query: str, top_k: int = 5) -> str:
+    @property
+    def cache_scope(self) -> str:
+        return store_scope(self.index_directory, self.collection_name(self.namespace))
+    
+    def _invalidate(self):
+        """Retire cached retrieval results of this namespace after a write"""
+        bump_generation(self.cache_scope)
+    
+    def embed_query(self, query: str):
+        """Query embedding, from the process-wide embedding cache when the query was seen recently"""
+        return get_cache("embeddings", self.settings).get_or_compute(
+            (self.embedding_model, normalize_query(query)),
+            lambda: self.embedding_function([query])[0],
+        )
+    
+    def _resolve_sources(self, source) -> List[str]:
+        """Map source names or paths onto the indexed source keys"""
+        wanted = [source] if isinstance(source, str) else list(source)
+        indexed = self._load_source_index()
+        return [
+            key for key in indexed
+            if key in wanted or os.path.basename(key) in wanted
+        ]
+    
+    def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        source=None,
+        page_from: Optional[int] = None,
+        page_to: Optional[int] = None,
+        uploaded_after: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve up to `top_k` (default: settings.search_top_k) relevant, diverse chunks.
+        Metadata filters are applied before scoring; over-fetched candidates
+        then go through the distance cutoff, adaptive k and MMR. Returns
+        dicts with id, document, metadata and distance.
+        """
+        params = dict(
+            top_k=top_k, source=source, page_from=page_from, page_to=page_to,
+            uploaded_after=uploaded_after, uploaded_before=uploaded_before, tags=tags
+        )
+        log_query(query, "search", self.settings, namespace=self.namespace, params=params)
+        return self._cached_retrieve(query, **params)
+    
+    def _cached_retrieve(self, query: str, top_k: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        """
+        `retrieve` without logging; results are cached until the namespace is
+        written to. In http mode other hosts may write to the server without
+        bumping the local generation marker, so results are not cached there.
+        """
+        top_k = top_k or self.settings.search_top_k
+        if self.client_mode == "http":
+            return self._retrieve(query, top_k, **filters)
+        scope = self.cache_scope
+        key = (
+            scope, generation(scope), self.embedding_model, normalize_query(query), top_k, params_key(filters),
+            self.max_distance, self.distance_margin, self.mmr_lambda,
+        )
+        results = get_cache("retrieval", self.settings).get_or_compute(key, lambda: self._retrieve(query, top_k, **filters))
+        # Callers get their own copies of the cached result dicts
+        return [dict(result) for result in results]
+    
+    def _retrieve(
+        self,
+        query: str,
+        top_k: int,
+        source=None,
+        page_from: Optional[int] = None,
+        page_to: Optional[int] = None,
+        uploaded_after: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        fetch_k = top_k * FETCH_K_MULTIPLIER
+        query_embedding = self.embed_query(query)
+        candidates = None
+        
+        if source:
+            # Fast path: a small source-scoped candidate set is scored exactly
+            # instead of walking the shared ANN index with a filter
+            resolved = self._resolve_sources(source)
+            index = self._load_source_index()
+            candidate_ids = list(dict.fromkeys(chunk_id for key in resolved for chunk_id in index[key]))
+            if 0 < len(candidate_ids) <= FAST_PATH_MAX_CANDIDATES:
+                where = build_where(
+                    page_from=page_from, page_to=page_to,
+                    uploaded_after=uploaded_after, uploaded_before=uploaded_before, tags=tags
+                )
+                fetched = self.collection.get(
+                    ids=candidate_ids,
+                    where=where,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                order, distances = exact_search(query_embedding, fetched["embeddings"], fetch_k)
+                candidates = {
+                    key: [fetched[key][i] for i in order]
+                    for key in ("ids", "documents", "metadatas", "embeddings")
+                }
+                candidates["distances"] = distances
+        
+        if candidates is None:
+            where = build_where(
+                source=source, page_from=page_from, page_to=page_to,
+                uploaded_after=uploaded_after, uploaded_before=uploaded_before, tags=tags
+            )
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=fetch_k,
+                where=where,
+                include=["documents", "metadatas", "distances", "embeddings"]
+            )
+            if not results['documents'] or not results['documents'][0]:
+                return []
+            candidates = {
+                key: results[key][0]
+                for key in ("ids", "documents", "metadatas", "embeddings", "distances")
+            }
+        
+        selected = rerank(
+            query_embedding,
+            candidates["embeddings"],
+            candidates["distances"],
+            top_k,
+            max_distance=self.max_distance,
+            distance_margin=self.distance_margin,
+            mmr_lambda=self.mmr_lambda,
+        )
+        return [
+            {
+                "id": candidates["ids"][i],
+                "document": candidates["documents"][i],
+                "metadata": candidates["metadatas"][i],
+                "distance": candidates["distances"][i],
+            }
+            for i in selected
+        ]
+    
+    def search_similar_ads(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        source: Optional[str] = None,
+        page_from: Optional[int] = None,
+        page_to: Optional[int] = None,
+        uploaded_after: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> str:
         """
         Search for similar product ads based on query
         Returns formatted string of results
         Args:
             query (str): The search query string.
-            top_k (int): The number of top results to return.
+            top_k (int): The maximum number of results to return (default: the configured search_top_k); fewer are returned when the rest are not relevant enough.
+            source (str): Optional file name or path to restrict the search to one document.
+            page_from (int): Optional first page to search (inclusive).
+            page_to (int): Optional last page to search (inclusive).
+            uploaded_after (str): Optional ISO date; only search documents uploaded after it.
+            uploaded_before (str): Optional ISO date; only search documents uploaded before it.
+            tags (list[str]): Optional tags every returned chunk must carry.
         """
          
         # Search in ChromaDB
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=top_k
+        results = self.retrieve(
+            query, top_k=top_k, source=source, page_from=page_from,
+            page_to=page_to, uploaded_after=uploaded_after, uploaded_before=uploaded_before, tags=tags
         )
         
         # Format results
-        if not results['documents'] or not results['documents'][0]:
+        if not results:
             return "No matching products found."
         
         formatted_results = []
-        for i, (doc, metadata) in enumerate(zip(results['documents'][0], results['metadatas'][0])):
-            formatted_results.append(f"{i+1}. {doc}")
-            if metadata:
-                formatted_results.append(f"   Metadata: {metadata}")
+        for i, result in enumerate(results):
+            formatted_results.append(f"{i+1}. [distance {result['distance']:.3f}] {result['document']}")
+            if result['metadata']:
+                formatted_results.append(f"   Metadata: {result['metadata']}")
         
         return "\n".join(formatted_results)
     
+    def _load_source_index(self) -> Dict[str, List[str]]:
+        """Load the source -> chunk ID index from disk"""
+        if not os.path.exists(self.source_index_path):
+            return {}
+        with open(self.source_index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _save_source_index(self, index: Dict[str, List[str]]):
+        """Atomically write the source -> chunk ID index to disk"""
+        os.makedirs(self.index_directory, exist_ok=True)
+        tmp_path = f"{self.source_index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.source_index_path)
+    
+    @staticmethod
+    def _merged_references(stored: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+        """`duplicate_sources`/`duplicate_count` of a stored chunk extended by another source's references to it"""
+        references = [reference for reference in (stored.get("duplicate_sources") or "").split(";") if reference]
+        for reference in (incoming.get("duplicate_sources") or "").split(";"):
+            if reference and reference not in references:
+                references.append(reference)
+        if not references:
+            return {}
+        return {"duplicate_sources": ";".join(references), "duplicate_count": len(references)}
+    
+    @staticmethod
+    def _rehome_metadata(metadata: Dict[str, Any], source: str, owners: List[str]) -> Dict[str, Any]:
+        """
+        Metadata of a chunk shared with `owners` once `source` no longer
+        references it: `source` leaves `duplicate_sources`/`duplicate_count`
+        and the owner flags, and a chunk filed under `source` moves to the
+        first owner (and its page)
+        """
+        owner = owners[0]
+        rehomed = dict(metadata)
+        references = [
+            reference for reference in (metadata.get("duplicate_sources") or "").split(";")
+            if reference and reference.rsplit("#page=", 1)[0] != source
+        ] or [owner]
+        if "duplicate_sources" in metadata:
+            rehomed["duplicate_sources"] = ";".join(references)
+            rehomed["duplicate_count"] = len(references)
+        rehomed.pop(source_flag(source), None)
+        file_name = os.path.basename(source)
+        if all(os.path.basename(other) != file_name for other in owners):
+            rehomed.pop(file_flag(file_name), None)
+        if metadata.get("source") == source:
+            rehomed["source"] = owner
+            if "file_name" in metadata:
+                rehomed["file_name"] = os.path.basename(owner)
+            for reference in references:
+                name, _, page = reference.partition("#page=")
+                if name == owner and page.isdigit():
+                    rehomed["page"] = int(page)
+                    break
+        return rehomed
+    
+    def _update_metadata(self, chunk_ids: List[str], stored: List[Dict[str, Any]], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of chunks whose metadata changed; Chroma merges updates, so dropped keys are set to None"""
+        update_ids, update_metadatas = [], []
+        for chunk_id, old, new in zip(chunk_ids, stored, metadatas):
+            old = old or {}
+            if new != old:
+                update_ids.append(chunk_id)
+                update_metadatas.append({**{key: None for key in old if key not in new}, **new})
+        if update_ids:
+            self.collection.update(ids=update_ids, metadatas=update_metadatas)
+    
+    def _release_chunks(self, source: str, chunk_ids: List[str], index: Dict[str, List[str]]) -> int:
+        """Delete chunks no other source references; re-home shared ones. Returns deleted count"""
+        owners = {}
+        for other, ids in index.items():
+            if other == source:
+                continue
+            for chunk_id in ids:
+                owners.setdefault(chunk_id, []).append(other)
+        
+        orphaned = [chunk_id for chunk_id in chunk_ids if chunk_id not in owners]
+        shared = [chunk_id for chunk_id in chunk_ids if chunk_id in owners]
+        
+        if orphaned:
+            self.collection.delete(ids=orphaned)
+        if shared:
+            # Drop this source from shared chunks and point those that still name it at a surviving owner
+            existing = self.collection.get(ids=shared, include=["metadatas"])
+            self._update_metadata(
+                existing["ids"],
+                existing["metadatas"],
+                [
+                    self._rehome_metadata(metadata or {}, source, owners[chunk_id])
+                    for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+                ],
+            )
+        return len(orphaned)
+    
+    def _adopt_legacy_chunks(self, index: Dict[str, List[str]]) -> bool:
+        """
+        File chunks stored under legacy "<file name>_chunk_<i>" IDs in the
+        source index under their file name, so the next upsert of that file
+        replaces them instead of leaving duplicates. Scans the collection
+        once per process; returns True when the index changed.
+        """
+        with _legacy_checked_lock:
+            if self.source_index_path in _legacy_checked:
+                return False
+            _legacy_checked.add(self.source_index_path)
+        indexed = {chunk_id for ids in index.values() for chunk_id in ids}
+        adopted = 0
+        for chunk_id in self.collection.get(include=[])["ids"]:
+            match = LEGACY_CHUNK_ID.match(chunk_id)
+            if match and chunk_id not in indexed:
+                index.setdefault(match.group(1), []).append(chunk_id)
+                adopted += 1
+        if adopted:
+            print(f"Indexed {adopted} legacy chunks by file name")
+        return adopted > 0
+    
+    def upsert_source(self, source: str, texts: List[str], metadatas: List[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Replace the chunks stored for one source document.
+        Only chunks whose content is not stored yet are embedded, and only
+        chunks this source no longer produces are removed.
+        """
+        metadatas = metadatas if metadatas else [{}] * len(texts)
+        
+        # Collapse repeated content within the source onto one ID
+        chunks = {}
+        for text, metadata in zip(texts, metadatas):
+            chunks.setdefault(self.chunk_id(text), (text, metadata))
+        new_ids = list(chunks)
+        
+        self._check_writable()
+        # Serialize index read-modify-write with other processes sharing the store
+        with file_lock(self.source_index_path + ".lock"):
+            index = self._load_source_index()
+            self._adopt_legacy_chunks(index)
+            old_ids = index.get(source, [])
+            flags = owner_flags(source)
+            
+            found = self.collection.get(ids=new_ids, include=["metadatas"]) if new_ids else {"ids": [], "metadatas": []}
+            existing = {chunk_id: metadata or {} for chunk_id, metadata in zip(found["ids"], found["metadatas"])}
+            to_add = [chunk_id for chunk_id in new_ids if chunk_id not in existing]
+            
+            # Without re-embedding, refresh metadata (tags, upload time) of unchanged chunks this
+            # source owns, and list this source on chunks stored for other sources
+            owned = set(old_ids)
+            to_update = [chunk_id for chunk_id in new_ids if chunk_id in existing]
+            self._update_metadata(
+                to_update,
+                [existing[chunk_id] for chunk_id in to_update],
+                [
+                    {
+                        **{key: value for key, value in existing[chunk_id].items() if key.startswith(OWNER_FLAG_PREFIX)},
+                        **chunks[chunk_id][1],
+                        **flags,
+                    }
+                    if chunk_id in owned
+                    else {**existing[chunk_id], **self._merged_references(existing[chunk_id], chunks[chunk_id][1]), **flags}
+                    for chunk_id in to_update
+                ],
+            )
+            if to_add:
+                self.add_documents(
+                    texts=[chunks[chunk_id][0] for chunk_id in to_add],
+                    metadatas=[{**chunks[chunk_id][1], **flags} for chunk_id in to_add],
+                    ids=to_add
+                )
+            
+            stale = [chunk_id for chunk_id in old_ids if chunk_id not in chunks]
+            removed = self._release_chunks(source, stale, index)
+            
+            # Legacy chunks of the same file, filed under its bare name
+            legacy_key = os.path.basename(source)
+            legacy = [chunk_id for chunk_id in index.get(legacy_key, []) if LEGACY_CHUNK_ID.match(chunk_id)] if legacy_key != source else []
+            if legacy:
+                removed += self._release_chunks(legacy_key, legacy, index)
+                remaining = [chunk_id for chunk_id in index[legacy_key] if chunk_id not in legacy]
+                if remaining:
+                    index[legacy_key] = remaining
+                else:
+                    del index[legacy_key]
+            
+            if new_ids:
+                index[source] = new_ids
+            else:
+                index.pop(source, None)
+            self._save_source_index(index)
+        self._invalidate()
+        
+        stats = {"added": len(to_add), "unchanged": len(new_ids) - len(to_add), "removed": removed}
+        print(f"Upserted source {source}: {stats}")
+        return stats
+    
+    def delete_source(self, source: str) -> int:
+        """Remove a source document; chunks shared with other sources are kept"""
+        self._check_writable()
+        with file_lock(self.source_index_path + ".lock"):
+            index = self._load_source_index()
+            if self._adopt_legacy_chunks(index):
+                self._save_source_index(index)
+            chunk_ids = index.get(source)
+            if chunk_ids is None:
+                return 0
+            removed = self._release_chunks(source, chunk_ids, index)
+            del index[source]
+            self._save_source_index(index)
+        self._invalidate()
+        print(f"Deleted source {source}: {removed} chunks removed")
+        return removed
+    
+    def list_sources(self) -> Dict[str, int]:
+        """Return the indexed sources with their chunk counts"""
+        return {source: len(ids) for source, ids in self._load_source_index().items()}
+    
+    def source_chunk_ids(self, source: str) -> List[str]:
+        """IDs of the chunks indexed for one source"""
+        return self._load_source_index().get(source, [])
+    
     def delete_collection(self):
-        """Delete the entire collection"""
-        self.client.delete_collection("product_ads")
-        print("Collection deleted")
+        """Delete the current namespace's collection and start over with an empty one"""
+        self._check_writable()
+        with self._handles_lock:
+            self._handles.pop(self.namespace, None)
+        try:
+            self.client.delete_collection(self.collection_name(self.namespace))
+        except Exception as e:
+            # Nothing stored yet for this namespace
+            print(f"No collection to delete for namespace {self.namespace}: {e}")
+        self._save_source_index({})
+        self._invalidate()
+        print(f"Collection deleted for namespace {self.namespace}")
+    
+    def export_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        Export the current namespace (vectors, texts, metadata and source
+        index) to a compact snapshot directory, see `utils.vector_snapshot`
+        """
+        with file_lock(self.source_index_path + ".lock"):
+            return export_collection(
+                self.collection,
+                path,
+                embedding_model=self.embedding_model,
+                extra_files={SOURCE_INDEX_FILE: self._load_source_index()},
+            )
+    
+    def import_snapshot(self, path: str, force: bool = False) -> int:
+        """
+        Replace the current namespace's contents with a snapshot, without
+        embedding anything. The live collection is only swapped out once the
+        snapshot is fully loaded, see `utils.vector_snapshot.restore_collection`.
+        Refuses snapshots made with another embedding model unless `force`
+        is set. Returns the number of chunks restored.
+        """
+        self._check_writable()
+        snapshot = Snapshot(path)
+        model = self.embedding_model
+        if snapshot.embedding_model != model and not force:
+            raise SnapshotError(
+                f"Snapshot was embedded with {snapshot.embedding_model}, this store uses {model}"
+            )
+        with file_lock(self.source_index_path + ".lock"):
+            loaded = restore_collection(
+                self.client, self.collection_name(self.namespace), snapshot,
+                metadata=hnsw_metadata(**self.hnsw), embedding_function=self.embedding_function,
+            )
+            with self._handles_lock:
+                self._handles.pop(self.namespace, None)
+            self._save_source_index(snapshot.extra_file(SOURCE_INDEX_FILE) or {})
+            with _legacy_checked_lock:
+                _legacy_checked.discard(self.source_index_path)
+        self._invalidate()
+        print(f"Restored {loaded} chunks into namespace {self.namespace} from {path}")
+        return loaded
+    
+    def prewarm(
+        self,
+        entries: Optional[List[Dict[str, Any]]] = None,
+        seconds: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fill the query-embedding and retrieval caches with the most frequent
+        logged searches and agent questions (`settings.prewarm_queries`),
+        within `seconds` and `max_tokens` of embedding calls (default: the
+        prewarm settings). Run it before admitting traffic.
+        """
+        if entries is None:
+            query_log = get_query_log(self.settings)
+            if query_log is None or not self.settings.prewarm_queries:
+                return {"queries": 0}
+            entries = query_log.top_queries(self.settings.prewarm_queries, kinds=("search", "agent"), replayable=True)
+        
+        def warm(entry: Dict[str, Any]) -> int:
+            view = self.for_namespace(entry.get("namespace"))
+            embedded = (view.embedding_model, normalize_query(entry["query"])) in get_cache("embeddings", self.settings)
+            view._cached_retrieve(entry["query"], **entry.get("params", {}))
+            return 0 if embedded else estimate_tokens(entry["query"])
+        
+        return prewarm(
+            entries, warm,
+            seconds=self.settings.prewarm_seconds if seconds is None else seconds,
+            max_tokens=self.settings.prewarm_max_tokens if max_tokens is None else max_tokens,
+        )
     
     def get_collection_info(self):
         """Get information about the collection"""
@@ -0,0 +1,321 @@
+"""
+Compact export/import of a Chroma collection, without re-embedding.
+
+A snapshot is a directory of
+    embeddings.npy                 float32 (count, dim) array, contiguous and memory-mappable
+    documents.bin / .offsets.npy   UTF-8 texts back to back, with int64 start offsets (count + 1)
+    ids.bin / ids.offsets.npy      chunk IDs, same layout
+    metadata.json                  metadata as columns: {key: [value or null per row]}
+    manifest.json                  format, count, dim, embedding model, collection
+                                   metadata and the sha256 of every other file
+Extra files (e.g. the VectorSearch source index) can ride along and are
+checksummed too. Restore is a bulk `collection.add` with the stored vectors
+into a scratch collection that replaces the live one once fully loaded;
+read-only replicas can instead open the snapshot memory-mapped and search it
+with `Snapshot.search`.
+
+    cd AgenticRAG
+    python -m utils.vector_snapshot export ./snapshots/docs --namespace default
+    python -m utils.vector_snapshot import ./snapshots/docs --namespace default
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from utils.retrieval import exact_search
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+STRING_COLUMNS = ("ids", "documents")
+EXPORT_PAGE_SIZE = 1000
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is malformed, corrupted or incompatible"""
+
+
+def embedding_model_id(embedding_function) -> str:
+    """Identity of an embedding function, e.g. 'openai:text-embedding-3-small'"""
+    name = embedding_function.name() if callable(getattr(embedding_function, "name", None)) else None
+    if not isinstance(name, str):
+        # Legacy/custom embedding functions do not name themselves
+        name = type(embedding_function).__name__
+    model = getattr(embedding_function, "model_name", None) or getattr(embedding_function, "model", None)
+    return f"{name}:{model}" if model else name
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _StringColumnWriter:
+    def __init__(self, directory: str, name: str):
+        self.directory, self.name = directory, name
+        self.offsets = [0]
+        self.handle = open(os.path.join(directory, f"{name}.bin"), "wb")
+
+    def extend(self, values: List[str]):
+        for value in values:
+            encoded = (value or "").encode("utf-8")
+            self.handle.write(encoded)
+            self.offsets.append(self.offsets[-1] + len(encoded))
+
+    def close(self) -> List[str]:
+        self.handle.close()
+        np.save(os.path.join(self.directory, f"{self.name}.offsets.npy"), np.asarray(self.offsets, dtype=np.int64))
+        return [f"{self.name}.bin", f"{self.name}.offsets.npy"]
+
+
+class StringColumn:
+    """Read-only, memory-mapped sequence of strings"""
+
+    def __init__(self, directory: str, name: str):
+        self.offsets = np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode="r")
+        path = os.path.join(directory, f"{name}.bin")
+        # np.memmap cannot map an empty file
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def slice(self, start: int, stop: int) -> List[str]:
+        return [self[i] for i in range(start, min(stop, len(self)))]
+
+
+def export_collection(
+    collection,
+    path: str,
+    embedding_model: str,
+    extra_files: Optional[Dict[str, Any]] = None,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """
+    Write `collection` to a snapshot directory at `path` and return its manifest.
+    `extra_files` maps file names to JSON-serializable content stored alongside.
+    """
+    os.makedirs(path, exist_ok=True)
+    count = collection.count()
+    writers = {name: _StringColumnWriter(path, name) for name in STRING_COLUMNS}
+    columns: Dict[str, List[Any]] = {}
+    embeddings = None
+    written = 0
+
+    while written < count:
+        page = collection.get(
+            limit=page_size, offset=written, include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(path, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(count, vectors.shape[1])
+            )
+        embeddings[written:written + len(vectors)] = vectors
+        writers["ids"].extend(page["ids"])
+        writers["documents"].extend(page["documents"] or [None] * len(page["ids"]))
+        for row, metadata in enumerate(page["metadatas"] or [None] * len(page["ids"])):
+            for key, value in (metadata or {}).items():
+                columns.setdefault(key, [None] * (written + row))
+            for key, values in columns.items():
+                values.append((metadata or {}).get(key))
+        written += len(page["ids"])
+
+    if written != count:
+        raise SnapshotError(f"Collection changed during export: expected {count} records, read {written}")
+    if embeddings is None:
+        embeddings = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(path, EMBEDDINGS_FILE), embeddings)
+    else:
+        embeddings.flush()
+        del embeddings
+
+    files = [EMBEDDINGS_FILE, METADATA_FILE]
+    for writer in writers.values():
+        files.extend(writer.close())
+    with open(os.path.join(path, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(columns, f)
+    for name, content in (extra_files or {}).items():
+        with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=1, sort_keys=True)
+        files.append(name)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "collection": collection.name,
+        "collection_metadata": collection.metadata,
+        "embedding_model": embedding_model,
+        "count": written,
+        "dim": int(np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r").shape[1]),
+        "extra_files": sorted(extra_files or {}),
+        "sha256": {name: _sha256(os.path.join(path, name)) for name in files},
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot directory. Embeddings, IDs and texts are
+    memory-mapped, so opening is cheap and replicas share the page cache.
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise SnapshotError(f"No snapshot manifest at {manifest_path}")
+        with open(manifest_path, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"Unsupported snapshot format {self.manifest.get('format')!r} in {path}")
+        if verify:
+            self.verify()
+
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        self.ids = StringColumn(path, "ids")
+        self.documents = StringColumn(path, "documents")
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            self._columns = json.load(f)
+        if not len(self.ids) == len(self.documents) == len(self.embeddings) == self.manifest["count"]:
+            raise SnapshotError(f"Snapshot columns in {path} disagree with the manifest count")
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def embedding_model(self) -> str:
+        return self.manifest["embedding_model"]
+
+    def verify(self):
+        """Check every file against the manifest checksums"""
+        for name, expected in self.manifest["sha256"].items():
+            file_path = os.path.join(self.path, name)
+            if not os.path.exists(file_path):
+                raise SnapshotError(f"Snapshot file missing: {file_path}")
+            if _sha256(file_path) != expected:
+                raise SnapshotError(f"Checksum mismatch for {file_path}")
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        return {key: values[i] for key, values in self._columns.items() if values[i] is not None}
+
+    def extra_file(self, name: str):
+        """Content of an extra file stored with the snapshot"""
+        if name not in self.manifest["extra_files"]:
+            return None
+        with open(os.path.join(self.path, name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def batches(self, batch_size: int) -> Iterator[Dict[str, Any]]:
+        """Records in `collection.add` keyword form, `batch_size` at a time"""
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield {
+                "ids": self.ids.slice(start, stop),
+                "embeddings": np.ascontiguousarray(self.embeddings[start:stop]),
+                "documents": self.documents.slice(start, stop),
+                "metadatas": [self.metadata(i) or None for i in range(start, stop)],
+            }
+
+    def search(self, query_embedding, k: int = 5) -> List[Dict[str, Any]]:
+        """Exact cosine search over the mapped embeddings, for read-only replicas"""
+        order, distances = exact_search(query_embedding, self.embeddings, k)
+        return [
+            {
+                "id": self.ids[i],
+                "document": self.documents[i],
+                "metadata": self.metadata(i),
+                "distance": distance,
+            }
+            for i, distance in zip(order, distances)
+        ]
+
+
+def import_snapshot(collection, snapshot: Snapshot, batch_size: int) -> int:
+    """Bulk-load a snapshot into an (empty) collection with the stored vectors; returns the count"""
+    loaded = 0
+    for batch in snapshot.batches(batch_size):
+        # No embedding calls: the vectors are supplied
+        collection.add(**{key: value for key, value in batch.items() if not (key == "metadatas" and not any(value))})
+        loaded += len(batch["ids"])
+    return loaded
+
+
+def restore_collection(client, name: str, snapshot: Snapshot, metadata=None, embedding_function=None) -> int:
+    """
+    Replace collection `name` with a snapshot's contents; returns the count.
+    The snapshot is loaded into a scratch collection and its count checked
+    before the live collection is touched, so a failed or partial load
+    leaves the live data in place. The scratch collection then takes over
+    the name and the old collection is dropped.
+    """
+    token = uuid.uuid4().hex[:12]
+    staging, retired = f"restore-{token}", f"retired-{token}"
+    options = {"metadata": metadata}
+    if embedding_function is not None:
+        options["embedding_function"] = embedding_function
+    collection = client.create_collection(staging, **options)
+    try:
+        loaded = import_snapshot(collection, snapshot, client.get_max_batch_size())
+        if collection.count() != len(snapshot):
+            raise SnapshotError(f"Restored {collection.count()} of {len(snapshot)} records from {snapshot.path}")
+    except BaseException:
+        client.delete_collection(staging)
+        raise
+
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    live = client.get_collection(name) if name in names else None
+    if live is not None:
+        live.modify(name=retired)
+    try:
+        collection.modify(name=name)
+    except BaseException:
+        if live is not None:
+            live.modify(name=name)
+        client.delete_collection(staging)
+        raise
+    if live is not None:
+        client.delete_collection(retired)
+    return loaded
+
+
+def main():
+    from utils.vector_search_clean import VectorSearch
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="snapshot directory")
+    parser.add_argument("--persist-dir", default=None, help="vector store directory (default: VECTOR_DB_PATH)")
+    parser.add_argument("--namespace", default=None, help="workspace collection to export or restore into")
+    parser.add_argument("--force", action="store_true", help="import even if the embedding model differs")
+    args = parser.parse_args()
+
+    vector_db = VectorSearch(persist_directory=args.persist_dir).for_namespace(args.namespace)
+    if args.action == "export":
+        manifest = vector_db.export_snapshot(args.path)
+        print(f"Exported {manifest['count']} chunks ({manifest['embedding_model']}) to {args.path}")
+    else:
+        loaded = vector_db.import_snapshot(args.path, force=args.force)
+        print(f"Restored {loaded} chunks into namespace {vector_db.namespace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Watch document directories and keep the vector store in sync, file by file.
+
+Filesystem events (inotify on Linux, via the optional `watchdog` package)
+only mark paths as dirty. Once no event has arrived for `debounce` seconds,
+or the oldest dirty path has waited `max_delay` seconds, the dirty paths are
+handled as one batch. Files that exist and changed (mtime/size) are upserted
+and files that are gone are deleted. An editor's save burst, or a copy of
+many files, therefore costs one re-index per file. Writers that index a
+file themselves (drag-drop's /upload) `claim` it, so the watcher leaves it
+alone meanwhile. The last indexed
+signature of every file is kept in a state file, so a restart only
+re-indexes what changed while the watcher was down.
+
+    cd AgenticRAG
+    python -m utils.watcher uploads
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: only the watcher service needs it
+    FileSystemEventHandler = object
+    Observer = None
+
+from utils.document_loader import SUPPORTED_EXTENSIONS, DocumentLoader
+
+# Quiet period after the last event before a batch is indexed
+DEFAULT_DEBOUNCE_SECONDS = 1.0
+# Upper bound on how long a dirty file waits while events keep arriving
+DEFAULT_MAX_DELAY_SECONDS = 10.0
+# Editor swap/lock files and partial downloads
+IGNORED_PREFIXES = (".", "~$", ".~lock")
+IGNORED_SUFFIXES = (".tmp", ".swp", ".part", ".crdownload")
+
+
+class _DirtyPathHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "DocumentWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if event.is_directory:
+            # A directory's "modified" only echoes changes of its files, which get their own events
+            if event.event_type in ("created", "deleted", "moved"):
+                for path in filter(None, paths):
+                    self.watcher.mark_tree(path)
+        else:
+            self.watcher.mark(*filter(None, paths))
+
+
+class DocumentWatcher:
+    """
+    Incrementally index the supported documents under `directories`.
+    `upsert(path)` (re-)indexes one file, `delete(path)` removes its chunks;
+    paths are absolute.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[str],
+        upsert: Callable[[str], Any],
+        delete: Callable[[str], Any],
+        state_path: Optional[str] = None,
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+        extensions: Iterable[str] = SUPPORTED_EXTENSIONS,
+    ):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.upsert = upsert
+        self.delete = delete
+        self.state_path = state_path
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.extensions = tuple(extensions)
+        # path -> [mtime_ns, size] as last indexed
+        self.state: Dict[str, List[int]] = self._load_state()
+        self.stats = {"batches": 0, "upserted": 0, "deleted": 0, "failed": 0}
+        self._dirty: Dict[str, float] = {}
+        # path -> number of writers currently indexing it themselves
+        self._claimed: Dict[str, int] = {}
+        self._first_dirty = None
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._index_lock = threading.Lock()
+        self._stopped = False
+        self._observer = None
+        self._thread = None
+
+    def watches(self, path: str) -> bool:
+        name = os.path.basename(path)
+        if name.startswith(IGNORED_PREFIXES) or name.lower().endswith(IGNORED_SUFFIXES):
+            return False
+        return os.path.splitext(name)[1].lower() in self.extensions and any(
+            path == directory or path.startswith(directory + os.sep) for directory in self.directories
+        )
+
+    def mark(self, *paths: str):
+        """Queue files for re-indexing (or removal, if they no longer exist)"""
+        now = time.monotonic()
+        with self._cond:
+            for path in paths:
+                path = os.path.abspath(path)
+                if self.watches(path) and path not in self._claimed:
+                    self._dirty[path] = now
+                    self._first_dirty = self._first_dirty or now
+            self._last_event = now
+            self._cond.notify()
+
+    def mark_tree(self, directory: str):
+        """Queue every file under a directory that appeared, moved or vanished"""
+        directory = os.path.abspath(directory)
+        known = [path for path in self.state if path.startswith(directory + os.sep)]
+        self.mark(*known, *self._walk([directory]))
+
+    def sync(self):
+        """Index what changed since the state was saved, e.g. while the watcher was down"""
+        current = {path: self._signature(path) for path in self._walk(self.directories)}
+        changed = [path for path, signature in current.items() if self.state.get(path) != signature]
+        vanished = [path for path in self.state if path not in current]
+        self._index(changed + vanished)
+
+    def record(self, path: str):
+        """Note that `path` was indexed (or removed) elsewhere, so its next event is a no-op"""
+        path = os.path.abspath(path)
+        with self._index_lock:
+            signature = self._signature(path)
+            if signature:
+                self.state[path] = signature
+            else:
+                self.state.pop(path, None)
+            self._save_state()
+
+    @contextmanager
+    def claim(self, path: str):
+        """
+        Write and index `path` outside the watcher. Its events are ignored
+        while the claim is held; on success it is recorded as indexed,
+        on failure it is queued so the watcher indexes it instead. Blocks
+        while a batch is being indexed, so call it from a worker thread.
+        """
+        path = os.path.abspath(path)
+        with self._cond:
+            self._claimed[path] = self._claimed.get(path, 0) + 1
+        # A batch already indexing the old file finishes first, so it cannot overwrite the new chunks
+        with self._index_lock:
+            pass
+        try:
+            yield
+        except BaseException:
+            self._release(path)
+            self.mark(path)
+            raise
+        self._release(path)
+        self.record(path)
+
+    def _release(self, path: str):
+        with self._cond:
+            self._claimed[path] -= 1
+            if not self._claimed[path]:
+                del self._claimed[path]
+            self._dirty.pop(path, None)
+
+    def start(self, initial_sync: bool = True) -> "DocumentWatcher":
+        if Observer is None:
+            raise ImportError("The document watcher needs the watchdog package: pip install watchdog")
+        if initial_sync:
+            self.sync()
+        self._observer = Observer()
+        handler = _DirtyPathHandler(self)
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+            self._observer.schedule(handler, directory, recursive=True)
+        self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="document-watcher", daemon=True)
+        self._thread.start()
+        print(f"Watching {', '.join(self.directories)} for document changes")
+        return self
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=30)
+
+    def flush(self):
+        """Index every dirty path now, without waiting for the debounce"""
+        with self._cond:
+            batch, self._dirty, self._first_dirty = list(self._dirty), {}, None
+        self._index(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._dirty:
+                        now = time.monotonic()
+                        wait = min(self._last_event + self.debounce, self._first_dirty + self.max_delay) - now
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+            self.flush()
+
+    def _index(self, paths: List[str]):
+        if not paths:
+            return
+        with self._index_lock:
+            self.stats["batches"] += 1
+            for path in sorted(set(paths)):
+                with self._cond:
+                    if path in self._claimed:
+                        continue
+                signature = self._signature(path)
+                try:
+                    if signature and signature != self.state.get(path):
+                        self.upsert(path)
+                        self.state[path] = signature
+                        self.stats["upserted"] += 1
+                    elif not signature and path in self.state:
+                        self.delete(path)
+                        del self.state[path]
+                        self.stats["deleted"] += 1
+                except Exception as e:
+                    # Left out of the state, so the next change or sync retries it
+                    self.stats["failed"] += 1
+                    print(f"Watcher failed to index {path}: {e}")
+            self._save_state()
+
+    def _walk(self, directories: Iterable[str]) -> List[str]:
+        paths = []
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                paths.extend(path for path in (os.path.join(root, name) for name in files) if self.watches(path))
+        return paths
+
+    @staticmethod
+    def _signature(path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_state(self) -> Dict[str, List[int]]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+
+class UploadsIndexer:
+    """
+    Index an uploads directory laid out like drag-drop's: files in the root
+    belong to the default workspace, files under `<root>/<workspace>/` to
+    that workspace's collection.
+    """
+
+    def __init__(self, vector_db, root: str):
+        self.vector_db = vector_db
+        self.root = os.path.abspath(root)
+
+    def loader_for(self, path: str) -> DocumentLoader:
+        parts = os.path.relpath(path, self.root).split(os.sep)
+        namespace = parts[0] if len(parts) > 1 else None
+        return DocumentLoader(vector_db=self.vector_db.for_namespace(namespace))
+
+    def upsert(self, path: str):
+        return self.loader_for(path).upsert_source(path)
+
+    def delete(self, path: str):
+        return self.loader_for(path).delete_source(path)
+
+
+def watch_uploads(vector_db, root: str, **kwargs) -> DocumentWatcher:
+    """Start a watcher that keeps `vector_db`'s workspace collections in sync with `root`"""
+    indexer = UploadsIndexer(vector_db, root)
+    state_path = os.path.join(vector_db.index_directory, "watch_state.uploads.json")
+    return DocumentWatcher([root], indexer.upsert, indexer.delete, state_path=state_path, **kwargs).start()
+
+
+def main():
+    from utils.vector_search_clean import VectorSearch
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="uploads directory to watch")
+    parser.add_argument("--persist-dir", default=None, help="vector store directory (default: VECTOR_DB_PATH)")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS)
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY_SECONDS)
+    args = parser.parse_args()
+
+    watcher = watch_uploads(
+        VectorSearch(persist_directory=args.persist_dir), args.directory,
+        debounce=args.debounce, max_delay=args.max_delay,
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
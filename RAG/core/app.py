@@ -4,12 +4,22 @@ Streamlit UI for Document-Based Q&A System
 
 import os
 import streamlit as st
+# config puts AgenticRAG's utils on sys.path, so it comes before any utils import
+import config
 from qa_system import QASystem
 from document_processor import DocumentProcessor
+from chat_store import ChatStore, prune_archives
 # from config import validate_api_key
 from dotenv import load_dotenv
+from utils.watcher import DocumentWatcher
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
+# Keep the documents/ folder indexed in the background (needs watchdog)
+WATCH_DOCUMENTS = os.getenv("WATCH_DOCUMENTS", "false").lower() in ("1", "true", "yes")
+# Messages the chat fragment draws before the page is redrawn in full
+FRAGMENT_MAX_MESSAGES = 6
+# Archived messages loaded per "Show earlier messages" click
+ARCHIVE_PAGE_MESSAGES = 20
 
 
 def initialize_session_state():
@@ -18,12 +28,16 @@ def initialize_session_state():
         st.session_state.vector_store = None
     if "qa_system" not in st.session_state:
         st.session_state.qa_system = None
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "chat_store" not in st.session_state:
+        st.session_state.chat_store = ChatStore()
+    if "archived_shown" not in st.session_state:
+        st.session_state.archived_shown = 0
     if "documents_loaded" not in st.session_state:
         st.session_state.documents_loaded = False
     if "uploaded_files_processed" not in st.session_state:
         st.session_state.uploaded_files_processed = False
+    if "loaded_sources" not in st.session_state:
+        st.session_state.loaded_sources = []
 
 
 def load_documents(api_key: str):
@@ -39,10 +53,13 @@ def load_documents(api_key: str):
             # Split documents
             split_docs = processor.split_documents(docs)
             st.info(f"📄 Split into {len(split_docs)} chunks")
+            if processor.last_dedup_stats and processor.last_dedup_stats["saved"]:
+                st.info(f"♻️ Collapsed {processor.last_dedup_stats['saved']} duplicate chunks")
             
             # Create vector store
             vector_store = processor.create_vector_store(split_docs, api_key)
             st.session_state.vector_store = vector_store
+            st.session_state.loaded_sources = sorted({doc.metadata["file_name"] for doc in docs})
             
             # Initialize QA system
             st.session_state.qa_system = QASystem(vector_store, api_key)
@@ -74,10 +91,13 @@ def load_uploaded_documents(api_key: str, uploaded_files):
             # Split documents
             split_docs = processor.split_documents(docs)
             st.info(f"📄 Split into {len(split_docs)} chunks")
+            if processor.last_dedup_stats and processor.last_dedup_stats["saved"]:
+                st.info(f"♻️ Collapsed {processor.last_dedup_stats['saved']} duplicate chunks")
             
             # Create vector store
             vector_store = processor.create_vector_store(split_docs, api_key)
             st.session_state.vector_store = vector_store
+            st.session_state.loaded_sources = sorted({doc.metadata["file_name"] for doc in docs})
             
             # Initialize QA system
             st.session_state.qa_system = QASystem(vector_store, api_key)
@@ -93,18 +113,106 @@ def load_uploaded_documents(api_key: str, uploaded_files):
     return True
 
 
-def display_message(role: str, content: str, sources: list = None):
+@st.cache_resource
+def start_document_watcher(api_key: str) -> DocumentWatcher:
+    """One watcher per server: re-indexes files in documents/ as they are added, edited or removed."""
+    processor = DocumentProcessor()
+    return DocumentWatcher(
+        [processor.documents_path],
+        upsert=lambda path: processor.upsert_source(path, api_key),
+        delete=processor.delete_source,
+        state_path=os.path.join(processor.persist_directory, "watch_state.documents.json"),
+    ).start()
+
+
+@st.cache_resource
+def prewarm_caches(api_key: str) -> dict:
+    """Once per server: replay the most frequent logged questions into the query caches."""
+    vector_store = DocumentProcessor().load_vector_store(api_key)
+    return QASystem(vector_store, api_key).prewarm()
+
+
+def attach_watched_documents(api_key: str, watcher: DocumentWatcher):
+    """Answer from the watched store without an explicit load; new files show up as they are indexed."""
+    vector_store = DocumentProcessor().load_vector_store(api_key)
+    st.session_state.vector_store = vector_store
+    st.session_state.loaded_sources = sorted({os.path.basename(path) for path in watcher.state})
+    st.session_state.qa_system = QASystem(vector_store, api_key)
+    st.session_state.documents_loaded = True
+
+
+@st.cache_resource
+def prune_chat_archives() -> int:
+    """Once per server: remove archives of long-idle chat sessions."""
+    return prune_archives()
+
+
+def render_sources(store: ChatStore, message: dict):
+    """Sources behind a toggle; they are read from the chat archive only while it is on."""
+    ref = message.get("sources")
+    if not ref:
+        return
+    if st.toggle(f"📚 View Sources ({ref['count']})", key=f"sources_{message['seq']}"):
+        for i, source in enumerate(store.load_sources(message), 1):
+            file_name = os.path.basename(source['file'])
+            st.markdown(f"**Source {i}: {file_name}**")
+            st.text(source['content'])
+            st.divider()
+
+
+# In the full-page history, toggling sources reruns only that message
+render_sources_fragment = st.fragment(render_sources)
+
+
+def display_message(store: ChatStore, message: dict, sources_renderer=render_sources):
     """Display a chat message with optional sources."""
-    with st.chat_message(role):
-        st.markdown(content)
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        sources_renderer(store, message)
+
+
+def display_history(store: ChatStore):
+    """Full-page history: archived messages the user asked for, then the in-memory window."""
+    if store.archived:
+        shown = min(st.session_state.archived_shown, store.archived)
+        if shown < store.archived and st.button(f"⬆️ Show earlier messages ({store.archived - shown} archived)"):
+            st.session_state.archived_shown = shown + ARCHIVE_PAGE_MESSAGES
+            st.rerun()
+        for message in store.load_archived(shown):
+            display_message(store, message, render_sources_fragment)
+    for message in store.messages:
+        display_message(store, message, render_sources_fragment)
+    st.session_state.rendered_seq = store.last_seq
+
+
+@st.fragment
+def chat_panel():
+    """
+    The current turns and the chat input. Asking a question reruns only this
+    fragment, so the history above is not redrawn on every turn.
+    """
+    store = st.session_state.chat_store
+    for message in store.since(st.session_state.rendered_seq):
+        display_message(store, message)
+    
+    if question := st.chat_input("Ask a question about your documents..."):
+        display_message(store, store.add("user", question))
+        
+        # Get answer from QA system
+        try:
+            with st.spinner("Searching documents..."):
+                source_filter = st.session_state.get("source_filter")
+                filters = {"source": source_filter} if source_filter else None
+                result = st.session_state.qa_system.ask(question, filters=filters)
+            
+            display_message(store, store.add("assistant", result["answer"], result["sources"]))
+            
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
         
-        if sources:
-            with st.expander("📚 View Sources"):
-                for i, source in enumerate(sources, 1):
-                    file_name = os.path.basename(source['file'])
-                    st.markdown(f"**Source {i}: {file_name}**")
-                    st.text(source['content'])
-                    st.divider()
+        # Fold the turns drawn here into the full-page history now and then
+        if len(store.since(st.session_state.rendered_seq)) >= min(FRAGMENT_MAX_MESSAGES, store.window):
+            st.rerun()
 
 
 def main():
@@ -118,6 +226,15 @@ def main():
     st.markdown("Ask questions about your documents and get grounded answers with sources!")
     
     initialize_session_state()
+    prune_chat_archives()
+    
+    if api_key:
+        prewarm_caches(api_key)
+    
+    if WATCH_DOCUMENTS and api_key:
+        watcher = start_document_watcher(api_key)
+        if not st.session_state.documents_loaded:
+            attach_watched_documents(api_key, watcher)
     
     # Sidebar for configuration
     with st.sidebar:
@@ -135,8 +252,14 @@ def main():
         
         if doc_source == "Load from folder":
             st.info("Place your documents in the `documents/` folder")
-            
-            if st.button("🔄 Load Documents from Folder"):
+            if WATCH_DOCUMENTS and api_key:
+                st.caption("👀 Watching the folder: changes are indexed within seconds")
+                # A full load would re-add every chunk the watcher already indexed
+                if st.button("🔄 Re-scan Documents Folder"):
+                    with st.spinner("Indexing changed documents..."):
+                        watcher.sync()
+                    attach_watched_documents(api_key, watcher)
+            elif st.button("🔄 Load Documents from Folder"):
                 load_documents(api_key)
         else:
             st.info("Upload PDF, DOCX, or TXT files")
@@ -153,6 +276,12 @@ def main():
         
         if st.session_state.documents_loaded:
             st.success("✅ Documents loaded")
+            st.multiselect(
+                "🔎 Limit answers to files",
+                st.session_state.loaded_sources,
+                key="source_filter",
+                help="Leave empty to search all loaded documents"
+            )
         
         st.divider()
         
@@ -170,7 +299,8 @@ def main():
         """)
         
         if st.button("🗑️ Clear Chat History"):
-            st.session_state.messages = []
+            st.session_state.chat_store.clear()
+            st.session_state.archived_shown = 0
             if st.session_state.qa_system:
                 st.session_state.qa_system.clear_history()
             st.rerun()
@@ -184,41 +314,9 @@ def main():
         st.info("👈 Click 'Load Documents' in the sidebar to start")
         st.stop()
     
-    # Display chat history
-    for message in st.session_state.messages:
-        display_message(
-            message["role"],
-            message["content"],
-            message.get("sources")
-        )
-    
-    # Chat input
-    if question := st.chat_input("Ask a question about your documents..."):
-        # Add user message to chat history
-        st.session_state.messages.append({
-            "role": "user",
-            "content": question
-        })
-        display_message("user", question)
-        
-        # Get answer from QA system
-        try:
-            with st.spinner("Searching documents..."):
-                result = st.session_state.qa_system.ask(question)
-                
-            answer = result["answer"]
-            sources = result["sources"]
-            
-            # Add assistant message to chat history
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": answer,
-                "sources": sources
-            })
-            display_message("assistant", answer, sources)
-            
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
+    # Display chat history, then the incrementally rendered chat
+    display_history(st.session_state.chat_store)
+    chat_panel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""
+Bounded chat history for the Streamlit app.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+# Messages kept in memory per session; older ones are archived to disk
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "40"))
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "./chat_archive")
+# Archives of sessions untouched for this long are removed by `prune_archives`
+CHAT_ARCHIVE_MAX_AGE_SECONDS = float(os.getenv("CHAT_ARCHIVE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+MESSAGES_FILE = "messages.jsonl"
+SOURCES_FILE = "sources.jsonl"
+
+
+class ChatStore:
+    """
+    The last `window` messages of one chat session, in memory.
+
+    Older messages move to `<archive_dir>/<session_id>/messages.jsonl`.
+    Source snippets are never kept in memory: they are appended to
+    `sources.jsonl` when a message is added, and the message keeps only
+    their offset and count, so `load_sources` reads them back when the
+    user opens them. Messages carry an increasing `seq`, so a renderer can
+    ask for what was added `since` it last drew.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, archive_dir: str = CHAT_ARCHIVE_DIR, window: int = CHAT_WINDOW_MESSAGES):
+        if window < 1:
+            raise ValueError(f"window must be at least 1, got {window}")
+        self.session_id = session_id or uuid.uuid4().hex
+        self.directory = os.path.join(archive_dir, self.session_id)
+        self.window = window
+        self.messages: deque = deque()
+        self.archived = 0
+        self.last_seq = -1
+
+    def __len__(self) -> int:
+        return self.archived + len(self.messages)
+
+    def add(self, role: str, content: str, sources: Optional[List[Dict]] = None) -> Dict:
+        """Append a message; its sources go straight to disk"""
+        self.last_seq += 1
+        message = {"seq": self.last_seq, "role": role, "content": content}
+        if sources:
+            message["sources"] = self._write_sources(sources)
+        self.messages.append(message)
+        while len(self.messages) > self.window:
+            self._archive(self.messages.popleft())
+        return message
+
+    def since(self, seq: int) -> List[Dict]:
+        """In-memory messages added after `seq`"""
+        return [message for message in self.messages if message["seq"] > seq]
+
+    def load_sources(self, message: Dict) -> List[Dict]:
+        """Source snippets of a message, read from disk"""
+        ref = message.get("sources")
+        if not ref:
+            return []
+        with open(os.path.join(self.directory, SOURCES_FILE), "rb") as f:
+            f.seek(ref["offset"])
+            return json.loads(f.read(ref["length"]).decode("utf-8"))
+
+    def load_archived(self, count: int) -> List[Dict]:
+        """The `count` most recent archived messages, oldest first"""
+        path = os.path.join(self.directory, MESSAGES_FILE)
+        if count <= 0 or not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in deque(f, maxlen=count)]
+
+    def clear(self):
+        """Forget the conversation, including its archive"""
+        self.messages.clear()
+        self.archived = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_sources(self, sources: List[Dict]) -> Dict:
+        os.makedirs(self.directory, exist_ok=True)
+        encoded = json.dumps(sources, ensure_ascii=False).encode("utf-8")
+        with open(os.path.join(self.directory, SOURCES_FILE), "ab") as f:
+            offset = f.tell()
+            f.write(encoded + b"\n")
+        return {"offset": offset, "length": len(encoded), "count": len(sources)}
+
+    def _archive(self, message: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, MESSAGES_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(message, ensure_ascii=False) + "\n")
+        self.archived += 1
+
+
+def prune_archives(archive_dir: str = CHAT_ARCHIVE_DIR, max_age_seconds: float = CHAT_ARCHIVE_MAX_AGE_SECONDS) -> int:
+    """Remove session archives not written to for `max_age_seconds`; returns how many"""
+    if not os.path.isdir(archive_dir):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for name in os.listdir(archive_dir):
+        path = os.path.join(archive_dir, name)
+        if not os.path.isdir(path):
+            continue
+        # Appending to a file does not touch the directory's mtime
+        last_write = max([os.path.getmtime(path)] + [os.path.getmtime(os.path.join(path, f)) for f in os.listdir(path)])
+        if last_write < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -1,7 +1,26 @@
-# Configuration constants
-DEFAULT_MODEL = "gpt-3.5-turbo"
-DEFAULT_CHUNK_SIZE = 1000
-DEFAULT_CHUNK_OVERLAP = 200
-DEFAULT_K_DOCUMENTS = 3
-VECTOR_DB_PATH = "./chroma_db"
-DOCUMENTS_PATH = "./documents"
+"""
+Configuration for the RAG system.
+
+Settings are shared with AgenticRAG and the drag-drop server and are read
+from the environment (CHUNK_SIZE, CHUNK_OVERLAP, K_DOCUMENTS, RAG_MODEL,
+VECTOR_DB_PATH, DOCUMENTS_PATH, ...), see `utils.settings`.
+"""
+import os
+import sys
+
+# Make AgenticRAG utils importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+AGENTIC_RAG_UTILS = os.path.abspath(os.path.join(ROOT, 'AgenticRAG'))
+if AGENTIC_RAG_UTILS not in sys.path:
+    sys.path.insert(0, AGENTIC_RAG_UTILS)
+
+from utils.settings import Settings, get_settings
+
+# Configuration constants, as resolved at import
+_settings = get_settings()
+DEFAULT_MODEL = _settings.model
+DEFAULT_CHUNK_SIZE = _settings.chunk_size
+DEFAULT_CHUNK_OVERLAP = _settings.chunk_overlap
+DEFAULT_K_DOCUMENTS = _settings.k_documents
+VECTOR_DB_PATH = _settings.vector_db_path
+DOCUMENTS_PATH = _settings.documents_path
@@ -3,30 +3,53 @@ Document loader and vector store utilities for RAG system.
 """
 
 import os
+import time
+import hashlib
 import tempfile
 from typing import List
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     DirectoryLoader, 
     TextLoader, 
-    PyPDFLoader,
     Docx2txtLoader,
 )
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
+# config puts AgenticRAG's utils on sys.path, so it comes before any utils import
+from config import Settings, get_settings
+from utils.dedup import ChunkDeduplicator
+from utils.pdf_extract import load_pdf
+from utils.chroma_client import ReadOnlyStoreError, client_mode_from_env, create_client
+from utils.retrieval import apply_hnsw_search_params, hnsw_metadata, hnsw_params_from_env
+from utils.vector_snapshot import Snapshot, SnapshotError, export_collection, restore_collection
+from utils.query_cache import bump_generation, store_scope
+
+# Embedding model of the store (the langchain_openai default); recorded in snapshots
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_MODEL_ID = f"openai:{EMBEDDING_MODEL}"
+
 
 class DocumentProcessor:
     """Handles document loading and processing for the RAG system."""
     
-    def __init__(self, documents_path: str = "./documents"):
-        self.documents_path = documents_path
+    def __init__(self, documents_path: str = None, deduplicate: bool = True, hnsw: dict = None, client_mode: str = None, settings: Settings = None):
+        # Paths and chunking; get_settings() (environment) by default
+        self.settings = settings or get_settings()
+        self.documents_path = documents_path or self.settings.documents_path
+        self.persist_directory = self.settings.vector_db_path
+        # embedded, http (shared `chroma run` server) or read-only snapshot; CHROMA_MODE by default
+        self.client_mode = client_mode or client_mode_from_env()
+        # HNSW index parameters for the Chroma collection, HNSW_* env vars by default
+        self.hnsw = hnsw if hnsw is not None else hnsw_params_from_env()
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=self.settings.chunk_size,
+            chunk_overlap=self.settings.chunk_overlap,
             length_function=len,
         )
+        self.deduplicator = ChunkDeduplicator() if deduplicate else None
+        self.last_dedup_stats = None
     
     def load_documents(self) -> List[Document]:
         """Load all documents from the documents directory."""
@@ -56,8 +79,7 @@ class DocumentProcessor:
         
         for pdf_file in pdf_files:
             try:
-                loader = PyPDFLoader(pdf_file)
-                all_documents.extend(loader.load())
+                all_documents.extend(self._load_pdf(pdf_file))
             except Exception as e:
                 print(f"Error loading {pdf_file}: {e}")
         
@@ -78,7 +100,7 @@ class DocumentProcessor:
         if not all_documents:
             raise ValueError("No documents found in the directory")
         
-        return all_documents
+        return self._add_filter_metadata(all_documents)
     
     def load_uploaded_files(self, uploaded_files) -> List[Document]:
         """Load documents from uploaded files."""
@@ -91,20 +113,11 @@ class DocumentProcessor:
                 tmp_path = tmp_file.name
             
             try:
-                # Determine loader based on file extension
-                file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-                
-                if file_extension == '.pdf':
-                    loader = PyPDFLoader(tmp_path)
-                elif file_extension == '.docx':
-                    loader = Docx2txtLoader(tmp_path)
-                elif file_extension == '.txt':
-                    loader = TextLoader(tmp_path)
-                else:
+                docs = self._load_file(tmp_path)
+                if docs is None:
                     # Skip unsupported file types
                     continue
                 
-                docs = loader.load()
                 # Add filename to metadata
                 for doc in docs:
                     doc.metadata['source'] = uploaded_file.name
@@ -118,31 +131,203 @@ class DocumentProcessor:
                 except:
                     pass
         
+        return self._add_filter_metadata(documents)
+    
+    def _load_file(self, path: str):
+        """Load one file based on its extension; None for unsupported types."""
+        file_extension = os.path.splitext(path)[1].lower()
+        if file_extension == '.pdf':
+            return self._load_pdf(path)
+        if file_extension == '.docx':
+            return Docx2txtLoader(path).load()
+        if file_extension == '.txt':
+            return TextLoader(path).load()
+        return None
+    
+    def _load_pdf(self, path: str) -> List[Document]:
+        """Extract a PDF page by page with the configured backend, large files in parallel."""
+        return load_pdf(path, backend=self.settings.pdf_backend, workers=self.settings.pdf_workers)
+    
+    def _add_filter_metadata(self, documents: List[Document]) -> List[Document]:
+        """Add the metadata retrieval prefilters match on (file name, upload time)."""
+        uploaded_at = time.time()
+        for doc in documents:
+            doc.metadata['file_name'] = os.path.basename(doc.metadata.get('source', 'unknown'))
+            doc.metadata['uploaded_at'] = uploaded_at
         return documents
     
     def split_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into smaller chunks."""
-        return self.text_splitter.split_documents(documents)
+        """Split documents into smaller chunks, collapsing duplicate chunks."""
+        chunks = self.text_splitter.split_documents(documents)
+        if self.deduplicator:
+            chunks, self.last_dedup_stats = self.deduplicator.deduplicate(chunks)
+        return chunks
     
     def create_vector_store(self, documents: List[Document], api_key: str) -> Chroma:
         """Create a vector store from documents."""
-        embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+        if self.client_mode == "snapshot":
+            raise ReadOnlyStoreError("Cannot build the vector store from a read-only snapshot client")
+        embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=api_key)
+        client, _ = create_client(self.persist_directory, self.client_mode)
         
         vector_store = Chroma.from_documents(
             documents=documents,
             embedding=embeddings,
-            persist_directory="./chroma_db"
+            client=client,
+            persist_directory=self.persist_directory,
+            collection_metadata=self._collection_metadata()
         )
+        self._invalidate()
         
         return vector_store
     
     def load_vector_store(self, api_key: str) -> Chroma:
         """Load existing vector store."""
-        embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+        embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=api_key)
+        client, _ = create_client(self.persist_directory, self.client_mode)
         
         vector_store = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=embeddings
+            client=client,
+            persist_directory=self.persist_directory,
+            embedding_function=embeddings,
+            collection_metadata=self._collection_metadata()
         )
+        apply_hnsw_search_params(vector_store._collection, **self.hnsw)
         vector_store.persist()
         return vector_store
+    
+    def _collection_metadata(self):
+        """HNSW parameters as collection metadata; keeps Chroma's default distance space"""
+        return hnsw_metadata(space=None, **self.hnsw) or None
+    
+    def _invalidate(self):
+        """Retire QASystem retrieval results cached for this store after a write"""
+        bump_generation(store_scope(self.persist_directory, Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME))
+    
+    @staticmethod
+    def _source_where(path: str) -> dict:
+        """Match a file's chunks whether it was loaded by relative, ./-prefixed or absolute path."""
+        relative = os.path.relpath(os.path.abspath(path))
+        variants = list(dict.fromkeys([path, os.path.abspath(path), relative, os.path.join(".", relative)]))
+        return {"source": {"$in": variants}}
+    
+    def upsert_source(self, path: str, api_key: str) -> dict:
+        """
+        Re-index one file in place (used by the document watcher): chunks it
+        still produces are kept, new ones embedded and stale ones deleted.
+        """
+        if self.client_mode == "snapshot":
+            raise ReadOnlyStoreError("Cannot index into a read-only snapshot client")
+        docs = self._load_file(path)
+        if docs is None:
+            raise ValueError(f"Unsupported file type: {path}")
+        for doc in docs:
+            doc.metadata['source'] = path
+        chunks = {}
+        for chunk in self.split_documents(self._add_filter_metadata(docs)):
+            key = hashlib.sha256(f"{path}\0{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+            chunks.setdefault(key, chunk)
+        
+        vector_store = self.load_vector_store(api_key)
+        existing = set(vector_store.get(where=self._source_where(path), include=[])["ids"])
+        stale = [chunk_id for chunk_id in existing if chunk_id not in chunks]
+        new = [chunk_id for chunk_id in chunks if chunk_id not in existing]
+        removed = self._release_chunks(vector_store._collection, path, stale)
+        if new:
+            vector_store.add_documents([chunks[chunk_id] for chunk_id in new], ids=new)
+        self._invalidate()
+        stats = {"added": len(new), "unchanged": len(chunks) - len(new), "removed": removed}
+        print(f"Upserted source {path}: {stats}")
+        return stats
+    
+    def delete_source(self, path: str) -> int:
+        """Remove one file's chunks from the vector store; chunks other files share are kept."""
+        if self.client_mode == "snapshot":
+            raise ReadOnlyStoreError("Cannot delete from a read-only snapshot client")
+        client, _ = create_client(self.persist_directory, self.client_mode)
+        collection = client.get_or_create_collection(Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME, metadata=self._collection_metadata())
+        ids = collection.get(where=self._source_where(path), include=[])["ids"]
+        removed = self._release_chunks(collection, path, ids)
+        self._invalidate()
+        print(f"Deleted source {path}: {removed} chunks removed")
+        return removed
+    
+    def _release_chunks(self, collection, path: str, ids: List[str]) -> int:
+        """
+        Take one file off the chunks `ids` filed under it. Chunks the
+        deduplicator collapsed across files move to another file listed in
+        their `duplicate_sources`; the rest are deleted. Other files' chunks
+        that also stood in for this file stop listing it. Returns the
+        number of chunks deleted.
+        """
+        variants = set(self._source_where(path)["source"]["$in"])
+        orphaned, update_ids, update_metadatas = [], [], []
+        if ids:
+            existing = collection.get(ids=ids, include=["metadatas"])
+            for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+                rehomed = self._drop_references(metadata or {}, variants)
+                if rehomed is None:
+                    orphaned.append(chunk_id)
+                else:
+                    update_ids.append(chunk_id)
+                    update_metadatas.append(rehomed)
+        shared = collection.get(where={"duplicate_count": {"$gt": 1}}, include=["metadatas"])
+        for chunk_id, metadata in zip(shared["ids"], shared["metadatas"]):
+            if metadata.get("source") in variants:
+                continue
+            rehomed = self._drop_references(metadata, variants)
+            if rehomed != metadata:
+                update_ids.append(chunk_id)
+                update_metadatas.append(rehomed)
+        if orphaned:
+            collection.delete(ids=orphaned)
+        if update_ids:
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+        return len(orphaned)
+    
+    @staticmethod
+    def _drop_references(metadata: dict, variants: set):
+        """
+        Chunk metadata without the file known by `variants` in
+        `duplicate_sources`, moved to the first remaining file (and its page)
+        if it was filed under that file; None when no other file remains.
+        """
+        references = [
+            reference for reference in (metadata.get("duplicate_sources") or "").split(";")
+            if reference and reference.rsplit("#page=", 1)[0] not in variants
+        ]
+        if not references:
+            if metadata.get("source") in variants:
+                return None
+            references = [str(metadata.get("source"))]
+        rehomed = dict(metadata)
+        if "duplicate_sources" in metadata:
+            rehomed["duplicate_sources"] = ";".join(references)
+            rehomed["duplicate_count"] = len(references)
+        if metadata.get("source") in variants:
+            owner, _, page = references[0].partition("#page=")
+            rehomed["source"] = owner
+            rehomed["file_name"] = os.path.basename(owner)
+            if page.isdigit():
+                rehomed["page"] = int(page)
+        return rehomed
+    
+    def export_snapshot(self, path: str) -> dict:
+        """Export the vector store to a compact snapshot directory (see utils.vector_snapshot)."""
+        client, _ = create_client(self.persist_directory, self.client_mode)
+        collection = client.get_collection(Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME)
+        return export_collection(collection, path, embedding_model=EMBEDDING_MODEL_ID)
+    
+    def import_snapshot(self, path: str, force: bool = False) -> int:
+        """Replace the vector store with a snapshot's contents, without embedding calls; the live data stays until the load succeeds."""
+        if self.client_mode == "snapshot":
+            raise ReadOnlyStoreError("Cannot restore into a read-only snapshot client")
+        snapshot = Snapshot(path)
+        if snapshot.embedding_model != EMBEDDING_MODEL_ID and not force:
+            raise SnapshotError(f"Snapshot was embedded with {snapshot.embedding_model}, this store uses {EMBEDDING_MODEL_ID}")
+        client, _ = create_client(self.persist_directory, self.client_mode)
+        loaded = restore_collection(
+            client, Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME, snapshot, metadata=self._collection_metadata()
+        )
+        self._invalidate()
+        return loaded
@@ -2,25 +2,55 @@
 Q&A Chain implementation using LangChain.
 """
 import os
-from typing import Dict, List
+from operator import itemgetter
+from typing import Dict, List, Optional
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
 from langchain_community.vectorstores import Chroma
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 load_dotenv()
 
+# config puts AgenticRAG's utils on sys.path, so it comes before any utils import
+from config import Settings, get_settings
+from utils.retrieval import build_where, exact_search, rerank
+from utils.chroma_client import client_mode_from_env
+from utils.llm_pool import get_chat_model
+from utils.query_cache import (
+    estimate_tokens, generation, get_cache, get_query_log, log_query, normalize_query, params_key, prewarm, store_scope
+)
+from utils.vector_snapshot import embedding_model_id
+
+# Filtered searches matching at most this many chunks are scored exactly
+FAST_PATH_MAX_CANDIDATES = 2000
+# Candidates fetched per context chunk, for the cutoff and MMR stage to choose from
+FETCH_K_MULTIPLIER = 4
+
 
 class QASystem:
     """Handles question answering using RAG."""
     
-    def __init__(self, vector_store: Chroma, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(
+        self,
+        vector_store: Chroma,
+        api_key: str,
+        model: Optional[str] = None,
+        k: Optional[int] = None,
+        settings: Optional[Settings] = None,
+    ):
+        # Model, k and the rerank stage default to get_settings() (environment)
+        self.settings = settings or get_settings()
         self.vector_store = vector_store
         self.api_key = os.getenv("OPENAI_API_KEY") 
-        self.model = model
-        self.retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+        self.model = model or self.settings.model
+        self.k = k or self.settings.k_documents
+        self.max_distance = self.settings.max_distance
+        self.distance_margin = self.settings.distance_margin
+        self.mmr_lambda = self.settings.mmr_lambda
+        # Keys of the process-wide query caches, shared by every session's QASystem
+        self.embedding_model = embedding_model_id(vector_store.embeddings)
+        self.cache_scope = store_scope(vector_store._persist_directory or "", vector_store._collection.name)
         self.chat_history = []
         
         # Create a custom prompt with chat history support
@@ -41,35 +71,120 @@ Context:
             ("human", "{question}")
         ])
         
-        self.llm = ChatOpenAI(
-            model=self.model,
-            temperature=0.5,
-            openai_api_key=self.api_key
+        # Pooled client: keep-alive connections survive across QASystem instances
+        self.llm = get_chat_model(self.model, api_key=self.api_key, temperature=0.5)
+        
+        # Built once; each question supplies its retrieved docs and history as input
+        self.chain = (
+            {
+                "context": lambda x: self.format_docs(x["docs"]),
+                "chat_history": itemgetter("chat_history"),
+                "question": itemgetter("question")
+            }
+            | self.prompt
+            | self.llm
+            | StrOutputParser()
         )
     
     def format_docs(self, docs):
         """Format documents for context."""
         return "\n\n".join([doc.page_content for doc in docs])
     
-    def ask(self, question: str) -> Dict:
-        """Ask a question and get an answer with sources."""
-        # Retrieve relevant documents
-        docs = self.retriever.invoke(question)
+    def retrieve(self, question: str, filters: Optional[Dict] = None) -> List[Document]:
+        """
+        Retrieve up to k relevant, diverse documents.
+        `filters` takes the keyword arguments of `build_where` (source,
+        page_from, page_to, uploaded_after, uploaded_before, tags) and is
+        applied as a prefilter. Over-fetched candidates then go through the
+        distance cutoff, adaptive k and MMR, so weak or redundant chunks are
+        not stuffed into the prompt. Results are cached until the store is
+        written to (see `utils.query_cache`), except against a Chroma server,
+        which other hosts may write to.
+        """
+        if client_mode_from_env() == "http":
+            return self._retrieve(question, filters)
+        key = (
+            self.cache_scope, generation(self.cache_scope), self.embedding_model, normalize_query(question),
+            self.k, params_key(filters), self.max_distance, self.distance_margin, self.mmr_lambda,
+        )
+        docs = get_cache("retrieval", self.settings).get_or_compute(key, lambda: self._retrieve(question, filters))
+        return list(docs)
+    
+    def embed_query(self, question: str) -> List[float]:
+        """Query embedding, from the process-wide embedding cache when the question was asked recently"""
+        return get_cache("embeddings", self.settings).get_or_compute(
+            (self.embedding_model, normalize_query(question)),
+            lambda: self.vector_store.embeddings.embed_query(question),
+        )
+    
+    def _retrieve(self, question: str, filters: Optional[Dict]) -> List[Document]:
+        where = build_where(**filters) if filters else None
+        fetch_k = self.k * FETCH_K_MULTIPLIER
+        query_embedding = self.embed_query(question)
+        candidates = None
         
-        # Create the chain
-        chain = (
-            {
-                "context": lambda x: self.format_docs(docs),
-                "chat_history": lambda x: self.chat_history,
-                "question": RunnablePassthrough()
-            }
-            | self.prompt
-            | self.llm
-            | StrOutputParser()
+        if where is not None:
+            # Fast path: when the filter leaves a small candidate set, score it
+            # exactly instead of searching the whole collection
+            candidate_ids = self.vector_store.get(where=where, include=[])["ids"]
+            if not candidate_ids:
+                return []
+            if len(candidate_ids) <= FAST_PATH_MAX_CANDIDATES:
+                candidates = self.vector_store.get(
+                    ids=candidate_ids,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+        
+        if candidates is None:
+            results = self.vector_store._collection.query(
+                query_embeddings=[query_embedding],
+                n_results=fetch_k,
+                where=where,
+                include=["documents", "metadatas", "embeddings"]
+            )
+            if not results["documents"] or not results["documents"][0]:
+                return []
+            candidates = {key: results[key][0] for key in ("documents", "metadatas", "embeddings")}
+        
+        # Score on cosine distance whatever space the collection was built with
+        order, distances = exact_search(query_embedding, candidates["embeddings"], fetch_k)
+        selected = rerank(
+            query_embedding,
+            [candidates["embeddings"][i] for i in order],
+            distances,
+            self.k,
+            max_distance=self.max_distance,
+            distance_margin=self.distance_margin,
+            mmr_lambda=self.mmr_lambda,
         )
+        return [
+            Document(
+                page_content=candidates["documents"][order[i]],
+                metadata=candidates["metadatas"][order[i]] or {}
+            )
+            for i in selected
+        ]
+    
+    def ask(self, question: str, filters: Optional[Dict] = None) -> Dict:
+        """Ask a question and get an answer with sources."""
+        log_query(question, "qa", self.settings, params=filters)
         
-        # Get the answer
-        answer = chain.invoke(question)
+        # Retrieve relevant documents
+        docs = self.retrieve(question, filters)
+        
+        # Get the answer; without prior turns it depends only on the question
+        # and context, so it can come from the answer cache
+        if self.settings.cache_answers and not self.chat_history:
+            answer = get_cache("answers", self.settings).get_or_compute(
+                self._answer_key(question, docs),
+                lambda: self.chain.invoke({"docs": docs, "chat_history": [], "question": question})
+            )
+        else:
+            answer = self.chain.invoke({
+                "docs": docs,
+                "chat_history": self.chat_history,
+                "question": question
+            })
         
         # Update chat history
         self.chat_history.append(HumanMessage(content=question))
@@ -95,6 +210,47 @@ Context:
         
         return response
     
+    def _answer_key(self, question: str, docs: List[Document]) -> tuple:
+        return (self.model, normalize_query(question), tuple(doc.page_content for doc in docs))
+    
+    def prewarm(
+        self,
+        entries: Optional[List[Dict]] = None,
+        seconds: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Dict:
+        """
+        Replay the most frequent logged questions (`settings.prewarm_queries`)
+        to fill the embedding and retrieval caches, and the answer cache when
+        `settings.cache_answers` is on, within `seconds` and `max_tokens` of
+        API calls (default: the prewarm settings). Chat history is untouched.
+        """
+        if entries is None:
+            query_log = get_query_log(self.settings)
+            if query_log is None or not self.settings.prewarm_queries:
+                return {"queries": 0}
+            entries = query_log.top_queries(self.settings.prewarm_queries, kinds=("qa",), replayable=True)
+        
+        def warm(entry: Dict) -> int:
+            question = entry["query"]
+            tokens = 0
+            if (self.embedding_model, normalize_query(question)) not in get_cache("embeddings", self.settings):
+                tokens += estimate_tokens(question)
+            docs = self.retrieve(question, entry.get("params") or None)
+            if self.settings.cache_answers:
+                answers, key = get_cache("answers", self.settings), self._answer_key(question, docs)
+                if key not in answers:
+                    answer = self.chain.invoke({"docs": docs, "chat_history": [], "question": question})
+                    answers.put(key, answer)
+                    tokens += estimate_tokens(self.format_docs(docs) + question + answer)
+            return tokens
+        
+        return prewarm(
+            entries, warm,
+            seconds=self.settings.prewarm_seconds if seconds is None else seconds,
+            max_tokens=self.settings.prewarm_max_tokens if max_tokens is None else max_tokens,
+        )
+    
     def clear_history(self):
         """Clear the conversation history."""
         self.chat_history = []
@@ -0,0 +1,106 @@
+"""
+Admission control and client-disconnect cancellation for the FastAPI endpoints.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """Raised when an endpoint's wait queue is full (or the wait timed out)."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before its work finished."""
+
+
+class AdmissionController:
+    """
+    Per-endpoint concurrency limit with a bounded wait queue.
+
+    Up to `max_concurrent` requests run at once and up to `max_queue` more
+    wait for a slot; anything beyond that is rejected immediately so the
+    caller can answer 429 instead of piling up latency. Waiting longer than
+    `queue_timeout` seconds is also rejected.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.counters = {"admitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one execution slot for the duration of the block."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise AdmissionRejected(f"{self.name}: queue full ({self.waiting} waiting)")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["rejected"] += 1
+            raise AdmissionRejected(f"{self.name}: timed out waiting for a slot")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.counters["admitted"] += 1
+        try:
+            yield
+            self.counters["completed"] += 1
+        except (asyncio.CancelledError, ClientDisconnected):
+            self.counters["cancelled"] += 1
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            **self.counters,
+        }
+
+
+async def run_until_disconnected(request: Request, work: Awaitable[T], poll_interval: float = 0.25) -> T:
+    """
+    Await `work`, cancelling it if the client disconnects first.
+
+    Cancellation reaches every awaitable inside `work`, so pending LLM calls
+    and tool nodes that have not started yet are abandoned. Tool calls
+    already running in worker threads finish, but their results are dropped.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                raise ClientDisconnected(request.url.path)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
@@ -7,13 +7,18 @@ from langchain_openai import ChatOpenAI
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_community.utilities import WikipediaAPIWrapper
 from langchain_core.messages import HumanMessage, SystemMessage
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Union
 from dotenv import load_dotenv
 load_dotenv()
 import sys
 import os
-from fastapi import UploadFile, File
+import asyncio
+import tempfile
+import threading
+from contextlib import nullcontext
+from functools import lru_cache
+from fastapi import UploadFile, File, Form
 
 # Make AgenticRAG utils importable
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -23,19 +28,158 @@ if AGENTIC_RAG_UTILS not in sys.path:
 
 
 from utils.document_loader import DocumentLoader
+from utils.retrieval import parse_tags
 from utils.vector_search_clean import VectorSearch
+from utils.llm_pool import get_chat_model
+from utils.settings import get_settings
+from utils.tracing import shutdown_tracers
+from utils.watcher import watch_uploads
+from utils.query_cache import cache_stats
+from tool_cache import ToolResultCache
+from workflow_graph import WorkflowExecutor, WorkflowGraphError
+from admission import AdmissionController, AdmissionRejected, ClientDisconnected, run_until_disconnected
+
+
+SETTINGS = get_settings()
+# Vector store and upload locations; overridable so load tests use scratch data.
+# A relative VECTOR_DB_PATH is resolved against AgenticRAG, whose store this server shares
+CHROMA_PATH = os.getenv("DRAG_DROP_CHROMA_PATH") or os.path.abspath(os.path.join(ROOT, 'AgenticRAG', SETTINGS.vector_db_path))
+# Absolute, since uploads are indexed (and deleted) by their full path
+UPLOAD_DIR = os.path.abspath(os.getenv("DRAG_DROP_UPLOAD_DIR", os.path.join(ROOT, 'AgenticRAG', 'uploads')))
+# Requests carry their tenant/workspace in this header or a `workspace` field;
+# each workspace gets its own vector collection
+WORKSPACE_HEADER = "X-Workspace"
+# Index files dropped into UPLOAD_DIR (or its workspace folders) without going through /upload
+WATCH_UPLOADS = os.getenv("WATCH_UPLOADS", "false").lower() in ("1", "true", "yes")
 
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Per-endpoint concurrency limits with bounded wait queues; overflow gets a fast 429
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+run_admission = AdmissionController(
+    "run",
+    max_concurrent=int(os.getenv("RUN_MAX_CONCURRENT", "8")),
+    max_queue=int(os.getenv("RUN_MAX_QUEUE", "32")),
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+)
+upload_admission = AdmissionController(
+    "upload",
+    max_concurrent=int(os.getenv("UPLOAD_MAX_CONCURRENT", "2")),
+    max_queue=int(os.getenv("UPLOAD_MAX_QUEUE", "8")),
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+)
+
+
+# Tool results are cached per (tool, normalized query) and identical
+# in-flight calls share one upstream request
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
+tool_cache = ToolResultCache(ttl_seconds=TOOL_CACHE_TTL_SECONDS)
+
+# Tool clients are created once and reused across requests
+_tool_clients = {}
+_tool_clients_lock = threading.Lock()
+
+
+def get_tool_client(name: str):
+    """Return the shared client for a tool, creating it on first use"""
+    with _tool_clients_lock:
+        if name not in _tool_clients:
+            if name == "duckduckgo":
+                _tool_clients[name] = DuckDuckGoSearchRun()
+            elif name == "wikipedia":
+                _tool_clients[name] = WikipediaAPIWrapper(top_k_results=3, doc_content_chars_max=2000)
+            else:
+                raise ValueError(f"Unknown tool client: {name}")
+        return _tool_clients[name]
+
+
+_vector_search = None
+_vector_search_lock = threading.Lock()
+
+
+def get_vector_search(workspace: Optional[str] = None) -> VectorSearch:
+    """Return the shared vector store scoped to a workspace, creating the store on first use"""
+    global _vector_search
+    with _vector_search_lock:
+        if _vector_search is None:
+            _vector_search = VectorSearch(persist_directory=CHROMA_PATH, settings=SETTINGS)
+    return _vector_search.for_namespace(workspace)
+
+
+_uploads_watcher = None
+
+
+@app.on_event("startup")
+def start_uploads_watcher():
+    global _uploads_watcher
+    if WATCH_UPLOADS:
+        _uploads_watcher = watch_uploads(get_vector_search(), UPLOAD_DIR)
+
+
+@app.on_event("startup")
+def prewarm_caches():
+    # Startup handlers finish before the server accepts requests
+    get_vector_search().prewarm()
+
+
+@app.on_event("shutdown")
+def stop_uploads_watcher():
+    if _uploads_watcher:
+        _uploads_watcher.stop()
+
+
+@app.on_event("shutdown")
+def flush_traces():
+    # Export spans still queued by in-process agents before the workers exit
+    shutdown_tracers()
+
+
+def claim_upload(path: str):
+    """
+    Keep the watcher off `path` while an endpoint writes and (un)indexes it;
+    a no-op without the watcher. Blocking, so enter it in a worker thread.
+    """
+    return _uploads_watcher.claim(path) if _uploads_watcher else nullcontext()
+
+
+def store_upload(loader: DocumentLoader, dest_path: str, contents: bytes, tags: Optional[List[str]] = None) -> int:
+    """Write an upload into place and index it, keeping the watcher off it meanwhile"""
+    with claim_upload(dest_path):
+        # Written to a hidden temp file (ignored by the watcher) and renamed, so no reader sees it half-written
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=os.path.dirname(dest_path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contents)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return loader.process_and_store(dest_path, tags=tags)
+
+
+def remove_upload(vec: VectorSearch, dest_path: str) -> int:
+    """Un-index an upload and delete its file, keeping the watcher off it meanwhile"""
+    with claim_upload(dest_path):
+        removed = vec.delete_source(dest_path)
+        if os.path.exists(dest_path):
+            os.unlink(dest_path)
+        return removed
+
+
+def workspace_upload_dir(workspace: Optional[str]) -> str:
+    """Uploads are kept per workspace so equal file names do not collide"""
+    if not workspace:
+        return UPLOAD_DIR
+    return os.path.join(UPLOAD_DIR, VectorSearch.namespace_key(workspace))
+
 
 # Tool: DuckDuckGo Web Search
 def duckduckgo_search_tool(query: str) -> str:
     try:
-        search = DuckDuckGoSearchRun()
-        results = search.run(query)
+        results = tool_cache.get_or_call("duckduckgo", query, lambda q: get_tool_client("duckduckgo").run(q))
         return f"🔍 DuckDuckGo Search Results for '{query}':\n\n{results}"
     except Exception as e:
         return f"Search failed: {str(e)}\n\nFallback results:\n- Information about {query}\n- Documentation on {query}"
@@ -44,8 +188,7 @@ def duckduckgo_search_tool(query: str) -> str:
 # Tool: Wikipedia Search
 def wikipedia_search_tool(query: str) -> str:
     try:
-        wikipedia = WikipediaAPIWrapper(top_k_results=3, doc_content_chars_max=2000)
-        results = wikipedia.run(query)
+        results = tool_cache.get_or_call("wikipedia", query, lambda q: get_tool_client("wikipedia").run(q))
         return f"📚 Wikipedia Results for '{query}':\n\n{results}"
     except Exception as e:
         return f"Wikipedia search failed: {str(e)}\n\nFallback: No Wikipedia results for {query}"
@@ -53,31 +196,49 @@ def wikipedia_search_tool(query: str) -> str:
 
 # Agent: Summarizer using real LLM with custom system prompt
 def create_LLM_agent(system_prompt: str, llm_instance: ChatOpenAI):
+    def build_messages(input_text: str):
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Please summarize or answer the following:\n\n{input_text}")
+        ]
+
+    def fallback(input_text: str, e: Exception) -> str:
+        if len(input_text) > 300:
+            summary = input_text[:297] + "..."
+        else:
+            summary = input_text
+        return f"SUMMARY (Fallback):\n{summary}\n\n[LLM Error: {str(e)}]"
+
     def summarizer_agent(input_text: str) -> str:
         try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=f"Please summarize or answer the following:\n\n{input_text}")
-            ]
-            response = llm_instance.invoke(messages)
+            response = llm_instance.invoke(build_messages(input_text))
             return response.content
         except Exception as e:
-            if len(input_text) > 300:
-                summary = input_text[:297] + "..."
-            else:
-                summary = input_text
-            return f"SUMMARY (Fallback):\n{summary}\n\n[LLM Error: {str(e)}]"
-    return summarizer_agent
+            return fallback(input_text, e)
+
+    async def asummarizer_agent(input_text: str) -> str:
+        try:
+            response = await llm_instance.ainvoke(build_messages(input_text))
+            return response.content
+        except Exception as e:
+            return fallback(input_text, e)
+
+    return RunnableLambda(summarizer_agent, afunc=asummarizer_agent)
+
+
+# Agents are built once per (system prompt, model) on top of pooled LLM clients
+@lru_cache(maxsize=32)
+def get_agent_runnable(system_prompt: str, model: str):
+    return create_LLM_agent(system_prompt, llm_instance=get_chat_model(model))
 
 # RAG tool: use local vector DB to retrieve context
-def rag_search_tool(query: str) -> str:
+def rag_search_tool(query: str, filters: Optional[dict] = None, workspace: Optional[str] = None) -> str:
     try:
-        # Use persistent chroma_db inside AgenticRAG if present
-        chroma_path = r"..\AgenticRAG\chroma_db"
-        vec = VectorSearch(persist_directory=chroma_path) if VectorSearch else None
+        # Search only the workspace's collection that /upload writes to
+        vec = get_vector_search(workspace) if VectorSearch else None
         if not vec:
             return "RAG tool unavailable: VectorSearch helper not found."
-        results = vec.search_similar_ads(query, top_k=5)
+        results = vec.search_similar_ads(query, top_k=SETTINGS.search_top_k, **(filters or {}))
         return f"📂 RAG Results for '{query}':\n\n{results}"
     except Exception as e:
         return f"RAG search failed: {str(e)}\n\nFallback: no RAG context."
@@ -88,12 +249,46 @@ wikipedia_runnable = RunnableLambda(wikipedia_search_tool)
 rag_runnable = RunnableLambda(rag_search_tool)
 
 
+# Character budget for merged tool outputs handed to the agent
+WORKFLOW_CONTEXT_BUDGET_CHARS = int(os.getenv("WORKFLOW_CONTEXT_BUDGET_CHARS", "8000"))
+
+
+class RagFilters(BaseModel):
+    """Metadata prefilters for the RAG tool (see `utils.retrieval.build_where`); unknown keys are a 422"""
+    model_config = ConfigDict(extra="forbid")
+
+    source: Optional[Union[str, List[str]]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    uploaded_after: Optional[Union[str, float]] = None
+    uploaded_before: Optional[Union[str, float]] = None
+    tags: Optional[List[str]] = None
+
+
+class WorkflowNode(BaseModel):
+    id: str
+    type: str  # "tool" or "agent"
+    tool: Optional[str] = None
+
+
+class WorkflowEdge(BaseModel):
+    source: str
+    target: str
+
+
 class WorkflowRequest(BaseModel):
     user_input: str
     connected: bool
     tool: Optional[str] = None
     system_prompt: Optional[str] = "You are a helpful assistant that provides clear, concise summaries. Keep your response under 200 words."
     model: Optional[str] = "gpt-3.5-turbo"
+    # Metadata prefilters for the RAG tool
+    rag_filters: Optional[RagFilters] = None
+    # Canvas graph; when given it replaces the single connected tool
+    nodes: Optional[List[WorkflowNode]] = None
+    edges: Optional[List[WorkflowEdge]] = None
+    # Tenant/workspace whose documents the RAG tool searches; falls back to the X-Workspace header
+    workspace: Optional[str] = None
 
 
 @app.get("/")
@@ -101,57 +296,127 @@ async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/metrics")
+async def metrics():
+    return JSONResponse({
+        "run": run_admission.metrics(),
+        "upload": upload_admission.metrics(),
+        "tool_cache": dict(tool_cache.stats),
+        "query_cache": cache_stats(),
+    })
+
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    request: Request,
+    file: UploadFile = File(...),
+    workspace: Optional[str] = Form(None),
+    tags: Optional[str] = Form(None),
+):
+    """`tags` is comma-separated; the RAG tool's `tags` filter matches them"""
+    workspace = workspace or request.headers.get(WORKSPACE_HEADER)
+    try:
+        async with upload_admission.slot():
+            return await run_until_disconnected(request, ingest_upload(file, workspace, parse_tags(tags)))
+    except AdmissionRejected as e:
+        return JSONResponse({"success": False, "error": f"Server busy, please retry: {str(e)}"}, status_code=429, headers={"Retry-After": "1"})
+    except ClientDisconnected:
+        return JSONResponse({"success": False, "error": "Client disconnected"}, status_code=499)
+
+
+async def ingest_upload(file: UploadFile, workspace: Optional[str] = None, tags: Optional[List[str]] = None) -> JSONResponse:
     try:
         if DocumentLoader is None or VectorSearch is None:
             return JSONResponse({"success": False, "error": "RAG helpers not available on server."}, status_code=500)
 
-        save_dir = os.path.abspath(os.path.join(ROOT, 'AgenticRAG', 'uploads'))
+        save_dir = workspace_upload_dir(workspace)
         os.makedirs(save_dir, exist_ok=True)
-        dest_path = os.path.join(save_dir, file.filename)
+        dest_path = os.path.join(save_dir, os.path.basename(file.filename))
 
         contents = await file.read()
-        with open(dest_path, 'wb') as f:
-            f.write(contents)
 
-        # Initialize vector DB pointing to AgenticRAG/chroma_db
-        chroma_path = os.path.abspath(os.path.join(ROOT, 'AgenticRAG', 'chroma_db'))
-        vec = VectorSearch(persist_directory=chroma_path)
+        # Store into the workspace's collection of AgenticRAG/chroma_db
+        vec = get_vector_search(workspace)
         loader = DocumentLoader(vector_db=vec)
-        added = loader.process_and_store(dest_path)
+        added = await asyncio.to_thread(store_upload, loader, dest_path, contents, tags)
+        saved = loader.last_dedup_stats["saved"] if loader.last_dedup_stats else 0
 
-        return JSONResponse({"success": True, "added_chunks": added, "filename": file.filename})
+        return JSONResponse({
+            "success": True, "added_chunks": added, "deduplicated_chunks": saved,
+            "filename": file.filename, "workspace": vec.namespace, "tags": tags or [],
+        })
+    except Exception as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+
+@app.delete("/upload/{filename}")
+async def delete_upload(filename: str, request: Request, workspace: Optional[str] = None):
+    workspace = workspace or request.headers.get(WORKSPACE_HEADER)
+    try:
+        dest_path = os.path.join(workspace_upload_dir(workspace), os.path.basename(filename))
+
+        vec = get_vector_search(workspace)
+        removed = await asyncio.to_thread(remove_upload, vec, dest_path)
+
+        return JSONResponse({"success": True, "removed_chunks": removed, "filename": filename, "workspace": vec.namespace})
     except Exception as e:
         return JSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 
 @app.post("/run")
-async def run_workflow(req: WorkflowRequest):
+async def run_workflow(req: WorkflowRequest, request: Request):
+    try:
+        async with run_admission.slot():
+            # Abandon LLM and tool work as soon as the browser goes away
+            req.workspace = req.workspace or request.headers.get(WORKSPACE_HEADER)
+            return await run_until_disconnected(request, execute_workflow(req))
+    except AdmissionRejected as e:
+        return JSONResponse({"success": False, "output": f"Server busy, please retry: {str(e)}"}, status_code=429, headers={"Retry-After": "1"})
+    except ClientDisconnected:
+        return JSONResponse({"success": False, "output": "Client disconnected"}, status_code=499)
+
+
+async def execute_workflow(req: WorkflowRequest) -> JSONResponse:
     try:
-        # Create agent with custom system prompt
-        llm = ChatOpenAI(
-            model=req.model,
-        )
-        agent_fn = create_LLM_agent(req.system_prompt, llm_instance=llm)
-        agent_runnable = RunnableLambda(agent_fn)
+        # Reuse the agent for this system prompt and model
+        agent_runnable = get_agent_runnable(req.system_prompt, req.model)
         
+        rag_filters = req.rag_filters.model_dump(exclude_none=True) if req.rag_filters else None
         tool_dict = {
             "duckduckgo": duckduckgo_runnable,
             "wikipedia": wikipedia_runnable,
-            "rag": rag_runnable
+            "rag": RunnableLambda(lambda q: rag_search_tool(q, rag_filters, req.workspace)) if rag_filters or req.workspace else rag_runnable
         }
         
-        if req.connected and req.tool:
+        if req.nodes:
+            # Graph workflow: independent tool nodes run concurrently
+            executor = WorkflowExecutor(
+                tools={
+                    "duckduckgo": duckduckgo_search_tool,
+                    "wikipedia": wikipedia_search_tool,
+                    "rag": lambda q: rag_search_tool(q, rag_filters, req.workspace),
+                },
+                agent=agent_runnable.ainvoke,
+                context_budget_chars=WORKFLOW_CONTEXT_BUDGET_CHARS,
+            )
+            try:
+                result = await executor.run(
+                    [node.model_dump() for node in req.nodes],
+                    [edge.model_dump() for edge in req.edges or []],
+                    req.user_input,
+                )
+            except WorkflowGraphError as e:
+                return JSONResponse({"success": False, "output": f"Invalid workflow: {str(e)}"}, status_code=400)
+        elif req.connected and req.tool:
             # Select the appropriate tool
             tool_runnable = tool_dict.get(req.tool, duckduckgo_runnable)
             
             # Tool → Agent pipeline using LangChain Runnables
             chain = tool_runnable | agent_runnable
-            result = chain.invoke(req.user_input)
+            result = await chain.ainvoke(req.user_input)
         else:
             # Agent only
-            result = agent_runnable.invoke(req.user_input)
+            result = await agent_runnable.ainvoke(req.user_input)
         
         return JSONResponse({"success": True, "output": result})
     except Exception as e:
@@ -0,0 +1 @@
+"""Load-testing and benchmark tools for the drag-drop service."""
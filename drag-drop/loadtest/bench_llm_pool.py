@@ -0,0 +1,98 @@
+"""
+Benchmark: fresh ChatOpenAI client per request vs. the pooled clients.
+
+Runs both modes against the local stub OpenAI server and prints latency
+percentiles, so the saving from client reuse and keep-alive is measurable
+without network access.
+
+    cd drag-drop
+    python -m loadtest.bench_llm_pool --requests 100 --concurrency 4 --connect-delay 0.03
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_openai import ChatOpenAI
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+AGENTIC_RAG_UTILS = os.path.abspath(os.path.join(ROOT, 'AgenticRAG'))
+if AGENTIC_RAG_UTILS not in sys.path:
+    sys.path.insert(0, AGENTIC_RAG_UTILS)
+
+from utils.llm_pool import ChatModelPool
+from loadtest.stub_openai import StubOpenAIServer
+
+MODEL = "gpt-3.5-turbo"
+PROMPT = "Please summarize or answer the following:\n\nbenchmark question"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(make_client, requests: int, concurrency: int):
+    def one_call(_):
+        start = time.perf_counter()
+        make_client().invoke(PROMPT)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(one_call, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "throughput_rps": requests / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub response latency in seconds")
+    parser.add_argument("--connect-delay", type=float, default=0.03, help="stub cost of a new connection in seconds")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(latency=args.latency, connect_delay=args.connect_delay).start()
+    settings = {"base_url": server.base_url, "api_key": "sk-stub", "max_retries": 0}
+    try:
+        results = {}
+
+        connections_before = server.stats["connections"]
+        results["fresh client per request"] = run_mode(
+            lambda: ChatOpenAI(model=MODEL, **settings), args.requests, args.concurrency
+        )
+        results["fresh client per request"]["connections"] = server.stats["connections"] - connections_before
+
+        pool = ChatModelPool()
+        connections_before = server.stats["connections"]
+        results["pooled client"] = run_mode(
+            lambda: pool.get(MODEL, api_key="sk-stub", base_url=server.base_url, max_retries=0),
+            args.requests, args.concurrency
+        )
+        results["pooled client"]["connections"] = server.stats["connections"] - connections_before
+    finally:
+        server.stop()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"stub latency {args.latency * 1000:.0f} ms, connect delay {args.connect_delay * 1000:.0f} ms\n")
+    print(f"{'mode':<26}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}{'conns':>8}")
+    for mode, row in results.items():
+        print(f"{mode:<26}{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['throughput_rps']:>10.1f}{row['connections']:>8}")
+
+    saved = results["fresh client per request"]["mean_ms"] - results["pooled client"]["mean_ms"]
+    print(f"\nMean latency saved per request: {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Load test for the drag-drop service: mixed /run and /upload traffic.
+
+Starts the stub OpenAI server (chat + embeddings) and the app with stubbed
+DuckDuckGo/Wikipedia clients as separate processes, then drives closed-loop
+virtual users through one stage per concurrency level. Each stage reports
+throughput, latency percentiles and error/429 rates per endpoint, the
+hit rate of each server-side cache during the stage, and the server's
+/metrics counters as the change over the stage. The tool result
+and query caches are off by default (`--tool-cache-ttl`,
+`--query-cache-entries`): the workload repeats a few topics, so with them
+on, latency mostly measures cache hits. The report is written as JSON (stable key order, for diffing between runs) and
+as a markdown table.
+
+    cd drag-drop
+    python -m loadtest.run_load --users 4,16,32 --duration 20 --mix run=0.85,upload=0.15
+    python -m loadtest.run_load --users 8 --openai-latency 0.5 --openai-error-rate 0.05 --out loadtest/results/slow-llm
+
+Admission limits are read by the app from the environment as usual, e.g.
+`RUN_MAX_CONCURRENT=16 python -m loadtest.run_load ...`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+DRAG_DROP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TOPICS = [
+    "artificial intelligence trends", "vector databases", "solar power storage", "python asyncio",
+    "retrieval augmented generation", "electric vehicles", "quantum computing", "climate policy",
+    "large language models", "kubernetes autoscaling", "coffee brewing", "space telescopes",
+    "rust programming", "sleep science", "renewable energy", "graph neural networks",
+]
+WORDS = ("policy leave refund shipping order payment customer return warranty account invoice "
+         "delivery discount support product team process review request update").split()
+
+# The app answers LLM/tool failures with fallback text and success=True;
+# such responses count as errors in the report
+DEGRADED_MARKERS = ("[LLM Error:", "Search failed:", "search failed:")
+
+# (label, weight, payload builder) for /run; labels become report rows
+RUN_SCENARIOS = [
+    ("run:agent", 0.2, lambda q: {"user_input": q, "connected": False}),
+    ("run:duckduckgo", 0.3, lambda q: {"user_input": q, "connected": True, "tool": "duckduckgo"}),
+    ("run:rag", 0.2, lambda q: {"user_input": q, "connected": True, "tool": "rag"}),
+    ("run:graph", 0.3, lambda q: {
+        "user_input": q,
+        "connected": True,
+        "nodes": [
+            {"id": "tool-1", "type": "tool", "tool": "duckduckgo"},
+            {"id": "tool-2", "type": "tool", "tool": "wikipedia"},
+            {"id": "agent-1", "type": "agent"},
+        ],
+        "edges": [{"source": "tool-1", "target": "agent-1"}, {"source": "tool-2", "target": "agent-1"}],
+    }),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("run", "upload"):
+            raise ValueError(f"Unknown workload in --mix: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class LoadDriver:
+    """Closed-loop virtual users against a running app"""
+
+    def __init__(self, base_url: str, mix: dict, upload_bytes: int, seed: int):
+        self.base_url = base_url
+        self.mix = mix
+        self.upload_bytes = upload_bytes
+        self.rng = random.Random(seed)
+        self.upload_counter = 0
+
+    def _upload_body(self) -> tuple:
+        self.upload_counter += 1
+        words = []
+        size = 0
+        while size < self.upload_bytes:
+            word = self.rng.choice(WORDS)
+            words.append(word)
+            size += len(word) + 1
+        text = f"Load test document {self.upload_counter}.\n" + " ".join(words)
+        return f"loadtest-{self.upload_counter}.txt", text.encode()
+
+    async def _one_request(self, client: httpx.AsyncClient):
+        if self.rng.random() < self.mix.get("upload", 0) / sum(self.mix.values()):
+            label = "upload"
+            filename, body = self._upload_body()
+            request = client.post("/upload", files={"file": (filename, body, "text/plain")})
+        else:
+            label, _, build = self.rng.choices(RUN_SCENARIOS, weights=[s[1] for s in RUN_SCENARIOS])[0]
+            request = client.post("/run", json=build(self.rng.choice(TOPICS)))
+
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+            body = response.json()
+            output = str(body.get("output", ""))
+            ok = status == 200 and body.get("success", False) and not any(m in output for m in DEGRADED_MARKERS)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            ok = False
+        return label, status, ok, time.perf_counter() - start
+
+    async def run_stage(self, users: int, duration: float):
+        samples = []
+        stop_at = time.monotonic() + duration
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=120.0) as client:
+            async def user():
+                while time.monotonic() < stop_at:
+                    label, status, ok, latency = await self._one_request(client)
+                    samples.append((label, status, ok, latency))
+                    if status == 429:
+                        # Honour Retry-After like a well-behaved client
+                        await asyncio.sleep(1.0)
+
+            metrics_before = (await client.get("/metrics")).json()
+            started = time.perf_counter()
+            await asyncio.gather(*(user() for _ in range(users)))
+            elapsed = time.perf_counter() - started
+
+            metrics_after = (await client.get("/metrics")).json()
+
+        return {
+            **summarize(samples, elapsed),
+            "caches": cache_deltas(metrics_before, metrics_after),
+            "server_metrics": metrics_delta(metrics_before, metrics_after),
+        }
+
+
+# /metrics values that are current levels or limits rather than running counts
+GAUGES = {"active", "queue_depth", "max_concurrent", "max_queue", "entries"}
+
+
+def metrics_delta(before: dict, after: dict) -> dict:
+    """Counters of one /metrics snapshot minus the previous one; gauges keep their value at the end"""
+    delta = {}
+    for key, value in after.items():
+        old = before.get(key) if isinstance(before, dict) else None
+        if isinstance(value, dict):
+            delta[key] = metrics_delta(old or {}, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in GAUGES:
+            delta[key] = value - (old or 0)
+        else:
+            delta[key] = value
+    return delta
+
+
+def cache_deltas(before: dict, after: dict) -> dict:
+    """Lookups and hit rate of the tool and query caches between two /metrics snapshots"""
+    caches = {"tool": (before.get("tool_cache", {}), after.get("tool_cache", {}))}
+    for name, stats in after.get("query_cache", {}).items():
+        caches[f"query:{name}"] = (before.get("query_cache", {}).get(name, {}), stats)
+    rows = {}
+    for name, (old, new) in sorted(caches.items()):
+        # Coalesced calls waited on another caller's upstream call: neither a hit nor a miss
+        delta = {key: new[key] - old.get(key, 0) for key in ("hits", "misses", "coalesced") if key in new}
+        lookups = sum(delta.values())
+        rows[name] = {**delta, "lookups": lookups, "hit_rate": round(delta["hits"] / lookups, 4) if lookups else None}
+    return rows
+
+
+def summarize(samples, elapsed: float) -> dict:
+    """Per-endpoint rows plus a "run:*" rollup of all /run scenarios"""
+    groups = defaultdict(list)
+    for label, status, ok, latency in samples:
+        groups[label].append((status, ok, latency))
+        if label.startswith("run:"):
+            groups["run:*"].append((status, ok, latency))
+
+    rows = {}
+    for label, items in sorted(groups.items()):
+        latencies = [latency for _, ok, latency in items if ok]
+        statuses = defaultdict(int)
+        for status, _, _ in items:
+            statuses[str(status)] += 1
+        errors = sum(1 for _, ok, _ in items if not ok)
+        row = {
+            "requests": len(items),
+            "ok": len(items) - errors,
+            "error_rate": round(errors / len(items), 4),
+            "rejected_429": statuses.get("429", 0),
+            "throughput_rps": round((len(items) - errors) / elapsed, 2),
+            "status_counts": dict(sorted(statuses.items())),
+        }
+        for pct in (50, 90, 95, 99):
+            row[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 1) if latencies else None
+        row["max_ms"] = round(max(latencies) * 1000, 1) if latencies else None
+        rows[label] = row
+    return {"elapsed_s": round(elapsed, 2), "endpoints": rows}
+
+
+def to_markdown(report: dict) -> str:
+    config = report["config"]
+    lines = [
+        "# drag-drop load test",
+        "",
+        "Config: " + ", ".join(f"`{k}={v}`" for k, v in sorted(config.items())),
+        "",
+        "| users | endpoint | requests | ok/s | error rate | 429 | p50 ms | p90 ms | p95 ms | p99 ms | max ms |",
+        "|---:|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for stage in report["stages"]:
+        for label, row in stage["endpoints"].items():
+            cells = [str(stage["users"]), label, str(row["requests"]), f"{row['throughput_rps']:.2f}",
+                     f"{row['error_rate']:.2%}", str(row["rejected_429"])]
+            cells += ["-" if row[key] is None else f"{row[key]:.1f}" for key in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")]
+            lines.append("| " + " | ".join(cells) + " |")
+    lines += [
+        "",
+        "| users | cache | lookups | hit rate | coalesced |",
+        "|---:|---|---:|---:|---:|",
+    ]
+    for stage in report["stages"]:
+        for name, row in stage["caches"].items():
+            hit_rate = "-" if row["hit_rate"] is None else f"{row['hit_rate']:.2%}"
+            lines.append(f"| {stage['users']} | {name} | {row['lookups']} | {hit_rate} | {row.get('coalesced', '-')} |")
+    return "\n".join(lines) + "\n"
+
+
+def start_process(args, env=None):
+    # The app prints per-request progress; keep stderr for real errors
+    return subprocess.Popen([sys.executable, "-m", *args], cwd=DRAG_DROP_DIR, env=env, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="4,16,32", help="comma-separated concurrency per stage")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per stage")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of traffic before the first stage, not reported")
+    parser.add_argument("--mix", default="run=0.85,upload=0.15", help="workload weights")
+    parser.add_argument("--upload-bytes", type=int, default=8000, help="size of each generated upload")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="stub chat/embedding latency in seconds")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="stub DuckDuckGo/Wikipedia latency in seconds")
+    parser.add_argument("--tool-error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-cache-ttl", type=float, default=0.0, help="TOOL_CACHE_TTL_SECONDS of the app (0: no tool result caching)")
+    parser.add_argument("--query-cache-entries", type=int, default=0, help="QUERY_CACHE_MAX_ENTRIES of the app (0: no embedding/retrieval caching)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="loadtest/results/report", help="report path without extension")
+    args = parser.parse_args()
+
+    stages = [int(u) for u in args.users.split(",")]
+    mix = parse_mix(args.mix)
+    scratch = tempfile.mkdtemp(prefix="drag-drop-load-")
+    openai_port, app_port = free_port(), free_port()
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_KEY": "sk-stub",
+        "DRAG_DROP_CHROMA_PATH": os.path.join(scratch, "chroma_db"),
+        "DRAG_DROP_UPLOAD_DIR": os.path.join(scratch, "uploads"),
+        "TOOL_CACHE_TTL_SECONDS": str(args.tool_cache_ttl),
+        "QUERY_CACHE_MAX_ENTRIES": str(args.query_cache_entries),
+    })
+
+    processes = []
+    try:
+        processes.append(start_process([
+            "loadtest.stub_openai", "--port", str(openai_port),
+            "--latency", str(args.openai_latency), "--error-rate", str(args.openai_error_rate),
+        ]))
+        processes.append(start_process([
+            "loadtest.serve_app", "--port", str(app_port),
+            "--tool-latency", str(args.tool_latency), "--tool-error-rate", str(args.tool_error_rate),
+        ], env=env))
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"http://127.0.0.1:{openai_port}/v1/models")
+        wait_for(f"{base_url}/metrics")
+
+        driver = LoadDriver(base_url, mix, args.upload_bytes, args.seed)
+        if args.warmup:
+            asyncio.run(driver.run_stage(min(stages), args.warmup))
+
+        report = {
+            "config": {
+                "duration_s": args.duration,
+                "mix": args.mix,
+                "openai_error_rate": args.openai_error_rate,
+                "openai_latency_s": args.openai_latency,
+                "run_max_concurrent": env.get("RUN_MAX_CONCURRENT", "8"),
+                "run_max_queue": env.get("RUN_MAX_QUEUE", "32"),
+                "seed": args.seed,
+                "query_cache_entries": args.query_cache_entries,
+                "tool_cache_ttl_s": args.tool_cache_ttl,
+                "tool_error_rate": args.tool_error_rate,
+                "tool_latency_s": args.tool_latency,
+                "upload_bytes": args.upload_bytes,
+                "upload_max_concurrent": env.get("UPLOAD_MAX_CONCURRENT", "2"),
+                "upload_max_queue": env.get("UPLOAD_MAX_QUEUE", "8"),
+            },
+            "stages": [],
+        }
+        for users in stages:
+            print(f"Stage: {users} users for {args.duration:.0f}s ...", flush=True)
+            summary = asyncio.run(driver.run_stage(users, args.duration))
+            report["stages"].append({"users": users, **summary})
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out + ".json", "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    markdown = to_markdown(report)
+    with open(args.out + ".md", "w") as f:
+        f.write(markdown)
+
+    print()
+    print(markdown)
+    print(f"Report written to {args.out}.json and {args.out}.md")
+
+
+if __name__ == "__main__":
+    main()
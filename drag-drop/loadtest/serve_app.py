@@ -0,0 +1,45 @@
+"""
+Run the drag-drop app with stubbed search tools, for load testing.
+
+OpenAI chat and embedding calls go wherever OPENAI_BASE_URL points (the
+load test starts `loadtest.stub_openai` for this). The vector store and
+uploads use DRAG_DROP_CHROMA_PATH / DRAG_DROP_UPLOAD_DIR, so point those at
+scratch directories.
+
+    cd drag-drop
+    python -m loadtest.serve_app --port 8010 --tool-latency 0.3 --tool-error-rate 0.02
+"""
+
+import argparse
+
+import uvicorn
+
+from loadtest.stub_tools import make_stub_tool_clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="seconds per stub search call")
+    parser.add_argument("--tool-jitter", type=float, default=0.1, help="uniform +/- jitter on tool latency")
+    parser.add_argument("--tool-error-rate", type=float, default=0.0, help="fraction of stub search calls that raise")
+    args = parser.parse_args()
+
+    import app as drag_drop_app
+
+    clients = make_stub_tool_clients(args.tool_latency, args.tool_jitter, args.tool_error_rate)
+
+    def get_tool_client(name: str):
+        if name not in clients:
+            raise ValueError(f"Unknown tool client: {name}")
+        return clients[name]
+
+    # The tool functions look the client up through this module global
+    drag_drop_app.get_tool_client = get_tool_client
+
+    uvicorn.run(drag_drop_app.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
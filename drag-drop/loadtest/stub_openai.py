@@ -0,0 +1,174 @@
+"""
+Local stand-in for the OpenAI HTTP API (chat completions and embeddings).
+
+Latency, per-connection setup cost and error rate are configurable so
+benchmarks and load tests can run without network access or API spend.
+
+Run standalone:
+    python -m loadtest.stub_openai --port 8901 --latency 0.2
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOpenAIServer:
+    """OpenAI-compatible stub server running in a background thread."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        connect_delay: float = 0.0,
+        error_rate: float = 0.0,
+        embedding_dim: int = 1536,
+    ):
+        self.latency = latency
+        self.connect_delay = connect_delay
+        self.error_rate = error_rate
+        self.embedding_dim = embedding_dim
+        self.stats = {"connections": 0, "chat": 0, "embeddings": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def embed(self, text: str):
+        """Deterministic unit-length pseudo-embedding for a text."""
+        values = []
+        counter = 0
+        while len(values) < self.embedding_dim:
+            digest = hashlib.sha256(f"{counter}:{text}".encode()).digest()
+            values.extend(b / 127.5 - 1.0 for b in digest)
+            counter += 1
+        values = values[:self.embedding_dim]
+        norm = sum(v * v for v in values) ** 0.5 or 1.0
+        return [v / norm for v in values]
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive between requests
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                stub._count("connections")
+                # Stands in for TCP + TLS handshake cost on a fresh connection
+                if stub.connect_delay:
+                    time.sleep(stub.connect_delay)
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                # Model listing doubles as a readiness probe
+                if self.path.endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if stub.error_rate and random.random() < stub.error_rate:
+                    stub._count("errors")
+                    self._send_json(500, {"error": {"message": "Injected stub error", "type": "server_error"}})
+                    return
+
+                if self.path.endswith("/chat/completions"):
+                    stub._count("chat")
+                    last = request.get("messages", [{}])[-1].get("content", "")
+                    text = last if isinstance(last, str) else json.dumps(last)
+                    self._send_json(200, {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": f"Stub answer ({len(text)} chars of input)."},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": len(text) // 4, "completion_tokens": 5, "total_tokens": len(text) // 4 + 5},
+                    })
+                elif self.path.endswith("/embeddings"):
+                    stub._count("embeddings")
+                    inputs = request.get("input", [])
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    data = []
+                    for i, text in enumerate(inputs):
+                        vector = stub.embed(str(text))
+                        if request.get("encoding_format") == "base64":
+                            vector = base64.b64encode(struct.pack(f"{len(vector)}f", *vector)).decode()
+                        data.append({"object": "embedding", "index": i, "embedding": vector})
+                    self._send_json(200, {
+                        "object": "list",
+                        "data": data,
+                        "model": request.get("model", "stub"),
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                    })
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="seconds added to every new connection")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.host, args.port, args.latency, args.connect_delay, args.error_rate).start()
+    print(f"Stub OpenAI API listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Local stand-ins for the DuckDuckGo and Wikipedia tool clients.
+
+They expose the same `.run(query)` method as `DuckDuckGoSearchRun` and
+`WikipediaAPIWrapper`, block for a configurable latency (like the real
+network call in a worker thread) and fail at a configurable rate.
+"""
+
+import hashlib
+import random
+import threading
+import time
+
+
+class StubToolClient:
+    """Deterministic search stub with latency and error injection"""
+
+    def __init__(self, name: str, latency: float = 0.3, jitter: float = 0.1, error_rate: float = 0.0, result_chars: int = 2000):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.result_chars = result_chars
+        self.stats = {"calls": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def run(self, query: str) -> str:
+        self._count("calls")
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if self.error_rate and random.random() < self.error_rate:
+            self._count("errors")
+            raise RuntimeError(f"Injected {self.name} error")
+
+        digest = hashlib.sha256(f"{self.name}:{query}".encode()).hexdigest()
+        sentence = f"{self.name} result {digest[:8]} about {query}. "
+        return (sentence * (self.result_chars // len(sentence) + 1))[:self.result_chars]
+
+
+def make_stub_tool_clients(latency: float = 0.3, jitter: float = 0.1, error_rate: float = 0.0):
+    """Stub clients keyed by the names used in `app.get_tool_client`"""
+    return {
+        name: StubToolClient(name, latency=latency, jitter=jitter, error_rate=error_rate)
+        for name in ("duckduckgo", "wikipedia")
+    }
@@ -13,6 +13,10 @@ let offsetY = 0;
 let selectedTool = 'duckduckgo';
 let systemPrompt = "You are a helpful assistant that provides clear, concise summaries. Keep your response under 200 words.";
 let selectedModel = 'gpt-3.5-turbo';
+// RAG workspace (tenant) from the page URL, e.g. /?workspace=acme
+const workspace = new URLSearchParams(window.location.search).get('workspace');
+// Comma-separated tags stored with uploaded documents, e.g. /?tags=hr,policy
+const uploadTags = new URLSearchParams(window.location.search).get('tags');
 
 // ===========================================
 // DOM Elements
@@ -35,6 +39,17 @@ const systemPromptInput = document.getElementById('systemPrompt');
 const toolOptions = document.querySelectorAll('.tool-option');
 const ragFileInput = document.getElementById('ragFileInput');
 
+const TOOL_BY_NODE = {
+  toolNode1: 'duckduckgo',
+  toolNode2: 'wikipedia',
+  toolNode3: 'rag'
+};
+const TOOL_LABELS = {
+  duckduckgo: 'DuckDuckGo',
+  wikipedia: 'Wikipedia',
+  rag: 'RAG (Local)'
+};
+
 // ===========================================
 // Initialization
 // ===========================================
@@ -190,10 +205,7 @@ function completeConnection(e) {
       connections.splice(existingIdx, 1);
     }
     
-    // Remove any other connection to agent (only one tool at a time)
-    connections = connections.filter(c => c.toNode !== toNode.id);
-    
-    // Add new connection
+    // Add new connection (several tools may feed the agent; they run in parallel)
     connections.push({
       fromNode: fromNode.id,
       toNode: toNode.id
@@ -300,20 +312,14 @@ function updateStatus() {
   const isConnected = connections.length > 0;
   
   if (isConnected) {
-    const conn = connections[0];
-    let toolName = 'Unknown';
-    if (conn.fromNode === 'toolNode1') toolName = 'DuckDuckGo';
-    else if (conn.fromNode === 'toolNode2') toolName = 'Wikipedia';
-    else if (conn.fromNode === 'toolNode3') toolName = 'RAG (Local)';
+    const toolNames = connections.map(c => TOOL_LABELS[TOOL_BY_NODE[c.fromNode]] || 'Unknown');
     statusDot.classList.add('connected');
     statusDot.classList.remove('disconnected');
-    statusText.textContent = `${toolName} → Agent`;
+    statusText.textContent = `${toolNames.join(' + ')} → Agent`;
     disconnectBtn.disabled = false;
     
-    // Update selected tool based on connection
-    if (conn.fromNode === 'toolNode1') selectedTool = 'duckduckgo';
-    else if (conn.fromNode === 'toolNode2') selectedTool = 'wikipedia';
-    else if (conn.fromNode === 'toolNode3') selectedTool = 'rag';
+    // Update selected tool based on the most recent connection
+    selectedTool = TOOL_BY_NODE[connections[connections.length - 1].fromNode] || selectedTool;
     updateToolSelection();
   } else {
     statusDot.classList.remove('connected');
@@ -428,6 +434,8 @@ async function uploadRagFile(file) {
   try {
     const fd = new FormData();
     fd.append('file', file);
+    if (workspace) fd.append('workspace', workspace);
+    if (uploadTags) fd.append('tags', uploadTags);
 
     outputBox.innerHTML = `⏳ Uploading ${file.name}...`;
     outputBox.className = 'output-box loading';
@@ -439,10 +447,12 @@ async function uploadRagFile(file) {
     const data = await resp.json();
     if (data.success) {
       showOutput(`Uploaded ${data.filename} — added ${data.added_chunks} chunks.`, 'success');
-      // ensure RAG is selected and connected
+      // ensure RAG is selected and connected, keeping other connected tools
       selectedTool = 'rag';
       updateToolSelection();
-      connections = [{ fromNode: 'toolNode3', toNode: 'agentNode' }];
+      if (!connections.some(c => c.fromNode === 'toolNode3')) {
+        connections.push({ fromNode: 'toolNode3', toNode: 'agentNode' });
+      }
       redrawConnections();
       updateStatus();
     } else {
@@ -492,12 +502,16 @@ runBtn.addEventListener('click', async () => {
   // Determine which tool is connected
   let connectedTool = null;
   if (connections.length > 0) {
-    const fn = connections[0].fromNode;
-    if (fn === 'toolNode1') connectedTool = 'duckduckgo';
-    else if (fn === 'toolNode2') connectedTool = 'wikipedia';
-    else if (fn === 'toolNode3') connectedTool = 'rag';
+    connectedTool = TOOL_BY_NODE[connections[0].fromNode] || null;
   }
   
+  // Send the canvas as a graph so the backend can run all connected tools in parallel
+  const nodes = [{ id: 'agentNode', type: 'agent' }];
+  connections.forEach(c => {
+    nodes.push({ id: c.fromNode, type: 'tool', tool: TOOL_BY_NODE[c.fromNode] });
+  });
+  const edges = connections.map(c => ({ source: c.fromNode, target: c.toNode }));
+  
   // Show loading
   outputBox.innerHTML = '⏳ Running workflow...';
   outputBox.className = 'output-box loading';
@@ -512,7 +526,10 @@ runBtn.addEventListener('click', async () => {
         connected: connections.length > 0,
         tool: connectedTool,
         system_prompt: systemPrompt,
-        model: selectedModel
+        model: selectedModel,
+        nodes: nodes,
+        edges: edges,
+        workspace: workspace
       })
     });
     
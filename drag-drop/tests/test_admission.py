@@ -0,0 +1,126 @@
+"""
+Tests for the per-endpoint admission control and client-disconnect
+cancellation in `admission`.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, AdmissionRejected, ClientDisconnected, run_until_disconnected
+
+
+class FakeRequest:
+    """Stands in for a Starlette request whose client leaves after `polls` checks."""
+
+    def __init__(self, polls: int):
+        self.polls = polls
+        self.url = SimpleNamespace(path="/run")
+
+    async def is_disconnected(self) -> bool:
+        self.polls -= 1
+        return self.polls < 0
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event):
+    async with controller.slot():
+        await release.wait()
+
+
+def test_saturated_controller_queues_then_rejects():
+    async def scenario():
+        controller = AdmissionController("run", max_concurrent=2, max_queue=1)
+        release = asyncio.Event()
+        holders = [asyncio.ensure_future(hold(controller, release)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        assert controller.active == 2 and controller.waiting == 1
+        # The queue is full: the next request is the 429 path
+        with pytest.raises(AdmissionRejected, match="queue full"):
+            async with controller.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(*holders)
+        return controller.metrics()
+
+    metrics = asyncio.run(scenario())
+
+    assert metrics["active"] == 0 and metrics["queue_depth"] == 0
+    assert metrics["rejected"] == 1
+    assert metrics["admitted"] == 3 and metrics["completed"] == 3
+
+
+def test_waiting_past_the_queue_timeout_is_rejected():
+    async def scenario():
+        controller = AdmissionController("upload", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(controller, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            async with controller.slot():
+                pass
+        assert controller.waiting == 0
+
+        release.set()
+        await holder
+        return controller.metrics()
+
+    metrics = asyncio.run(scenario())
+
+    assert metrics["rejected"] == 1
+    assert metrics["admitted"] == 1 and metrics["completed"] == 1
+
+
+def test_client_disconnect_cancels_the_work():
+    async def scenario():
+        controller = AdmissionController("run", max_concurrent=1, max_queue=0)
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        # The 499 path: the endpoint answers ClientDisconnected with status 499
+        with pytest.raises(ClientDisconnected, match="/run"):
+            async with controller.slot():
+                await run_until_disconnected(FakeRequest(polls=1), work(), poll_interval=0.01)
+
+        assert cancelled.is_set()
+        return controller.metrics()
+
+    metrics = asyncio.run(scenario())
+
+    assert metrics["active"] == 0
+    assert metrics["cancelled"] == 1 and metrics["completed"] == 0
+
+
+def test_connected_client_gets_the_result_and_failures_are_counted():
+    async def scenario():
+        controller = AdmissionController("run", max_concurrent=1, max_queue=0)
+
+        async def work():
+            await asyncio.sleep(0.03)
+            return "answer"
+
+        async with controller.slot():
+            result = await run_until_disconnected(FakeRequest(polls=100), work(), poll_interval=0.01)
+
+        with pytest.raises(RuntimeError):
+            async with controller.slot():
+                raise RuntimeError("tool failed")
+        return result, controller.metrics()
+
+    result, metrics = asyncio.run(scenario())
+
+    assert result == "answer"
+    assert metrics["completed"] == 1 and metrics["failed"] == 1 and metrics["active"] == 0
@@ -0,0 +1,46 @@
+"""
+Request validation tests for the drag-drop app. Startup handlers (vector
+store, watcher, prewarm) do not run, and no request reaches a tool or model.
+"""
+
+import os
+import sys
+
+import pytest
+
+DRAG_DROP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DRAG_DROP_DIR)
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client():
+    # The app mounts static/ and templates/ relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(DRAG_DROP_DIR)
+    try:
+        import app
+        yield TestClient(app.app)
+    finally:
+        os.chdir(cwd)
+
+
+def test_unknown_rag_filter_is_rejected(client):
+    response = client.post("/run", json={
+        "user_input": "refund policy", "connected": True, "tool": "rag",
+        "rag_filters": {"uploaded_since": "2024-01-01"},
+    })
+
+    assert response.status_code == 422
+    assert "uploaded_since" in response.text
+
+
+def test_mistyped_rag_filter_is_rejected(client):
+    response = client.post("/run", json={
+        "user_input": "refund policy", "connected": True, "tool": "rag",
+        "rag_filters": {"page_from": "first"},
+    })
+
+    assert response.status_code == 422
@@ -0,0 +1,42 @@
+"""
+Tests for the per-stage report helpers of the load test.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.run_load import cache_deltas, metrics_delta
+
+
+def snapshot(admitted, rejected, active, hits, misses, entries):
+    return {
+        "run": {"active": active, "queue_depth": 0, "max_concurrent": 8, "max_queue": 32,
+                "admitted": admitted, "rejected": rejected, "completed": admitted - active,
+                "failed": 0, "cancelled": 0},
+        "tool_cache": {"hits": hits, "misses": misses, "coalesced": 0},
+        "query_cache": {"embeddings": {"hits": hits, "misses": misses, "entries": entries}},
+    }
+
+
+def test_stage_metrics_are_the_change_over_the_stage():
+    before = snapshot(admitted=100, rejected=5, active=2, hits=40, misses=10, entries=50)
+    after = snapshot(admitted=130, rejected=9, active=1, hits=70, misses=20, entries=64)
+
+    delta = metrics_delta(before, after)
+
+    assert delta["run"] == {
+        "active": 1, "queue_depth": 0, "max_concurrent": 8, "max_queue": 32,
+        "admitted": 30, "rejected": 4, "completed": 31, "failed": 0, "cancelled": 0,
+    }
+    assert delta["tool_cache"] == {"hits": 30, "misses": 10, "coalesced": 0}
+    assert delta["query_cache"]["embeddings"] == {"hits": 30, "misses": 10, "entries": 64}
+    assert cache_deltas(before, after)["tool"]["hit_rate"] == 0.75
+
+
+def test_caches_created_during_the_stage_count_from_zero():
+    before = {"query_cache": {}}
+    after = {"query_cache": {"retrieval": {"hits": 3, "misses": 1, "entries": 1}}}
+
+    assert metrics_delta(before, after) == after
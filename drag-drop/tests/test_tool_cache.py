@@ -0,0 +1,93 @@
+"""
+Tests for `ToolResultCache`, driven with the load test's stand-in tool
+clients instead of DuckDuckGo and Wikipedia.
+
+    cd drag-drop
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.stub_tools import StubToolClient
+from tool_cache import ToolResultCache
+
+
+def stub(latency: float = 0.0, error_rate: float = 0.0) -> StubToolClient:
+    return StubToolClient("duckduckgo", latency=latency, jitter=0.0, error_rate=error_rate)
+
+
+def test_hit_after_miss_for_the_same_normalized_query():
+    cache, client = ToolResultCache(ttl_seconds=60), stub()
+
+    first = cache.get_or_call("duckduckgo", "Vector databases", client.run)
+    second = cache.get_or_call("duckduckgo", "  vector   DATABASES ", client.run)
+
+    assert first == second
+    assert client.stats["calls"] == 1
+    assert cache.stats == {"hits": 1, "misses": 1, "coalesced": 0}
+
+
+def test_tools_are_cached_separately():
+    cache, client = ToolResultCache(ttl_seconds=60), stub()
+
+    cache.get_or_call("duckduckgo", "solar power", client.run)
+    cache.get_or_call("wikipedia", "solar power", client.run)
+
+    assert client.stats["calls"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache, client = ToolResultCache(ttl_seconds=0.05), stub()
+
+    cache.get_or_call("duckduckgo", "climate policy", client.run)
+    time.sleep(0.1)
+    cache.get_or_call("duckduckgo", "climate policy", client.run)
+
+    assert client.stats["calls"] == 2
+    assert cache.stats["misses"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, client = ToolResultCache(ttl_seconds=60, max_entries=2), stub()
+
+    for query in ("a", "b", "a", "c"):
+        cache.get_or_call("duckduckgo", query, client.run)
+    cache.get_or_call("duckduckgo", "a", client.run)
+    cache.get_or_call("duckduckgo", "b", client.run)
+
+    # "b" was least recently used when "c" came in
+    assert client.stats["calls"] == 4
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    cache, client = ToolResultCache(ttl_seconds=60), stub(latency=0.2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_call("duckduckgo", "quantum computing", client.run), range(8)))
+
+    assert len(set(results)) == 1
+    assert client.stats["calls"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["coalesced"] == 7
+
+
+def test_failures_reach_waiters_and_are_not_cached():
+    cache, failing = ToolResultCache(ttl_seconds=60), stub(latency=0.2, error_rate=1.0)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.get_or_call, "duckduckgo", "sleep science", failing.run) for _ in range(4)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="Injected duckduckgo error"):
+            future.result()
+    assert failing.stats["calls"] == 1
+
+    healthy = stub()
+    assert "sleep science" in cache.get_or_call("duckduckgo", "sleep science", healthy.run)
+    assert healthy.stats["calls"] == 1
@@ -0,0 +1,93 @@
+"""
+Tests for validating and executing canvas workflows with `workflow_graph`.
+"""
+
+import asyncio
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workflow_graph import WorkflowExecutor, WorkflowGraphError, merge_outputs
+
+
+def make_executor(calls, budget=8000):
+    def tool(name):
+        def call(payload):
+            calls[name] += 1
+            return f"{name} result"
+        return call
+
+    async def agent(payload):
+        calls["agent"] += 1
+        return f"answer from:\n{payload}"
+
+    tools = {name: tool(name) for name in ("search", "orders", "faq")}
+    return WorkflowExecutor(tools=tools, agent=agent, context_budget_chars=budget)
+
+
+def test_cycles_are_rejected_before_anything_runs():
+    calls = Counter()
+    nodes = [{"id": "a", "type": "tool", "tool": "search"}, {"id": "b", "type": "agent"}]
+    edges = [{"source": "a", "target": "b"}, {"source": "b", "target": "a"}]
+
+    with pytest.raises(WorkflowGraphError, match="cycle"):
+        asyncio.run(make_executor(calls).run(nodes, edges, "where is my order"))
+    assert not calls
+
+
+def test_diamond_runs_the_shared_node_once():
+    calls = Counter()
+    nodes = [
+        {"id": "root", "type": "tool", "tool": "search"},
+        {"id": "left", "type": "tool", "tool": "orders"},
+        {"id": "right", "type": "tool", "tool": "faq"},
+        {"id": "sink", "type": "agent"},
+    ]
+    edges = [
+        {"source": "root", "target": "left"}, {"source": "root", "target": "right"},
+        {"source": "left", "target": "sink"}, {"source": "right", "target": "sink"},
+    ]
+
+    answer = asyncio.run(make_executor(calls).run(nodes, edges, "where is my order"))
+
+    assert calls == {"search": 1, "orders": 1, "faq": 1, "agent": 1}
+    assert "### orders\norders result" in answer
+    assert "### faq\nfaq result" in answer
+
+
+def test_duplicate_nodes_with_the_same_input_share_one_execution():
+    calls = Counter()
+    nodes = [
+        {"id": "a", "type": "tool", "tool": "search"},
+        {"id": "b", "type": "tool", "tool": "search"},
+        {"id": "sink", "type": "agent"},
+    ]
+    edges = [{"source": "a", "target": "sink"}, {"source": "b", "target": "sink"}]
+
+    answer = asyncio.run(make_executor(calls).run(nodes, edges, "refund policy"))
+
+    assert calls == {"search": 1, "agent": 1}
+    assert answer == "answer from:\nsearch result"
+
+
+def test_merge_outputs_truncates_to_the_budget():
+    outputs = [("short", "x" * 10), ("long", "y" * 500), ("longer", "z" * 900)]
+
+    merged = merge_outputs("question", outputs, budget_chars=310)
+    sections = dict(section.split("\n", 1) for section in merged.split("\n\n")[1:])
+
+    # The short output is kept whole and its unused share goes to the others
+    assert sections["### short"] == "x" * 10
+    assert sections["### long"] == "y" * 147 + "..."
+    assert sections["### longer"] == "z" * 147 + "..."
+    assert sum(len(body) for body in sections.values()) == 310
+
+
+def test_single_output_within_the_budget_is_passed_through():
+    assert merge_outputs("question", [("search", "result")], budget_chars=100) == "result"
+    assert merge_outputs("question", [], budget_chars=100) == "question"
+    assert merge_outputs("question", [("search", "result")], budget_chars=4).endswith("### search\nr...")
@@ -0,0 +1,82 @@
+"""
+TTL-bounded result cache for tool calls, with in-flight request coalescing.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+
+class ToolResultCache:
+    """
+    Caches tool results keyed by (tool, normalized query).
+
+    Entries expire after `ttl_seconds` and the least recently used entries are
+    evicted past `max_entries`. Concurrent calls for a key that is already
+    being fetched wait for that fetch instead of issuing their own upstream
+    call. Failures are shared with the waiting callers but never cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case and whitespace insensitive cache key for a query."""
+        return re.sub(r"\s+", " ", query).strip().lower()
+
+    def get_or_call(self, tool: str, query: str, fetch: Callable[[str], str]) -> str:
+        """Return the cached result for (tool, query), calling `fetch(query)` at most once per key."""
+        key = (tool, self.normalize(query))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch(query)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,154 @@
+"""
+Graph executor for canvas workflows: independent nodes run concurrently.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+
+class WorkflowGraphError(ValueError):
+    """Raised when a submitted workflow graph cannot be executed."""
+
+
+def merge_outputs(user_input: str, outputs: List[Tuple[str, str]], budget_chars: int) -> str:
+    """
+    Merge upstream node outputs into one agent input of at most `budget_chars`
+    characters of context. Every output gets an equal share of the budget and
+    the share unused by short outputs is handed to the longer ones.
+    """
+    if not outputs:
+        return user_input
+    if len(outputs) == 1 and len(outputs[0][1]) <= budget_chars:
+        return outputs[0][1]
+
+    remaining = budget_chars
+    allowance = {}
+    pending = sorted(range(len(outputs)), key=lambda i: len(outputs[i][1]))
+    while pending:
+        share = remaining // len(pending)
+        i = pending.pop(0)
+        allowance[i] = min(len(outputs[i][1]), share)
+        remaining -= allowance[i]
+
+    sections = [f"User request: {user_input}"]
+    for i, (label, text) in enumerate(outputs):
+        limit = allowance[i]
+        body = text if len(text) <= limit else text[:max(limit - 3, 0)] + "..."
+        sections.append(f"### {label}\n{body}")
+    return "\n\n".join(sections)
+
+
+class WorkflowExecutor:
+    """
+    Runs a node/edge workflow from the canvas.
+
+    Each node starts as soon as all of its upstream nodes have finished, so
+    independent tool nodes run concurrently and a multi-source answer takes
+    as long as the slowest tool. Nodes without upstream nodes receive the
+    user input; other nodes receive their upstream outputs merged within the
+    context budget. Identical (node kind, input) pairs are executed once per
+    request.
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, Callable[[str], str]],
+        agent: Callable[[str], Awaitable[str]],
+        context_budget_chars: int = 8000,
+    ):
+        self.tools = tools
+        self.agent = agent
+        self.context_budget_chars = context_budget_chars
+
+    def _plan(self, nodes: List[Dict], edges: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, List[str]], List[str]]:
+        """Validate the graph; return nodes by id, the upstream ids of each node and a topological order."""
+        by_id = {node["id"]: node for node in nodes}
+        if len(by_id) != len(nodes):
+            raise WorkflowGraphError("Duplicate node ids in workflow")
+
+        parents: Dict[str, List[str]] = {node_id: [] for node_id in by_id}
+        for edge in edges:
+            source, target = edge["source"], edge["target"]
+            if source not in by_id or target not in by_id:
+                raise WorkflowGraphError(f"Edge {source} -> {target} references an unknown node")
+            if source not in parents[target]:
+                parents[target].append(source)
+
+        for node in nodes:
+            if node["type"] == "tool" and node.get("tool") not in self.tools:
+                raise WorkflowGraphError(f"Unknown tool: {node.get('tool')}")
+            if node["type"] not in ("tool", "agent"):
+                raise WorkflowGraphError(f"Unknown node type: {node['type']}")
+
+        # Kahn's algorithm; rejects cycles before anything runs
+        indegree = {node_id: len(ups) for node_id, ups in parents.items()}
+        ready = [node_id for node_id, degree in indegree.items() if degree == 0]
+        order = []
+        while ready:
+            current = ready.pop()
+            order.append(current)
+            for node_id, ups in parents.items():
+                if current in ups:
+                    indegree[node_id] -= 1
+                    if indegree[node_id] == 0:
+                        ready.append(node_id)
+        if len(order) != len(by_id):
+            raise WorkflowGraphError("Workflow graph contains a cycle")
+
+        return by_id, parents, order
+
+    @staticmethod
+    def _label(node: Dict) -> str:
+        return node.get("tool") or node["id"]
+
+    async def run(self, nodes: List[Dict], edges: List[Dict], user_input: str) -> str:
+        """Execute the workflow and return the output of its sink node(s)."""
+        by_id, parents, order = self._plan(nodes, edges)
+        memo: Dict[Tuple[str, str], asyncio.Task] = {}
+        node_tasks: Dict[str, asyncio.Task] = {}
+
+        def execute(kind: str, payload: str) -> asyncio.Task:
+            # Memoize on (kind, input) so duplicate nodes share one execution
+            key = (kind, payload)
+            if key not in memo:
+                if kind == "agent":
+                    memo[key] = asyncio.ensure_future(self.agent(payload))
+                else:
+                    memo[key] = asyncio.ensure_future(asyncio.to_thread(self.tools[kind], payload))
+            return memo[key]
+
+        async def run_node(node_id: str) -> str:
+            ups = parents[node_id]
+            upstream = await asyncio.gather(*(node_tasks[up] for up in ups))
+            if ups:
+                # Memoized duplicates produce identical sections; merge them once
+                sections = list(dict.fromkeys(
+                    (self._label(by_id[up]), output) for up, output in zip(ups, upstream)
+                ))
+                payload = merge_outputs(user_input, sections, self.context_budget_chars)
+            else:
+                payload = user_input
+            node = by_id[node_id]
+            kind = "agent" if node["type"] == "agent" else node["tool"]
+            return await execute(kind, payload)
+
+        # Create tasks in dependency order so every upstream task exists before it is awaited
+        for node_id in order:
+            node_tasks[node_id] = asyncio.ensure_future(run_node(node_id))
+
+        try:
+            await asyncio.gather(*node_tasks.values())
+        except BaseException:
+            for task in list(node_tasks.values()) + list(memo.values()):
+                task.cancel()
+            raise
+
+        has_children = {up for ups in parents.values() for up in ups}
+        sinks = [node_id for node_id in by_id if node_id not in has_children]
+        if len(sinks) == 1:
+            return node_tasks[sinks[0]].result()
+        return merge_outputs(
+            user_input,
+            [(self._label(by_id[node_id]), node_tasks[node_id].result()) for node_id in sinks],
+            self.context_budget_chars,
+        )